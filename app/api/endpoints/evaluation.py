@@ -1,21 +1,47 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Header, Request
+from fastapi.responses import StreamingResponse
 from app.db import schemas 
-from app.db.database import get_db_connection, get_db_cursor
+from app.db.database import run_with_db_connection, get_db_cursor, check_db_pool_health
 from typing import List
-from app.core import pipeline
+from app.core import pipeline, expectation_index, executor, batcher, jobs, cache, prefilter, startup, memory, metrics, profiling, documents, dedup, results
+from app.core.config import settings
 import logging
+import asyncio
+import time
 import psycopg2 
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+def require_ready():
+    """Dependency for endpoints that need the models: 503 (with Retry-After) until startup finished."""
+    if not startup.is_ready():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Service is not ready yet (startup status: {startup.get_startup_status()['status']}).",
+            headers={"Retry-After": "5"}
+        )
+
 @router.post(
     "/process_snippet",
     response_model=schemas.ProcessResponse,
     summary="Process text snippet to find and record skill achievements",
-    tags=["Evaluation"]
+    tags=["Evaluation"],
+    dependencies=[Depends(require_ready)]
 )
-async def process_snippet_endpoint(request: schemas.ProcessRequest):
+async def process_snippet_endpoint(
+    request: schemas.ProcessRequest,
+    profile: bool = Query(False, description="Profile this request (requires PROFILING_ENABLED)"),
+    x_profile: str | None = Header(None),
+    x_profile_token: str | None = Header(None),
+    idempotency_key: str | None = Header(None, max_length=255),
+):
+    """
+    Resubmitting a snippet with the same `Idempotency-Key` header within
+    RESULT_STORE_TTL_SECONDS replays the stored result with `replayed: true`
+    instead of processing it again. Without the header a snippet is only
+    replayed when RESULT_STORE_AUTO_KEY is enabled (keyed by its text).
+    """
     logger.info(f"Received request to process text snippet: {request.text[:100]}...") 
 
     if not request.text or not request.text.strip():
@@ -23,14 +49,37 @@ async def process_snippet_endpoint(request: schemas.ProcessRequest):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Input text cannot be empty."
         )
+    profiled = profile or x_profile in ("1", "true")
+    if profiled and not profiling.is_allowed(x_profile_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Request profiling is disabled or the profiling token is wrong."
+        )
 
     try:
-        achievements_count = await pipeline.process_text_snippet(request.text)
-        logger.info(f"Processing complete. Achievements created: {achievements_count}")
+        started = time.perf_counter()
+        report, replayed = None, False
+        if profiled:
+            result, report = await executor.run_inference(profiling.profile_pipeline_sync, request.text)
+        else:
+            result, replayed = await results.run_once(request.text, idempotency_key, pipeline.run_pipeline)
+        total = time.perf_counter() - started
+        metrics.REQUEST_SECONDS.observe(total, endpoint="process_snippet")
+        logger.info(f"Processing complete. Achievements created: {result.achievements_created}")
+        timings = None
+        if request.include_timings:
+            timings = {"total": round(total, 6)}
+            if not replayed:
+                timings.update({step: round(seconds, 6) for step, seconds in result.step_seconds.items()})
         return schemas.ProcessResponse(
             status="Processed",
-            achievements_created=achievements_count
+            achievements_created=result.achievements_created,
+            replayed=replayed,
+            timings=timings,
+            profile=report
         )
+    except results.IdempotencyKeyConflict as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except Exception as e:
         logger.exception("An error occurred during snippet processing.")
         raise HTTPException(
@@ -39,6 +88,173 @@ async def process_snippet_endpoint(request: schemas.ProcessRequest):
         )
 
 
+async def _process_batch_item(item: schemas.BatchItem, slots: asyncio.Semaphore) -> schemas.BatchItemResult:
+    if not item.text or not item.text.strip():
+        return schemas.BatchItemResult(client_id=item.client_id, status="Error", error="Input text cannot be empty.")
+    async with slots:
+        try:
+            started = time.perf_counter()
+            result = await pipeline.run_pipeline(item.text)
+            metrics.REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint="process_batch")
+        except Exception as e:
+            logger.exception(f"An error occurred while processing batch item '{item.client_id}'.")
+            return schemas.BatchItemResult(client_id=item.client_id, status="Error", error=f"An internal error occurred: {e}")
+    return schemas.BatchItemResult(
+        client_id=item.client_id,
+        status="Processed",
+        achievements_created=result.achievements_created,
+        achievements=result.achievements,
+    )
+
+
+@router.post(
+    "/process_batch",
+    response_class=StreamingResponse,
+    summary="Process many text snippets, streaming one NDJSON result line per item",
+    tags=["Evaluation"],
+    dependencies=[Depends(require_ready)]
+)
+async def process_batch_endpoint(request: schemas.BatchRequest):
+    """
+    Processes every item concurrently (so their sentences share inference batches)
+    and streams back one `BatchItemResult` JSON line per item, in completion order,
+    as soon as that item is done. Per-item failures are reported in the item's line.
+    """
+    logger.info(f"Received batch request with {len(request.items)} items.")
+    if not request.items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Batch must contain at least one item."
+        )
+    if len(request.items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds the maximum of {settings.BATCH_MAX_ITEMS} items."
+        )
+
+    async def _stream_results():
+        # Leave executor capacity for other requests while a large batch drains.
+        slots = asyncio.Semaphore(settings.BATCH_ITEM_CONCURRENCY)
+        tasks = [asyncio.create_task(_process_batch_item(item, slots)) for item in request.items]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                item_result = await next_done
+                yield item_result.model_dump_json() + "\n"
+        finally:
+            # Client went away (or we're done): drop items that haven't started yet.
+            for task in tasks:
+                task.cancel()
+        logger.info(f"Batch of {len(request.items)} items finished.")
+
+    return StreamingResponse(_stream_results(), media_type="application/x-ndjson")
+
+
+@router.post(
+    "/upload",
+    response_model=schemas.UploadResponse,
+    summary="Process an uploaded report (plain text, DOCX or PDF) while it streams in",
+    tags=["Evaluation"],
+    dependencies=[Depends(require_ready)]
+)
+async def upload_document_endpoint(
+    request: Request,
+    filename: str | None = Query(None, description="Used to detect the format when the Content-Type is generic")
+):
+    """
+    Send the raw document as the request body (not multipart), e.g.
+    `curl --data-binary @report.txt -H "Content-Type: text/plain" .../evaluation/upload`.
+    Plain text is segmented and processed as it arrives, so achievements are
+    recorded before the upload finishes; DOCX and PDF are read once complete.
+    """
+    try:
+        doc_format = documents.detect_format(request.headers.get("content-type"), filename)
+    except documents.UnsupportedDocumentError as e:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e))
+    declared_length = request.headers.get("content-length")
+    if declared_length and declared_length.isdigit() and int(declared_length) > settings.DOCUMENT_UPLOAD_MAX_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Upload exceeds the maximum of {settings.DOCUMENT_UPLOAD_MAX_BYTES} bytes."
+        )
+    logger.info(f"Received {doc_format} upload ({declared_length or 'unknown'} bytes).")
+
+    try:
+        started = time.perf_counter()
+        totals = await documents.process_upload(request.stream(), doc_format)
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint="upload")
+    except documents.DocumentTooLargeError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except documents.UnsupportedDocumentError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.exception("An error occurred during document upload processing.")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An internal error occurred: {e}"
+        )
+    logger.info(f"Upload processed: {totals['sentences_total']} sentences, {totals['achievements_created']} achievements created.")
+    return schemas.UploadResponse(status="Processed", format=doc_format, **totals)
+
+
+@router.post(
+    "/jobs",
+    response_model=schemas.JobStatus,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Submit a large document for background processing",
+    tags=["Jobs"],
+    dependencies=[Depends(require_ready)]
+)
+async def submit_job_endpoint(request: schemas.ProcessRequest):
+    """Queues the text for the background workers and returns the job to poll."""
+    if not request.text or not request.text.strip():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Input text cannot be empty."
+        )
+    try:
+        job = await jobs.submit(request.text)
+    except Exception as e:
+        logger.exception("An error occurred while queueing a job.")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Job could not be queued: {e}"
+        )
+    logger.info(f"Queued job {job['job_id']}.")
+    return schemas.JobStatus(**job)
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=schemas.JobStatus,
+    summary="Get the status and progress of a background job",
+    tags=["Jobs"],
+    dependencies=[Depends(require_ready)]
+)
+async def get_job_endpoint(job_id: str):
+    job = await jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found.")
+    return schemas.JobStatus(**job)
+
+
+@router.post(
+    "/jobs/{job_id}/cancel",
+    response_model=schemas.JobStatus,
+    summary="Cancel a queued or running background job",
+    tags=["Jobs"],
+    dependencies=[Depends(require_ready)]
+)
+async def cancel_job_endpoint(job_id: str):
+    """
+    Queued jobs are cancelled immediately; running jobs stop before their next
+    chunk of sentences (achievements already recorded are kept).
+    """
+    job = await jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found.")
+    return schemas.JobStatus(**job)
+
+
 @router.get(
     "/test/employees",
     response_model=List[schemas.Employee], 
@@ -51,10 +267,8 @@ async def get_all_employees():
     Verifies database connection and basic SELECT query execution.
     """
     logger.info("Received request for /test/employees")
-    conn = None
-    cur = None
-    try:
-        conn = get_db_connection()
+
+    def _fetch_employees(conn):
         if not conn:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -63,19 +277,25 @@ async def get_all_employees():
 
         cur = get_db_cursor(conn)
         if not cur:
-             conn.close()
              raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to get database cursor."
             )
+        try:
+            cur.execute("SELECT employee_id, name FROM Employees ORDER BY employee_id;")
+            return cur.fetchall()
+        finally:
+            cur.close()
 
-        cur.execute("SELECT employee_id, name FROM Employees ORDER BY employee_id;")
-        employee_records = cur.fetchall()
+    try:
+        employee_records = await run_with_db_connection(_fetch_employees)
         logger.info(f"Retrieved {len(employee_records)} employee records.")
 
         employees = [schemas.Employee(**record) for record in employee_records]
         return employees
 
+    except HTTPException:
+        raise
     except psycopg2.Error as db_err: 
         logger.error(f"Database error while fetching employees: {db_err}")
         raise HTTPException(
@@ -88,9 +308,82 @@ async def get_all_employees():
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"An unexpected error occurred: {e}"
         )
-    finally:
-        if cur:
-            cur.close()
-        if conn:
-            conn.close()
-        logger.debug("Database connection closed for /test/employees request.")
+
+
+@router.get(
+    "/test/db_pool",
+    summary="[Test] Database connection pool health and saturation",
+    tags=["Testing"]
+)
+async def get_db_pool_status():
+    """
+    Runs a trivial query on a pooled connection and returns pool usage counters
+    (in use, waiting, timeouts, peak) so saturation can be spotted under load.
+    """
+    return await asyncio.to_thread(check_db_pool_health)
+
+
+@router.get(
+    "/test/memory",
+    summary="[Test] Resident memory of the worker serving this request",
+    tags=["Testing"]
+)
+async def get_memory_status():
+    """
+    RSS of this worker split into unique and shared pages (model weights inherited
+    from the serve.py parent show up as shared), plus PSS. Linux only.
+    """
+    usage = memory.get_memory_usage()
+    if usage is None:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Memory usage is only available on Linux (/proc)."
+        )
+    return usage
+
+
+@router.post(
+    "/admin/expectations/reload",
+    summary="[Admin] Reload the in-memory expectation index",
+    tags=["Admin"]
+)
+async def reload_expectation_index():
+    """
+    Reloads expectation embeddings into the in-memory matching index. Other
+    server processes listening for changes are notified as well.
+    """
+    if settings.EXPECTATION_MATCH_BACKEND != "memory":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Expectation matching uses the '{settings.EXPECTATION_MATCH_BACKEND}' backend; there is no in-memory index to reload."
+        )
+    loaded = await asyncio.to_thread(expectation_index.load_index)
+    if not loaded:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Expectation index could not be reloaded from the database."
+        )
+    await asyncio.to_thread(expectation_index.notify_reload, "reload")
+    return expectation_index.get_index_stats()
+
+
+@router.get(
+    "/test/inference_stats",
+    summary="[Test] Inference executor and micro-batching statistics",
+    tags=["Testing"]
+)
+async def get_inference_stats():
+    """
+    Returns inference executor load, micro-batcher queue depth, batch-size
+    histogram and padding efficiency, inference cache hit/miss/eviction counters,
+    how many NER calls the employee-name prefilter avoided, how much work
+    near-duplicate evidence detection saved and snippet result replays.
+    """
+    return {
+        "executor": executor.get_executor_stats(),
+        "batching": batcher.get_batcher_stats(),
+        "cache": cache.get_cache_stats(),
+        "prefilter": prefilter.get_prefilter_stats(),
+        "dedup": dedup.get_dedup_stats(),
+        "results": results.get_result_store_stats(),
+    }
@@ -0,0 +1,29 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.core import startup
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+@router.get(
+    "/live",
+    summary="Liveness probe: the process is up and serving",
+    tags=["Health"]
+)
+async def liveness():
+    return {"status": "alive"}
+
+
+@router.get(
+    "/ready",
+    summary="Readiness probe: models loaded and warmed up, job workers running",
+    tags=["Health"]
+)
+async def readiness():
+    """
+    200 once startup finished; 503 while models are still loading (or if loading
+    failed). The body carries the per-phase startup timing breakdown.
+    """
+    startup_status = startup.get_startup_status()
+    return JSONResponse(status_code=200 if startup.is_ready() else 503, content=startup_status)
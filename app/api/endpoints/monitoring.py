@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.core import metrics
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    summary="Prometheus metrics: per-stage latency histograms, sentence counters, pool and queue gauges",
+    tags=["Monitoring"]
+)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
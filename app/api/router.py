@@ -1,7 +1,8 @@
 from fastapi import APIRouter
-from app.api.endpoints import evaluation 
+from app.api.endpoints import evaluation, health, monitoring
 
 api_router = APIRouter()
 
 api_router.include_router(evaluation.router, prefix="/evaluation", tags=["Evaluation"])
-
+api_router.include_router(health.router, prefix="/health", tags=["Health"])
+api_router.include_router(monitoring.router, tags=["Monitoring"])
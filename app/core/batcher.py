@@ -0,0 +1,220 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from app.core.config import settings
+from app.core import metrics
+from app.models import loader
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (in items) of the batch-size histogram buckets.
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token-count estimate (~4 characters per WordPiece token plus [CLS]/[SEP])."""
+    return len(text) // 4 + 2
+
+class _Pending:
+    __slots__ = ("item", "tokens", "future", "enqueued")
+
+    def __init__(self, item, tokens: int):
+        self.item = item
+        self.tokens = tokens
+        self.future = Future()
+        self.enqueued = time.monotonic()
+
+class MicroBatcher:
+    """
+    Coalesces items submitted by concurrent requests into model batches.
+
+    A single scheduler thread waits until `max_batch_size` items are queued or the
+    oldest item has waited `max_wait_ms`, takes up to `max_batch_size` items (FIFO,
+    so nothing starves), sorts them by estimated token length and splits them into
+    sub-batches whose padded size (items x longest item) stays within
+    `max_batch_tokens`. Each sub-batch goes through `process_batch(list) -> list`
+    in one call and results are fanned back out to the submitters' futures.
+    """
+
+    def __init__(self, name: str, process_batch, max_batch_size: int, max_batch_tokens: int, max_wait_ms: float, length_fn=estimate_tokens):
+        self.name = name
+        self._process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_wait = max_wait_ms / 1000.0
+        self._length_fn = length_fn
+        self._queue: deque[_Pending] = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self._stats = {
+            "items_total": 0,
+            "batches_total": 0,
+            "errors_total": 0,
+            "tokens_total": 0,
+            "padded_tokens_total": 0,
+            "max_queue_depth": 0,
+        }
+        self._batch_size_histogram = {bound: 0 for bound in BATCH_SIZE_BUCKETS}
+        self._batch_size_histogram["+Inf"] = 0
+
+    # --- Public API ---
+
+    def submit(self, items: list) -> list[Future]:
+        """Queues items and returns one Future per item."""
+        self._ensure_started()
+        pending = [_Pending(item, self._length_fn(item)) for item in items]
+        with self._cond:
+            self._queue.extend(pending)
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], len(self._queue))
+            self._cond.notify()
+        return [p.future for p in pending]
+
+    def map(self, items: list) -> list:
+        """Blocking helper: queues items and waits for all results (re-raises the first failure)."""
+        return [future.result() for future in self.submit(items)]
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def get_stats(self) -> dict:
+        batches = self._stats["batches_total"]
+        padded = self._stats["padded_tokens_total"]
+        return {
+            "queue_depth": self.queue_depth(),
+            **self._stats,
+            "avg_batch_size": round(self._stats["items_total"] / batches, 2) if batches else 0.0,
+            "padding_efficiency": round(self._stats["tokens_total"] / padded, 3) if padded else None,
+            "batch_size_histogram": dict(self._batch_size_histogram),
+        }
+
+    # --- Scheduler ---
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped = False
+                self._thread = threading.Thread(target=self._run, name=f"batcher-{self.name}", daemon=True)
+                self._thread.start()
+
+    def _take_batch(self) -> list[_Pending] | None:
+        with self._cond:
+            while not self._queue and not self._stopped:
+                self._cond.wait()
+            if not self._queue:
+                return None
+            deadline = self._queue[0].enqueued + self.max_wait
+            while len(self._queue) < self.max_batch_size and not self._stopped:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            count = min(self.max_batch_size, len(self._queue))
+            return [self._queue.popleft() for _ in range(count)]
+
+    def _split_by_token_budget(self, batch: list[_Pending]) -> list[list[_Pending]]:
+        batch.sort(key=lambda p: p.tokens)
+        sub_batches, current = [], []
+        for pending in batch:
+            # Sorted ascending, so the newest item is the longest: padded size = len * tokens.
+            if current and (len(current) + 1) * pending.tokens > self.max_batch_tokens:
+                sub_batches.append(current)
+                current = []
+            current.append(pending)
+        if current:
+            sub_batches.append(current)
+        return sub_batches
+
+    def _record_batch(self, sub_batch: list[_Pending]):
+        size = len(sub_batch)
+        self._stats["batches_total"] += 1
+        self._stats["items_total"] += size
+        self._stats["tokens_total"] += sum(p.tokens for p in sub_batch)
+        self._stats["padded_tokens_total"] += size * sub_batch[-1].tokens
+        for bound in BATCH_SIZE_BUCKETS:
+            if size <= bound:
+                self._batch_size_histogram[bound] += 1
+                break
+        else:
+            self._batch_size_histogram["+Inf"] += 1
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            for sub_batch in self._split_by_token_budget(batch):
+                self._record_batch(sub_batch)
+                try:
+                    results = self._process_batch([p.item for p in sub_batch])
+                    if len(results) != len(sub_batch):
+                        raise RuntimeError(f"Batch function returned {len(results)} results for {len(sub_batch)} items.")
+                    for pending, result in zip(sub_batch, results):
+                        pending.future.set_result(result)
+                except Exception as e:
+                    self._stats["errors_total"] += 1
+                    logger.error(f"Micro-batch '{self.name}' of {len(sub_batch)} items failed: {e}")
+                    for pending in sub_batch:
+                        pending.future.set_exception(e)
+
+# --- Shared Batchers ---
+
+def _run_ner(sentences: list[str]) -> list:
+    with metrics.observe_model("ner", len(sentences)):
+        return list(loader.ner_model_instance(sentences, batch_size=len(sentences)))
+
+def _run_encode(sentences: list[str]) -> list:
+    with metrics.observe_model("embedding", len(sentences)):
+        return list(loader.sentence_transformer_instance.encode(sentences, batch_size=len(sentences)))
+
+ner_batcher = MicroBatcher(
+    "ner",
+    _run_ner,
+    max_batch_size=settings.MICRO_BATCH_MAX_SIZE,
+    max_batch_tokens=settings.MICRO_BATCH_MAX_TOKENS,
+    max_wait_ms=settings.MICRO_BATCH_MAX_WAIT_MS,
+)
+embedding_batcher = MicroBatcher(
+    "embedding",
+    _run_encode,
+    max_batch_size=settings.MICRO_BATCH_MAX_SIZE,
+    max_batch_tokens=settings.MICRO_BATCH_MAX_TOKENS,
+    max_wait_ms=settings.MICRO_BATCH_MAX_WAIT_MS,
+)
+
+def is_enabled() -> bool:
+    return settings.MICRO_BATCHING_ENABLED
+
+def stop():
+    """Stops the scheduler threads. Called on application shutdown."""
+    ner_batcher.stop()
+    embedding_batcher.stop()
+
+def _batcher_gauges() -> list[tuple]:
+    if not settings.MICRO_BATCHING_ENABLED:
+        return []
+    return [
+        ("micro_batch_queue_depth", "Sentences waiting in a micro-batcher queue.", {"model": b.name}, b.queue_depth())
+        for b in (ner_batcher, embedding_batcher)
+    ]
+
+metrics.register_gauges(_batcher_gauges)
+
+def get_batcher_stats() -> dict:
+    return {
+        "enabled": settings.MICRO_BATCHING_ENABLED,
+        "ner": ner_batcher.get_stats(),
+        "embedding": embedding_batcher.get_stats(),
+    }
@@ -0,0 +1,240 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from app.core.config import settings
+from app.models import loader
+
+logger = logging.getLogger(__name__)
+
+NER = "ner"
+EMBEDDING = "embedding"
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_sentence(sentence: str) -> str:
+    """Collapses whitespace only: case and punctuation change both models' outputs."""
+    return _WHITESPACE.sub(" ", sentence).strip()
+
+def model_name(kind: str) -> str:
+    """
+    Identifies the model (and backend variant) whose outputs are cached; part of
+    every key, so changing either invalidates.
+    """
+    name = loader.NER_MODEL_NAME if kind == NER else loader.SENTENCE_MODEL_NAME
+    return f"{name}@{loader.backend_id()}"
+
+def cache_key(kind: str, sentence: str) -> str:
+    digest = hashlib.sha256(normalize_sentence(sentence).encode("utf-8")).hexdigest()
+    return f"{kind}:{model_name(kind)}:{digest}"
+
+def _clean_entities(entities: list[dict]) -> list[dict]:
+    """Keeps the fields the pipeline reads, as plain JSON-serializable types."""
+    return [
+        {
+            "entity_group": entity["entity_group"],
+            "word": entity["word"],
+            "score": float(entity.get("score", 0.0)),
+            "start": entity.get("start"),
+            "end": entity.get("end"),
+        }
+        for entity in entities
+    ]
+
+def _size_of(kind: str, value) -> int:
+    if kind == EMBEDDING:
+        return int(value.nbytes) + 96
+    return sum(len(entity["word"]) + 96 for entity in value) + 64
+
+class InferenceCache:
+    """
+    Two-tier cache of model outputs keyed by (kind, model name, sha256 of the
+    normalized sentence): an in-memory LRU bounded by entry count and bytes, and an
+    optional SQLite file that survives restarts and is shared by worker processes.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, sqlite_path: str = ""):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[object, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._db = None
+        self._stats = {"hits_memory": 0, "hits_persistent": 0, "misses": 0, "evictions": 0, "stores": 0}
+        if sqlite_path:
+            self._open_persistent(sqlite_path)
+
+    # --- Persistent tier ---
+
+    def _open_persistent(self, path: str):
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL;")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS inference_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    model_name TEXT NOT NULL,
+                    value BLOB NOT NULL
+                );
+            """)
+            # Entries from models no longer configured can never be hit again.
+            deleted = self._db.execute(
+                "DELETE FROM inference_cache WHERE (kind = ? AND model_name != ?) OR (kind = ? AND model_name != ?);",
+                (NER, model_name(NER), EMBEDDING, model_name(EMBEDDING)),
+            ).rowcount
+            if deleted:
+                logger.info(f"Inference cache: removed {deleted} persistent entries from previous models.")
+            logger.info(f"Inference cache persistent tier opened at '{path}'.")
+        except sqlite3.Error as e:
+            logger.error(f"Could not open persistent inference cache '{path}': {e}")
+            self._db = None
+
+    def _load_persistent(self, key: str, kind: str):
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute("SELECT value FROM inference_cache WHERE cache_key = ?;", (key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Persistent inference cache read failed: {e}")
+            return None
+        if row is None:
+            return None
+        if kind == EMBEDDING:
+            return np.frombuffer(row[0], dtype=np.float32).copy()
+        return json.loads(row[0])
+
+    def _store_persistent(self, key: str, kind: str, value):
+        if self._db is None:
+            return
+        blob = value.astype(np.float32).tobytes() if kind == EMBEDDING else json.dumps(value)
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO inference_cache (cache_key, kind, model_name, value) VALUES (?, ?, ?, ?);",
+                (key, kind, model_name(kind), blob),
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Persistent inference cache write failed: {e}")
+
+    # --- Memory tier ---
+
+    def _put_memory(self, key: str, value, size: int):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._stats["evictions"] += 1
+
+    # --- Public API ---
+
+    def get_many(self, kind: str, sentences: list[str]) -> list:
+        """Returns one cached value (or None on a miss) per sentence."""
+        results = []
+        for sentence in sentences:
+            key = cache_key(kind, sentence)
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self._stats["hits_memory"] += 1
+            if entry is not None:
+                results.append(entry[0])
+                continue
+            value = self._load_persistent(key, kind)
+            if value is not None:
+                self._put_memory(key, value, _size_of(kind, value))
+                with self._lock:
+                    self._stats["hits_persistent"] += 1
+            else:
+                with self._lock:
+                    self._stats["misses"] += 1
+            results.append(value)
+        return results
+
+    def put_many(self, kind: str, sentences: list[str], values: list):
+        """Stores freshly computed values (None values are skipped)."""
+        for sentence, value in zip(sentences, values):
+            if value is None:
+                continue
+            if kind == NER:
+                value = _clean_entities(value)
+            else:
+                value = np.asarray(value, dtype=np.float32)
+            key = cache_key(kind, sentence)
+            self._put_memory(key, value, _size_of(kind, value))
+            self._store_persistent(key, kind, value)
+            with self._lock:
+                self._stats["stores"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self._db is not None:
+            self._db.execute("DELETE FROM inference_cache;")
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        lookups = stats["hits_memory"] + stats["hits_persistent"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits_memory"] + stats["hits_persistent"]) / lookups, 3) if lookups else None
+        stats["persistent"] = self._db is not None
+        return stats
+
+_cache: InferenceCache | None = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> InferenceCache | None:
+    """Returns the shared cache (created on first use), or None when caching is disabled."""
+    global _cache
+    if not settings.INFERENCE_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = InferenceCache(
+                    max_entries=settings.INFERENCE_CACHE_MAX_ENTRIES,
+                    max_bytes=settings.INFERENCE_CACHE_MAX_BYTES,
+                    sqlite_path=settings.INFERENCE_CACHE_SQLITE_PATH,
+                )
+    return _cache
+
+def get_cache_stats() -> dict:
+    cache = get_cache()
+    return cache.get_stats() if cache else {"enabled": False}
+
+def cached_inference(kind: str, sentences: list[str], compute) -> list:
+    """
+    Looks sentences up in the cache and calls `compute(misses) -> list` for the
+    rest (duplicates within the call are computed once), storing what it returns.
+    """
+    cache = get_cache()
+    if cache is None or not sentences:
+        return compute(sentences)
+    results = cache.get_many(kind, sentences)
+    missing = {}
+    for i, (sentence, value) in enumerate(zip(sentences, results)):
+        if value is None:
+            missing.setdefault(normalize_sentence(sentence), []).append(i)
+    if not missing:
+        return results
+    to_compute = [sentences[positions[0]] for positions in missing.values()]
+    computed = compute(to_compute)
+    cache.put_many(kind, to_compute, computed)
+    for positions, value in zip(missing.values(), computed):
+        for i in positions:
+            results[i] = value
+    return results
@@ -11,6 +11,114 @@ class Settings(BaseSettings):
     DB_PORT: int
     SIMILARITY_THRESHOLD: float = 0.3 
 
+    # Database connection pool
+    DB_POOL_MIN_SIZE: int = 1
+    DB_POOL_MAX_SIZE: int = 10
+    DB_POOL_TIMEOUT: float = 10.0 # Seconds to wait for a free pooled connection
+
+    # Streaming pipeline stages (see app/core/stages.py)
+    PIPELINE_CHUNK_SENTENCES: int = 64 # Sentences per chunk flowing between stages
+    PIPELINE_QUEUE_SIZE: int = 4 # Chunks buffered between two stages
+    PIPELINE_MATCH_CONCURRENCY: int = 2 # Parallel expectation-matching workers (DB queries)
+
+    # Skip achievement rows that violate a unique constraint (ON CONFLICT DO NOTHING)
+    ACHIEVEMENT_SKIP_DUPLICATES: bool = False
+
+    # Inference backend: "torch", "torch_inference" or "onnx" (see app/models/loader.py)
+    INFERENCE_BACKEND: str = "torch"
+    INFERENCE_TORCH_THREADS: int = 0 # torch_inference: intra-op threads (0 = PyTorch default)
+    INFERENCE_TORCH_INTEROP_THREADS: int = 0 # torch_inference: inter-op threads (0 = PyTorch default)
+    ONNX_MODEL_DIR: str = os.path.join(os.path.dirname(env_path), "onnx_models")
+    ONNX_QUANTIZED: bool = False # Use the dynamic int8 models written by scripts/export_onnx_models.py --quantize
+    ONNX_PARITY_MIN_COSINE: float = 0.99 # export_onnx_models.py parity check: min cosine vs PyTorch embeddings
+
+    # Startup (see app/core/startup.py)
+    STARTUP_LAZY_MODELS: bool = True # Serve immediately and load models in the background (/health/ready reports when done)
+    STARTUP_WARMUP_BATCHES: int = 1 # Full-size NER/embedding batches run after loading (0 = no warmup)
+
+    # Inference batching
+    NER_BATCH_SIZE: int = 16
+    EMBEDDING_BATCH_SIZE: int = 32
+
+    # Inference executor: "thread" (shared models) or "process" (models loaded per worker)
+    INFERENCE_EXECUTOR: str = "thread"
+    INFERENCE_WORKERS: int = 2
+    INFERENCE_MAX_CONCURRENCY: int = 8 # Pipeline runs allowed to run or queue on the executor
+
+    # /evaluation/process_batch
+    BATCH_MAX_ITEMS: int = 1000
+    BATCH_ITEM_CONCURRENCY: int = 4 # Items of one batch processed at the same time
+
+    # Background job queue: "sqlite" (single node; ":memory:" = in-process) or "postgres" (multi-node)
+    JOB_STORE: str = "sqlite"
+    JOB_SQLITE_PATH: str = ":memory:"
+    JOB_WORKERS: int = 2
+    JOB_CHUNK_SENTENCES: int = 64 # Sentences per progress update / cancellation check
+    JOB_POLL_SECONDS: float = 2.0
+    JOB_LEASE_SECONDS: float = 6 * 3600 # Jobs still running this long after they started are failed on startup; must exceed the longest job
+
+    # Cross-request micro-batching of NER/embedding calls (see app/core/batcher.py).
+    # Off by default: every model call may wait up to MICRO_BATCH_MAX_WAIT_MS for company.
+    MICRO_BATCHING_ENABLED: bool = False
+    MICRO_BATCH_MAX_SIZE: int = 64
+    MICRO_BATCH_MAX_TOKENS: int = 8192 # Padded tokens (items x longest item) per model call
+    MICRO_BATCH_MAX_WAIT_MS: float = 5.0 # 0 = dispatch at once; items arriving meanwhile form the next batch
+
+    # Employee-name prefilter run before NER: "off", "strict", "fast" or "shadow" (see app/core/prefilter.py)
+    PREFILTER_MODE: str = "strict"
+
+    # Content-addressed cache of NER entities / embeddings per sentence (see app/core/cache.py)
+    INFERENCE_CACHE_ENABLED: bool = True
+    INFERENCE_CACHE_MAX_ENTRIES: int = 200_000
+    INFERENCE_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    INFERENCE_CACHE_SQLITE_PATH: str = "" # Persistent tier file; empty = memory only
+
+    # In-memory employee name index (see scripts/setup_employee_notify.py)
+    EMPLOYEE_INDEX_ENABLED: bool = True
+    EMPLOYEE_INDEX_USE_ALIASES: bool = True # Resolve unambiguous first/last names
+    EMPLOYEE_INDEX_NOTIFY_CHANNEL: str = "employees_changed"
+    EMPLOYEE_INDEX_REFRESH_SECONDS: float = 300.0 # Full reload interval (fallback to LISTEN/NOTIFY)
+
+    # Expectation matching: "pgvector" (query the DB) or "memory" (in-process NumPy matrix)
+    EXPECTATION_MATCH_BACKEND: str = "pgvector"
+    EXPECTATION_MATCHES_PER_SENTENCE: int = 1 # Top-k expectations a sentence may be recorded against (each below SIMILARITY_THRESHOLD)
+    EXPECTATION_INDEX_NOTIFY_CHANNEL: str = "expectations_changed"
+    EXPECTATION_INDEX_REFRESH_SECONDS: float = 0.0 # Periodic reload interval; 0 = only on notification
+    # pgvector ANN search (indexes managed by scripts/manage_expectation_index.py); 0 = server default
+    EXPECTATION_HNSW_EF_SEARCH: int = 0 # hnsw.ef_search: candidate list size, higher = better recall, slower
+    EXPECTATION_IVFFLAT_PROBES: int = 0 # ivfflat.probes: lists scanned per query, higher = better recall, slower
+    # Two-stage search over compact codes, then exact re-ranking (see app/core/quantization.py)
+    EXPECTATION_QUANTIZATION: str = "none" # "none", "int8" (memory backend) or "binary" (memory, or pgvector with the index from generate_embeddings.py --build-codes)
+    EXPECTATION_REDUCTION: str = "none" # Memory backend: "none", "pca" or "truncate" (Matryoshka-style leading dimensions)
+    EXPECTATION_REDUCED_DIM: int = 128
+    EXPECTATION_RERANK_CANDIDATES: int = 100 # First-pass candidates per sentence re-ranked with exact cosine distance
+
+    # Idempotent snippet results: replay resubmitted snippets (see app/core/results.py)
+    RESULT_STORE_ENABLED: bool = True
+    RESULT_STORE_AUTO_KEY: bool = False # Opt-in: also key snippets without an Idempotency-Key header by their text hash
+    RESULT_STORE_TTL_SECONDS: float = 24 * 3600
+    RESULT_STORE_MAX_ENTRIES: int = 10_000
+    RESULT_STORE_SQLITE_PATH: str = "" # Persistent tier shared by worker processes; empty = memory only
+
+    # Near-duplicate evidence detection: "off", "on" or "shadow" (see app/core/dedup.py)
+    DEDUP_MODE: str = "off"
+    DEDUP_WINDOW_DAYS: int = 365 # How long processed evidence is remembered per employee
+    DEDUP_MIN_SIMILARITY: float = 0.8 # Word-set Jaccard similarity at which a sentence counts as a near-duplicate
+    DEDUP_MAX_ENTRIES_PER_EMPLOYEE: int = 2000 # Oldest evidence is forgotten first
+
+    # Streaming document upload (POST /evaluation/upload: plain text, DOCX, PDF)
+    DOCUMENT_UPLOAD_MAX_BYTES: int = 50 * 1024 * 1024
+    DOCUMENT_SPOOL_MEMORY_BYTES: int = 4 * 1024 * 1024 # DOCX/PDF uploads above this are spooled to disk
+    DOCUMENT_MAX_SENTENCE_CHARS: int = 10_000 # Text without a sentence boundary is cut into pieces of this size
+    DOCUMENT_INFLIGHT_BATCHES: int = 2 # Sentence batches processed while the upload is still being read
+
+    # On-demand request profiling (?profile=true or X-Profile: 1 on /evaluation/process_snippet)
+    PROFILING_ENABLED: bool = False
+    PROFILING_TOKEN: str = "" # If set, profiled requests must also send X-Profile-Token with this value
+    PROFILING_TORCH_OPS: bool = True # Per-model torch operator timings (torch backends only)
+    PROFILING_TOP_FUNCTIONS: int = 40 # Rows kept in the function / operator tables
+    PROFILING_OUTPUT_DIR: str = "profiles" # Where .prof / .json reports are stored; empty = don't store
+
     model_config = SettingsConfigDict(env_file=env_path, extra='ignore')
 
 settings = Settings()
@@ -0,0 +1,222 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import deque
+
+import psycopg2
+
+from app.core import employee_index
+from app.core.config import settings
+from app.db.database import db_connection, get_db_cursor
+
+logger = logging.getLogger(__name__)
+
+# Modes (settings.DEDUP_MODE):
+#   "off"    - every sentence is processed (previous behaviour)
+#   "on"     - a sentence that is a near-duplicate of evidence already recorded for
+#              the same employee within DEDUP_WINDOW_DAYS (that employee is named, by
+#              a name the employee index resolves to them, and the word sets overlap
+#              by at least DEDUP_MIN_SIMILARITY Jaccard) skips NER, embedding,
+#              matching and insert
+#   "shadow" - processes everything but counts what "on" would have skipped
+MODE_OFF = "off"
+MODE_ON = "on"
+MODE_SHADOW = "shadow"
+
+# MinHash LSH: NUM_PERMUTATIONS hashes in bands of BAND_ROWS. Two sentences with
+# Jaccard 0.8 share a band with ~98% probability, at 0.5 ~40%, at 0.2 ~1%; every
+# candidate is then checked with the exact Jaccard similarity.
+NUM_PERMUTATIONS = 32
+BAND_ROWS = 4
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_PERMUTATIONS = [
+    (int.from_bytes(hashlib.blake2b(f"a{i}".encode(), digest_size=8).digest(), "little") % (_PRIME - 1) + 1,
+     int.from_bytes(hashlib.blake2b(f"b{i}".encode(), digest_size=8).digest(), "little") % _PRIME)
+    for i in range(NUM_PERMUTATIONS)
+]
+_WORD = re.compile(r"\w+")
+_NON_ALNUM = re.compile(r"[\W_]+")
+
+def _compact(text: str) -> str:
+    return _NON_ALNUM.sub("", text.casefold())
+
+def features(text: str) -> frozenset[int]:
+    """The sentence's casefolded words, hashed to 32 bits."""
+    return frozenset(
+        int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=4).digest(), "little")
+        for word in _WORD.findall(text.casefold())
+    )
+
+def _minhash(feature_set: frozenset[int]) -> list[int]:
+    if not feature_set:
+        return [_MAX_HASH] * NUM_PERMUTATIONS
+    return [min(((a * h + b) % _PRIME) & _MAX_HASH for h in feature_set) for a, b in _PERMUTATIONS]
+
+def _names_employee(employee_id: int, compact_sentence: str) -> bool:
+    return any(_compact(name) in compact_sentence for name in employee_index.names_of(employee_id))
+
+def jaccard(left: frozenset[int], right: frozenset[int]) -> float:
+    if not left and not right:
+        return 1.0
+    return len(left & right) / len(left | right)
+
+class EvidenceIndex:
+    """
+    Per-employee word sets of processed evidence, with a MinHash LSH band index
+    so near-duplicate candidates are found without comparing against every entry.
+    """
+
+    def __init__(self, min_similarity: float, window_seconds: float, max_per_employee: int):
+        self.min_similarity = min_similarity
+        self.window_seconds = window_seconds
+        self.max_per_employee = max(1, max_per_employee)
+        self._entries: dict[int, tuple[frozenset[int], tuple, int, float]] = {} # id -> (features, bands, employee_id, seen_at)
+        self._by_employee: dict[int, deque[int]] = {}
+        self._buckets: dict[tuple, set[int]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _bands(feature_set: frozenset[int]) -> tuple:
+        hashes = _minhash(feature_set)
+        return tuple((band, *hashes[band * BAND_ROWS:(band + 1) * BAND_ROWS]) for band in range(NUM_PERMUTATIONS // BAND_ROWS))
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        for key in entry[1]:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def add(self, feature_set: frozenset[int], employee_id: int, seen_at: float | None = None):
+        seen_at = time.time() if seen_at is None else seen_at
+        bands = self._bands(feature_set)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (feature_set, bands, employee_id, seen_at)
+            for key in bands:
+                self._buckets.setdefault(key, set()).add(entry_id)
+            ids = self._by_employee.setdefault(employee_id, deque())
+            ids.append(entry_id)
+            cutoff = time.time() - self.window_seconds
+            while ids and (len(ids) > self.max_per_employee or self._entries[ids[0]][3] < cutoff):
+                self._remove(ids.popleft())
+
+    def find(self, feature_set: frozenset[int], sentence: str) -> int | None:
+        """Employee ID of a near-duplicate entry whose employee is named in `sentence`, else None."""
+        bands = self._bands(feature_set)
+        cutoff = time.time() - self.window_seconds
+        employee_ids = set()
+        with self._lock:
+            for key in bands:
+                for entry_id in self._buckets.get(key, ()):
+                    entry_features, _, employee_id, seen_at = self._entries[entry_id]
+                    if seen_at >= cutoff and jaccard(entry_features, feature_set) >= self.min_similarity:
+                        employee_ids.add(employee_id)
+        compact = _compact(sentence)
+        for employee_id in employee_ids:
+            if _names_employee(employee_id, compact):
+                return employee_id
+        return None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def employee_count(self) -> int:
+        with self._lock:
+            return sum(1 for ids in self._by_employee.values() if ids)
+
+# --- Dedup State ---
+_index = EvidenceIndex(settings.DEDUP_MIN_SIMILARITY, settings.DEDUP_WINDOW_DAYS * 86400, settings.DEDUP_MAX_ENTRIES_PER_EMPLOYEE)
+_stats_lock = threading.Lock() # Updated from the pipeline's stage threads
+_stats = {"sentences_checked": 0, "sentences_skipped": 0, "shadow_would_skip": 0, "entries_remembered": 0, "entries_loaded": 0}
+# -------------------
+
+def is_active() -> bool:
+    return settings.DEDUP_MODE != MODE_OFF
+
+def split_sentences(sentences: list[str]) -> tuple[list[str], list[str]]:
+    """
+    Returns (to_process, near_duplicates). In "shadow" mode nothing is skipped,
+    but the sentences that would have been are counted.
+    """
+    if not is_active() or not sentences:
+        return sentences, []
+    to_process, duplicates = [], []
+    for sentence in sentences:
+        (duplicates if _index.find(features(sentence), sentence) is not None else to_process).append(sentence)
+    shadow = settings.DEDUP_MODE == MODE_SHADOW
+    with _stats_lock:
+        _stats["sentences_checked"] += len(sentences)
+        _stats["shadow_would_skip" if shadow else "sentences_skipped"] += len(duplicates)
+    if shadow:
+        return sentences, []
+    return to_process, duplicates
+
+def remember(sentence: str, employee_id: int):
+    """Adds evidence recorded for an employee, so later rewordings of it are recognized."""
+    if is_active():
+        _index.add(features(sentence), employee_id)
+        with _stats_lock:
+            _stats["entries_remembered"] += 1
+
+def load_recent_evidence() -> bool:
+    """
+    Seeds the index from EmployeeAchievements rows inside the window, so evidence
+    recorded before a restart is still recognized. Returns True on success.
+    """
+    sql = """
+        SELECT employee_id, evidence_snippet,
+               EXTRACT(EPOCH FROM date_achieved::timestamp) AS seen_at
+        FROM EmployeeAchievements
+        WHERE date_achieved >= CURRENT_DATE - %s::int
+        ORDER BY date_achieved;
+    """
+    cur = None
+    try:
+        with db_connection() as conn:
+            if not conn:
+                logger.error("DB connection failed. Evidence dedup index starts empty.")
+                return False
+            cur = get_db_cursor(conn)
+            cur.execute(sql, (settings.DEDUP_WINDOW_DAYS,))
+            rows = cur.fetchall()
+    except psycopg2.Error as e:
+        logger.error(f"Database error loading recent evidence for dedup: {e}")
+        return False
+    finally:
+        if cur: cur.close()
+    for row in rows:
+        _index.add(features(row["evidence_snippet"]), row["employee_id"], float(row["seen_at"]))
+    with _stats_lock:
+        _stats["entries_loaded"] = len(rows)
+    logger.info(f"Evidence dedup index seeded with {len(rows)} achievements from the last {settings.DEDUP_WINDOW_DAYS} days.")
+    return True
+
+def start():
+    """Called on application startup."""
+    if is_active():
+        load_recent_evidence()
+
+def get_dedup_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    skipped = stats["sentences_skipped"]
+    return {
+        "mode": settings.DEDUP_MODE,
+        "entries": len(_index),
+        "employees": _index.employee_count(),
+        # Every skipped sentence had resolved to an employee before, so each one
+        # also saves an embedding, an expectation match and any insert.
+        "ner_calls_avoided": skipped,
+        "embeddings_avoided": skipped,
+        **stats,
+    }
@@ -0,0 +1,206 @@
+import asyncio
+import codecs
+import logging
+import re
+import tempfile
+import zipfile
+from collections import deque
+from typing import AsyncIterator, Iterator
+from xml.etree import ElementTree
+
+import nltk
+
+from app.core.config import settings
+from app.core import executor, pipeline
+
+logger = logging.getLogger(__name__)
+
+FORMAT_TEXT = "txt"
+FORMAT_DOCX = "docx"
+FORMAT_PDF = "pdf"
+
+_CONTENT_TYPES = {
+    "text/plain": FORMAT_TEXT,
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": FORMAT_DOCX,
+    "application/pdf": FORMAT_PDF,
+}
+_WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_LINE = re.compile(r"[^\n]+")
+
+class UnsupportedDocumentError(Exception):
+    pass
+
+class DocumentTooLargeError(Exception):
+    pass
+
+# --- Sentence Tokenizer ---
+_tokenizer = None
+
+def load_tokenizer():
+    """Loads the Punkt sentence tokenizer once (called on application startup)."""
+    global _tokenizer
+    if _tokenizer is not None:
+        return _tokenizer
+    try:
+        try:
+            from nltk.tokenize import PunktTokenizer # nltk >= 3.8.2 ("punkt_tab" data)
+            _tokenizer = PunktTokenizer("english")
+        except ImportError:
+            _tokenizer = nltk.data.load("tokenizers/punkt/english.pickle")
+        logger.info("Punkt sentence tokenizer loaded.")
+    except Exception as e:
+        logger.error(f"Failed to load the Punkt sentence tokenizer: {e}. Uploads will be segmented by line.")
+    return _tokenizer
+
+class IncrementalSegmenter:
+    """
+    Splits text that arrives in pieces into sentences. Every sentence except the
+    last one in the buffer is complete (Punkt has already seen the start of the
+    next sentence); the last one is kept until more text or flush() arrives, so
+    sentences spanning a chunk boundary come out whole. Memory is bounded by the
+    longest sentence (capped at DOCUMENT_MAX_SENTENCE_CHARS).
+    """
+
+    def __init__(self, tokenizer=None):
+        self._tokenizer = tokenizer if tokenizer is not None else load_tokenizer()
+        self._buffer = ""
+
+    def _spans(self, text: str) -> list[tuple[int, int]]:
+        if self._tokenizer is None:
+            return [m.span() for m in _LINE.finditer(text)]
+        return list(self._tokenizer.span_tokenize(text))
+
+    def feed(self, text: str) -> list[str]:
+        self._buffer += text
+        spans = self._spans(self._buffer)
+        sentences = [self._buffer[start:end] for start, end in spans[:-1]]
+        if spans:
+            self._buffer = self._buffer[spans[-1][0]:]
+        if len(self._buffer) > settings.DOCUMENT_MAX_SENTENCE_CHARS:
+            # No boundary in sight: cut rather than buffer (and re-tokenize) without limit.
+            sentences.append(self._buffer)
+            self._buffer = ""
+        return [sentence for sentence in sentences if sentence.strip()]
+
+    def flush(self) -> list[str]:
+        sentences = [self._buffer[start:end] for start, end in self._spans(self._buffer)]
+        self._buffer = ""
+        return [sentence for sentence in sentences if sentence.strip()]
+
+# --- Text Extraction ---
+
+def detect_format(content_type: str | None, filename: str | None = None) -> str:
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in _CONTENT_TYPES:
+        return _CONTENT_TYPES[media_type]
+    extension = (filename or "").rsplit(".", 1)[-1].lower()
+    if extension in (FORMAT_TEXT, FORMAT_DOCX, FORMAT_PDF):
+        return extension
+    raise UnsupportedDocumentError(f"Unsupported document type '{media_type or extension}'; send text/plain, DOCX or PDF.")
+
+def iter_docx_text(file) -> Iterator[str]:
+    """Yields the text of each paragraph of a DOCX file, parsing document.xml incrementally."""
+    try:
+        archive = zipfile.ZipFile(file)
+        document = archive.open("word/document.xml")
+    except (zipfile.BadZipFile, KeyError) as e:
+        raise UnsupportedDocumentError(f"Not a valid DOCX file: {e}")
+    with archive, document:
+        for _, element in ElementTree.iterparse(document, events=("end",)):
+            if element.tag == f"{_WORD_NS}p":
+                yield "".join(node.text or "" for node in element.iter(f"{_WORD_NS}t")) + "\n"
+                element.clear()
+
+def iter_pdf_text(file) -> Iterator[str]:
+    """Yields the text of each PDF page (needs the optional `pypdf` package)."""
+    try:
+        from pypdf import PdfReader
+        from pypdf.errors import PdfReadError
+    except ImportError:
+        raise UnsupportedDocumentError("PDF uploads need the optional 'pypdf' package.")
+    try:
+        reader = PdfReader(file)
+        for page in reader.pages:
+            yield (page.extract_text() or "") + "\n"
+    except PdfReadError as e:
+        raise UnsupportedDocumentError(f"Not a valid PDF file: {e}")
+
+_EXTRACTORS = {FORMAT_DOCX: iter_docx_text, FORMAT_PDF: iter_pdf_text}
+
+# --- Upload Processing ---
+
+async def _text_pieces(chunks: AsyncIterator[bytes], doc_format: str, totals: dict) -> AsyncIterator[str]:
+    """
+    Turns uploaded bytes into text as they arrive. Plain text is decoded chunk by
+    chunk; DOCX and PDF keep their index at the end of the file, so they are
+    spooled (to disk above DOCUMENT_SPOOL_MEMORY_BYTES) and read once complete.
+    """
+    async def _bytes():
+        async for chunk in chunks:
+            totals["bytes_received"] += len(chunk)
+            if totals["bytes_received"] > settings.DOCUMENT_UPLOAD_MAX_BYTES:
+                raise DocumentTooLargeError(f"Upload exceeds DOCUMENT_UPLOAD_MAX_BYTES ({settings.DOCUMENT_UPLOAD_MAX_BYTES} bytes).")
+            yield chunk
+
+    if doc_format == FORMAT_TEXT:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        async for chunk in _bytes():
+            yield decoder.decode(chunk)
+        yield decoder.decode(b"", final=True)
+        return
+
+    with tempfile.SpooledTemporaryFile(max_size=settings.DOCUMENT_SPOOL_MEMORY_BYTES) as spool:
+        async for chunk in _bytes():
+            spool.write(chunk)
+        spool.seek(0)
+        pieces = _EXTRACTORS[doc_format](spool)
+        while (piece := await asyncio.to_thread(next, pieces, None)) is not None:
+            yield piece
+
+async def process_upload(chunks: AsyncIterator[bytes], doc_format: str) -> dict:
+    """
+    Runs the pipeline over an uploaded document while it is being received:
+    sentences are segmented incrementally and sent to the inference executor in
+    batches of PIPELINE_CHUNK_SENTENCES, with up to DOCUMENT_INFLIGHT_BATCHES
+    batches in flight while reading continues. Achievements are recorded batch by
+    batch; only the counts are kept, so memory does not grow with the document.
+
+    Returns:
+        dict: Bytes received plus the summed pipeline counts.
+    """
+    totals = {"bytes_received": 0, "sentences_total": 0, "sentences_prefiltered": 0, "sentences_deduplicated": 0,
+              "employee_sentences": 0, "matches": 0, "achievements_created": 0}
+    segmenter = IncrementalSegmenter()
+    pending: list[str] = []
+    inflight: deque[asyncio.Task] = deque()
+
+    async def _collect(task: asyncio.Task):
+        result = await task
+        for key in ("sentences_total", "sentences_prefiltered", "sentences_deduplicated", "employee_sentences", "matches", "achievements_created"):
+            totals[key] += getattr(result, key)
+
+    async def _submit(batch: list[str]):
+        while len(inflight) >= max(1, settings.DOCUMENT_INFLIGHT_BATCHES):
+            await _collect(inflight.popleft())
+        inflight.append(asyncio.create_task(executor.run_inference(pipeline.process_sentences_sync, batch)))
+
+    async def _add(sentences: list[str]):
+        pending.extend(sentences)
+        while len(pending) >= settings.PIPELINE_CHUNK_SENTENCES:
+            batch = pending[:settings.PIPELINE_CHUNK_SENTENCES]
+            del pending[:settings.PIPELINE_CHUNK_SENTENCES]
+            await _submit(batch)
+
+    try:
+        async for piece in _text_pieces(chunks, doc_format, totals):
+            await _add(segmenter.feed(piece))
+        await _add(segmenter.flush())
+        if pending:
+            await _submit(list(pending))
+        while inflight:
+            await _collect(inflight.popleft())
+    finally:
+        # On failure, batches already handed to the executor still finish; don't leave them unawaited.
+        if inflight:
+            await asyncio.gather(*inflight, return_exceptions=True)
+    return totals
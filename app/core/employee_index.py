@@ -0,0 +1,260 @@
+import json
+import logging
+import re
+import threading
+import time
+
+import psycopg2
+
+from app.core.config import settings
+from app.db.database import db_connection, get_db_cursor, run_notification_listener
+
+logger = logging.getLogger(__name__)
+
+# --- Index State ---
+# Normalized full name -> set of employee_ids (ambiguous if > 1)
+_full_names: dict[str, set[int]] = {}
+# Normalized first/last name alias -> set of employee_ids (ambiguous if > 1)
+_aliases: dict[str, set[int]] = {}
+# employee_id -> normalized full name (needed to undo entries on update/delete)
+_names_by_id: dict[int, str] = {}
+
+_index_lock = threading.Lock()
+# Bumped on every change so derived structures (e.g. the prefilter) know to rebuild.
+_version = 0
+_loaded = False
+_last_full_load = 0.0
+_refresher_thread = None
+_stop_event = threading.Event()
+_first_attempt = threading.Event() # Set once the refresher has tried to connect (and load) for the first time
+# -------------------
+
+_START_TIMEOUT_SECONDS = 30.0
+
+_SUBWORD_ARTIFACT = re.compile(r"\s*##")
+_NON_NAME_CHARS = re.compile(r"[^\w\s'-]")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_name(name: str) -> str:
+    """
+    Normalizes a person name for lookup: merges WordPiece '##' fragments left by
+    the NER tokenizer, drops stray punctuation, lowercases and collapses whitespace.
+    """
+    if not name:
+        return ""
+    name = _SUBWORD_ARTIFACT.sub("", name)
+    name = _NON_NAME_CHARS.sub(" ", name)
+    return _WHITESPACE.sub(" ", name).strip().casefold()
+
+def _name_aliases(normalized: str) -> set[str]:
+    """First and last token of a multi-token name."""
+    parts = normalized.split(" ")
+    if len(parts) < 2:
+        return set()
+    return {parts[0], parts[-1]}
+
+def _add_entry(employee_id: int, name: str):
+    normalized = normalize_name(name)
+    if not normalized:
+        return
+    _full_names.setdefault(normalized, set()).add(employee_id)
+    _names_by_id[employee_id] = normalized
+    for alias in _name_aliases(normalized):
+        _aliases.setdefault(alias, set()).add(employee_id)
+
+def _remove_entry(employee_id: int):
+    normalized = _names_by_id.pop(employee_id, None)
+    if normalized is None:
+        return
+    ids = _full_names.get(normalized)
+    if ids:
+        ids.discard(employee_id)
+        if not ids:
+            del _full_names[normalized]
+    for alias in _name_aliases(normalized):
+        ids = _aliases.get(alias)
+        if ids:
+            ids.discard(employee_id)
+            if not ids:
+                del _aliases[alias]
+
+def upsert_employee(employee_id: int, name: str):
+    """Adds or updates a single employee in the index."""
+    global _version
+    with _index_lock:
+        _remove_entry(employee_id)
+        _add_entry(employee_id, name)
+        _version += 1
+
+def remove_employee(employee_id: int):
+    """Removes a single employee from the index."""
+    global _version
+    with _index_lock:
+        _remove_entry(employee_id)
+        _version += 1
+
+def load_index() -> bool:
+    """
+    (Re)builds the whole index from the Employees table.
+
+    Returns:
+        True if the index was loaded, False otherwise (the previous index is kept).
+    """
+    global _full_names, _aliases, _names_by_id, _loaded, _last_full_load, _version
+    cur = None
+    try:
+        with db_connection() as conn:
+            if not conn:
+                logger.error("DB connection failed. Cannot load employee name index.")
+                return False
+            cur = get_db_cursor(conn)
+            cur.execute("SELECT employee_id, name FROM Employees;")
+            rows = cur.fetchall()
+    except psycopg2.Error as db_err:
+        logger.error(f"Database error loading employee name index: {db_err}")
+        return False
+    finally:
+        if cur: cur.close()
+
+    with _index_lock:
+        _full_names, _aliases, _names_by_id = {}, {}, {}
+        for row in rows:
+            _add_entry(row['employee_id'], row['name'])
+        _loaded = True
+        _last_full_load = time.monotonic()
+        _version += 1
+    logger.info(f"Employee name index loaded: {len(_names_by_id)} employees, {len(_aliases)} aliases.")
+    return True
+
+def is_loaded() -> bool:
+    return _loaded
+
+def version() -> int:
+    return _version
+
+def lookup_keys() -> tuple[int, list[str]]:
+    """
+    Returns (version, keys): every normalized string lookup() can resolve, i.e. the
+    unambiguous full names plus the unambiguous first/last-name aliases when
+    EMPLOYEE_INDEX_USE_ALIASES is on.
+    """
+    with _index_lock:
+        keys = [name for name, ids in _full_names.items() if len(ids) == 1]
+        if settings.EMPLOYEE_INDEX_USE_ALIASES:
+            keys.extend(alias for alias, ids in _aliases.items() if len(ids) == 1)
+        return _version, keys
+
+def lookup(name: str) -> int | None:
+    """
+    Resolves a (NER-extracted) name to an employee_id without touching the database.
+    Full-name matches win; otherwise a first/last-name alias is used when it
+    identifies exactly one employee. Ambiguous or unknown names return None
+    (a full name shared by several employees is not resolved through an alias).
+    """
+    normalized = normalize_name(name)
+    if not normalized:
+        return None
+    ids = _full_names.get(normalized)
+    if ids:
+        if len(ids) == 1:
+            return next(iter(ids))
+        logger.info(f"Name '{name}' is shared by employees {sorted(ids)}; not resolved.")
+        return None
+    if settings.EMPLOYEE_INDEX_USE_ALIASES:
+        ids = _aliases.get(normalized)
+        if ids and len(ids) == 1:
+            return next(iter(ids))
+    return None
+
+def names_of(employee_id: int) -> list[str]:
+    """
+    Normalized names lookup() resolves to `employee_id`: the full name and, when
+    EMPLOYEE_INDEX_USE_ALIASES is on, its unambiguous first/last-name aliases.
+    Empty for an unknown employee.
+    """
+    normalized = _names_by_id.get(employee_id)
+    if normalized is None:
+        return []
+    names = [normalized] if _full_names.get(normalized) == {employee_id} else []
+    if settings.EMPLOYEE_INDEX_USE_ALIASES:
+        names.extend(alias for alias in sorted(_name_aliases(normalized)) if alias not in _full_names and _aliases.get(alias) == {employee_id})
+    return names
+
+def get_index_stats() -> dict:
+    return {
+        "loaded": _loaded,
+        "employees": len(_names_by_id),
+        "aliases": len(_aliases),
+        "ambiguous_names": sum(1 for ids in _full_names.values() if len(ids) > 1),
+        "ambiguous_aliases": sum(1 for ids in _aliases.values() if len(ids) > 1),
+        "seconds_since_full_load": round(time.monotonic() - _last_full_load, 1) if _loaded else None,
+    }
+
+# --- Incremental Refresh ---
+
+def _apply_notification(payload: str):
+    """
+    Applies one change notification. The payload is the JSON emitted by the
+    trigger installed by scripts/setup_employee_notify.py:
+        {"op": "INSERT" | "UPDATE" | "DELETE", "employee_id": 1, "name": "..."}
+    """
+    try:
+        change = json.loads(payload)
+        op = change["op"]
+        employee_id = int(change["employee_id"])
+    except (ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Ignoring malformed employee change notification '{payload}': {e}")
+        return
+    if op == "DELETE":
+        remove_employee(employee_id)
+    else:
+        upsert_employee(employee_id, change.get("name") or "")
+    logger.debug(f"Employee name index updated from notification: {op} employee_id={employee_id}")
+
+def _on_tick():
+    _first_attempt.set()
+    _reload_if_stale()
+
+def _reload_if_stale():
+    if time.monotonic() - _last_full_load >= settings.EMPLOYEE_INDEX_REFRESH_SECONDS:
+        load_index()
+
+def _refresh_loop():
+    """
+    Background loop: applies row-level changes from LISTEN/NOTIFY as they arrive and
+    rebuilds the whole index every EMPLOYEE_INDEX_REFRESH_SECONDS, so changes made
+    without the trigger (or missed while disconnected) are picked up too.
+    """
+    run_notification_listener(
+        settings.EMPLOYEE_INDEX_NOTIFY_CHANNEL,
+        _apply_notification,
+        _stop_event,
+        # The full load runs once LISTEN is in place, so no change can fall in between.
+        on_connect=load_index,
+        on_tick=_on_tick,
+    )
+
+def start():
+    """
+    Starts the background refresher, which loads the index once it is listening
+    for changes, and waits for that first load. Called on application startup.
+    """
+    global _refresher_thread
+    if not settings.EMPLOYEE_INDEX_ENABLED:
+        logger.info("Employee name index disabled; employee lookups will query the database.")
+        return
+    if _refresher_thread is None or not _refresher_thread.is_alive():
+        _stop_event.clear()
+        _first_attempt.clear()
+        _refresher_thread = threading.Thread(target=_refresh_loop, name="employee-index-refresh", daemon=True)
+        _refresher_thread.start()
+    if not _first_attempt.wait(timeout=_START_TIMEOUT_SECONDS):
+        logger.warning("Employee name index not loaded yet; lookups query the database until it is.")
+
+def stop():
+    """Stops the background refresher. Called on application shutdown."""
+    global _refresher_thread
+    _stop_event.set()
+    if _refresher_thread is not None:
+        _refresher_thread.join(timeout=5)
+        _refresher_thread = None
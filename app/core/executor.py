@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from app.core.config import settings
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+# --- Executor State ---
+_executor: Executor | None = None
+_slots: asyncio.Semaphore | None = None
+_stats = {"submitted_total": 0, "running": 0, "waiting": 0}
+# ----------------------
+
+def _init_process_worker():
+    """
+    Initializer for process-pool workers: each worker loads its own copy of the
+    models and the in-memory indexes, since none of that state crosses processes.
+    """
+    from app.models import loader
+    from app.core import employee_index, expectation_index
+    from app.core.config import settings
+    from app.db import database
+
+    loader.startup_load_models()
+    loader.warmup_models(settings.STARTUP_WARMUP_BATCHES)
+    database.init_db_pool()
+    employee_index.start()
+    expectation_index.start()
+
+def start():
+    """Creates the inference executor selected by settings. Called on application startup."""
+    global _executor, _slots
+    if _executor is not None:
+        return _executor
+    if settings.INFERENCE_EXECUTOR == "process":
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.INFERENCE_WORKERS,
+            # spawn, not fork: forking a process that already initialized torch/CUDA is unsafe.
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_process_worker,
+        )
+    else:
+        _executor = ThreadPoolExecutor(max_workers=settings.INFERENCE_WORKERS, thread_name_prefix="inference")
+    _slots = asyncio.Semaphore(settings.INFERENCE_MAX_CONCURRENCY)
+    logger.info(
+        f"Inference executor started ({settings.INFERENCE_EXECUTOR}, workers={settings.INFERENCE_WORKERS}, "
+        f"max concurrency={settings.INFERENCE_MAX_CONCURRENCY})."
+    )
+    return _executor
+
+def shutdown():
+    """Waits for running inference to finish and stops the executor. Called on application shutdown."""
+    global _executor, _slots
+    if _executor is None:
+        return
+    _executor.shutdown(wait=True, cancel_futures=True)
+    _executor = None
+    _slots = None
+    logger.info("Inference executor stopped.")
+
+async def run_inference(func, *args):
+    """
+    Runs `func(*args)` on the inference executor and awaits the result without
+    blocking the event loop. At most INFERENCE_MAX_CONCURRENCY calls run or queue
+    on the executor at once; further callers wait here. With the process executor
+    `func` and its arguments must be picklable (module-level functions).
+    """
+    if _executor is None:
+        start()
+    slots = _slots
+    _stats["waiting"] += 1
+    try:
+        await slots.acquire()
+    finally:
+        _stats["waiting"] -= 1
+    _stats["submitted_total"] += 1
+    _stats["running"] += 1
+    try:
+        future = asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+    except BaseException:
+        _release(slots)
+        raise
+    # The slot is freed when the work finishes, not when this caller stops waiting:
+    # a cancelled request (client disconnect, timeout) cannot stop work already on
+    # the executor, so it keeps counting against INFERENCE_MAX_CONCURRENCY.
+    future.add_done_callback(lambda done: _release(slots, done))
+    return await asyncio.shield(future)
+
+def _release(slots: asyncio.Semaphore, future: asyncio.Future | None = None):
+    _stats["running"] -= 1
+    slots.release()
+    if future is not None and not future.cancelled():
+        future.exception() # Retrieved, so work whose caller went away doesn't log "never retrieved"
+
+def _executor_gauges() -> list[tuple]:
+    return [
+        ("inference_executor_running", "Inference calls currently running on the executor.", {}, _stats["running"]),
+        ("inference_executor_waiting", "Inference calls queued behind INFERENCE_MAX_CONCURRENCY.", {}, _stats["waiting"]),
+    ]
+
+metrics.register_gauges(_executor_gauges)
+
+def get_executor_stats() -> dict:
+    return {
+        "kind": settings.INFERENCE_EXECUTOR,
+        "workers": settings.INFERENCE_WORKERS,
+        "max_concurrency": settings.INFERENCE_MAX_CONCURRENCY,
+        "started": _executor is not None,
+        **_stats,
+    }
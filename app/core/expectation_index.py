@@ -0,0 +1,198 @@
+import logging
+import os
+import socket
+import threading
+import time
+
+import numpy as np
+import psycopg2
+
+from app.core.config import settings
+from app.core import quantization
+from app.db.database import db_connection, get_db_cursor, notify_channel, run_notification_listener
+
+logger = logging.getLogger(__name__)
+
+# --- Index State ---
+# Swapped atomically as a tuple on reload so readers never see a half-built index:
+# (expectation_ids int64[n], L2-normalized float32 matrix [n, dim], C-contiguous,
+#  quantization.CompactCodes for the two-stage search or None)
+_index = (np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32), None)
+_loaded = False
+_last_full_load = 0.0
+_reload_lock = threading.Lock()
+_refresher_thread = None
+_stop_event = threading.Event()
+_first_attempt = threading.Event() # Set once the refresher has tried to connect (and load) for the first time
+# -------------------
+
+_START_TIMEOUT_SECONDS = 30.0
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    # Zero vectors stay zero (pgvector reports NaN distance for them; we report 1.0).
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def _build_codes(matrix: np.ndarray) -> quantization.CompactCodes | None:
+    if settings.EXPECTATION_QUANTIZATION == quantization.QUANTIZATION_NONE or len(matrix) == 0:
+        return None
+    started = time.perf_counter()
+    codes = quantization.CompactCodes(
+        matrix, settings.EXPECTATION_QUANTIZATION, settings.EXPECTATION_REDUCTION, settings.EXPECTATION_REDUCED_DIM,
+    )
+    logger.info(
+        f"Expectation codes built: {settings.EXPECTATION_QUANTIZATION}, {codes.dimension} dimensions "
+        f"({settings.EXPECTATION_REDUCTION} reduction), {codes.nbytes} bytes vs {matrix.nbytes} float32, "
+        f"{time.perf_counter() - started:.2f}s."
+    )
+    return codes
+
+def load_index() -> bool:
+    """
+    (Re)loads every expectation embedding into memory.
+
+    Returns:
+        True if the index was loaded, False otherwise (the previous index is kept).
+    """
+    global _index, _loaded, _last_full_load
+    with _reload_lock:
+        cur = None
+        try:
+            with db_connection() as conn:
+                if not conn:
+                    logger.error("DB connection failed. Cannot load expectation index.")
+                    return False
+                cur = get_db_cursor(conn)
+                # Cast to real[] so psycopg2 returns Python lists instead of pgvector text.
+                cur.execute("SELECT expectation_id, embedding::real[] AS embedding FROM Expectations WHERE embedding IS NOT NULL;")
+                rows = cur.fetchall()
+        except psycopg2.Error as db_err:
+            logger.error(f"Database error loading expectation index: {db_err}")
+            return False
+        finally:
+            if cur: cur.close()
+
+        if rows:
+            ids = np.fromiter((row['expectation_id'] for row in rows), dtype=np.int64, count=len(rows))
+            matrix = _normalize_rows(np.array([row['embedding'] for row in rows], dtype=np.float32))
+        else:
+            ids = np.empty(0, dtype=np.int64)
+            matrix = np.empty((0, 0), dtype=np.float32)
+        try:
+            codes = _build_codes(matrix)
+        except ValueError as e:
+            logger.error(f"Cannot build expectation codes: {e}. Using exact search.")
+            codes = None
+        _index = (ids, matrix, codes)
+        _loaded = True
+        _last_full_load = time.monotonic()
+    logger.info(f"Expectation index loaded: {len(ids)} expectations, matrix shape {matrix.shape}.")
+    return True
+
+def is_loaded() -> bool:
+    return _loaded
+
+def search(embeddings, k: int = 1) -> list[list[tuple[int, float]]]:
+    """
+    Scores a batch of sentence embeddings against every expectation with a single
+    matrix multiply and returns, per sentence, the top-k (expectation_id, distance)
+    pairs sorted by ascending cosine distance (same semantics as pgvector's <=>).
+    With EXPECTATION_QUANTIZATION set, only the EXPECTATION_RERANK_CANDIDATES
+    expectations closest by their compact codes are scored exactly.
+    """
+    ids, matrix, codes = _index
+    queries = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+    if len(ids) == 0 or queries.shape[0] == 0:
+        return [[] for _ in range(queries.shape[0])]
+
+    queries = _normalize_rows(queries)
+    if codes is not None:
+        top, similarities = quantization.two_stage_search(matrix, codes, queries, k, settings.EXPECTATION_RERANK_CANDIDATES)
+    else:
+        top, similarities = quantization.exact_search(matrix, queries, k)
+    distances = 1.0 - similarities
+
+    return [
+        [(int(ids[j]), float(d)) for j, d in zip(row_idx, row_dist)]
+        for row_idx, row_dist in zip(top, distances)
+    ]
+
+def get_index_stats() -> dict:
+    ids, matrix, codes = _index
+    return {
+        "loaded": _loaded,
+        "expectations": len(ids),
+        "dimension": matrix.shape[1] if matrix.ndim == 2 else 0,
+        "bytes": int(matrix.nbytes),
+        "quantization": settings.EXPECTATION_QUANTIZATION,
+        "code_dimension": codes.dimension if codes is not None else None,
+        "code_bytes": codes.nbytes if codes is not None else 0,
+        "rerank_candidates": settings.EXPECTATION_RERANK_CANDIDATES if codes is not None else None,
+        "seconds_since_full_load": round(time.monotonic() - _last_full_load, 1) if _loaded else None,
+    }
+
+# --- Hot Reload ---
+
+def _process_tag() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def notify_reload(source: str):
+    """Asks every listening server process to reload; this process's own listener skips it."""
+    notify_channel(settings.EXPECTATION_INDEX_NOTIFY_CHANNEL, f"{source}@{_process_tag()}")
+
+def _on_notify(payload: str):
+    if payload.partition("@")[2] == _process_tag():
+        return # Sent by notify_reload() in this process, which has reloaded already.
+    load_index()
+
+def _on_tick():
+    _first_attempt.set()
+    _reload_if_stale()
+
+def _reload_if_stale():
+    if settings.EXPECTATION_INDEX_REFRESH_SECONDS > 0 and time.monotonic() - _last_full_load >= settings.EXPECTATION_INDEX_REFRESH_SECONDS:
+        load_index()
+
+def _refresh_loop():
+    """
+    Reloads the matrix whenever a notification arrives on EXPECTATION_INDEX_NOTIFY_CHANNEL
+    (sent by scripts/generate_embeddings.py and the admin reload endpoint), and
+    periodically as a fallback.
+    """
+    run_notification_listener(
+        settings.EXPECTATION_INDEX_NOTIFY_CHANNEL,
+        _on_notify,
+        _stop_event,
+        # The full load runs once LISTEN is in place, so no change can fall in between.
+        on_connect=load_index,
+        on_tick=_on_tick,
+    )
+
+def start():
+    """
+    Starts the background reloader when the memory backend is selected; it loads
+    the index once it is listening for changes, and this waits for that first load.
+    """
+    global _refresher_thread
+    if settings.EXPECTATION_MATCH_BACKEND != "memory":
+        logger.info(f"Expectation matching uses the '{settings.EXPECTATION_MATCH_BACKEND}' backend; in-memory index not loaded.")
+        if settings.EXPECTATION_QUANTIZATION == quantization.QUANTIZATION_INT8 or settings.EXPECTATION_REDUCTION != quantization.REDUCTION_NONE:
+            logger.warning("int8 codes and dimension reduction apply to the memory backend only; pgvector supports EXPECTATION_QUANTIZATION=binary.")
+        return
+    if _refresher_thread is None or not _refresher_thread.is_alive():
+        _stop_event.clear()
+        _first_attempt.clear()
+        _refresher_thread = threading.Thread(target=_refresh_loop, name="expectation-index-refresh", daemon=True)
+        _refresher_thread.start()
+    if not _first_attempt.wait(timeout=_START_TIMEOUT_SECONDS):
+        logger.warning("Expectation index not loaded yet; matching uses pgvector until it is.")
+
+def stop():
+    """Stops the background reloader. Called on application shutdown."""
+    global _refresher_thread
+    _stop_event.set()
+    if _refresher_thread is not None:
+        _refresher_thread.join(timeout=5)
+        _refresher_thread = None
@@ -0,0 +1,371 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import psycopg2
+
+from app.core import executor, pipeline
+from app.core.config import settings
+from app.db.database import db_connection, get_db_cursor
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+_INTERRUPTED_ERROR = "Interrupted: the job was still running after JOB_LEASE_SECONDS (its worker stopped); achievements recorded so far were kept."
+
+# Columns returned to callers (the submitted text is only read by workers).
+JOB_FIELDS = (
+    "job_id", "status", "sentences_total", "sentences_processed", "employee_sentences",
+    "matches", "achievements_created", "cancel_requested", "error",
+    "created_at", "started_at", "finished_at",
+)
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+class JobStore:
+    """
+    Storage interface for evaluation jobs. Implementations must make `claim_next`
+    atomic, so that several workers (or nodes) never pick up the same job.
+    All methods are blocking; call them through asyncio.to_thread.
+    """
+
+    def setup(self):
+        raise NotImplementedError
+
+    def create(self, text: str) -> dict:
+        raise NotImplementedError
+
+    def get(self, job_id: str) -> dict | None:
+        raise NotImplementedError
+
+    def claim_next(self) -> tuple[dict, str] | None:
+        """Marks the oldest queued job as running and returns (job, text)."""
+        raise NotImplementedError
+
+    def update(self, job_id: str, **fields):
+        raise NotImplementedError
+
+    def request_cancel(self, job_id: str) -> dict | None:
+        """Cancels a queued job outright, or flags a running one for cancellation."""
+        raise NotImplementedError
+
+    def fail_stale(self, lease_seconds: float) -> int:
+        """
+        Marks jobs started more than `lease_seconds` ago and still running (their
+        worker crashed or was killed) as failed. They are not requeued: the
+        achievements of the chunks already processed are recorded, and a rerun
+        would record them again. Returns the number of jobs failed.
+        """
+        raise NotImplementedError
+
+class SQLiteJobStore(JobStore):
+    """
+    Single-node store. JOB_SQLITE_PATH=':memory:' keeps jobs in-process only; a
+    file path can be shared by the worker processes of one host (serve.py).
+    """
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL;") # Readers don't wait for the claiming writer
+        self._lock = threading.Lock()
+
+    def setup(self):
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS evaluation_jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    sentences_total INTEGER NOT NULL DEFAULT 0,
+                    sentences_processed INTEGER NOT NULL DEFAULT 0,
+                    employee_sentences INTEGER NOT NULL DEFAULT 0,
+                    matches INTEGER NOT NULL DEFAULT 0,
+                    achievements_created INTEGER NOT NULL DEFAULT 0,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT
+                );
+            """)
+
+    def _row(self, row) -> dict | None:
+        if row is None:
+            return None
+        job = {field: row[field] for field in JOB_FIELDS}
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def create(self, text: str) -> dict:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO evaluation_jobs (job_id, status, text, created_at) VALUES (?, ?, ?, ?);",
+                (job_id, JOB_QUEUED, text, _now().isoformat()),
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM evaluation_jobs WHERE job_id = ?;", (job_id,)).fetchone()
+        return self._row(row)
+
+    def claim_next(self) -> tuple[dict, str] | None:
+        # BEGIN IMMEDIATE takes the database write lock before the SELECT, so
+        # processes sharing the file cannot both claim the same queued job
+        # (the thread lock only covers this connection).
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE;")
+            try:
+                row = self._conn.execute(
+                    "SELECT job_id, text FROM evaluation_jobs WHERE status = ? ORDER BY created_at LIMIT 1;", (JOB_QUEUED,)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE evaluation_jobs SET status = ?, started_at = ? WHERE job_id = ? AND status = ?;",
+                        (JOB_RUNNING, _now().isoformat(), row["job_id"], JOB_QUEUED),
+                    )
+                    claimed = self._conn.execute("SELECT * FROM evaluation_jobs WHERE job_id = ?;", (row["job_id"],)).fetchone()
+                self._conn.execute("COMMIT;")
+            except BaseException:
+                self._conn.execute("ROLLBACK;")
+                raise
+        if row is None:
+            return None
+        return self._row(claimed), row["text"]
+
+    def update(self, job_id: str, **fields):
+        fields = {k: (v.isoformat() if isinstance(v, datetime) else v) for k, v in fields.items()}
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE evaluation_jobs SET {assignments} WHERE job_id = ?;", (*fields.values(), job_id))
+
+    def request_cancel(self, job_id: str) -> dict | None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE evaluation_jobs SET status = ?, cancel_requested = 1, finished_at = ? WHERE job_id = ? AND status = ?;",
+                (JOB_CANCELLED, _now().isoformat(), job_id, JOB_QUEUED),
+            )
+            self._conn.execute(
+                "UPDATE evaluation_jobs SET cancel_requested = 1 WHERE job_id = ? AND status = ?;",
+                (job_id, JOB_RUNNING),
+            )
+        return self.get(job_id)
+
+    def fail_stale(self, lease_seconds: float) -> int:
+        cutoff = (_now() - timedelta(seconds=lease_seconds)).isoformat() # Same ISO format as started_at, so text order is time order
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE evaluation_jobs SET status = ?, error = ?, finished_at = ? WHERE status = ? AND started_at < ?;",
+                (JOB_FAILED, _INTERRUPTED_ERROR, _now().isoformat(), JOB_RUNNING, cutoff),
+            ).rowcount
+
+class PostgresJobStore(JobStore):
+    """Multi-node store: jobs live in the EvaluationJobs table and are claimed with SKIP LOCKED."""
+
+    def setup(self):
+        with db_connection() as conn:
+            if not conn:
+                raise RuntimeError("DB connection failed. Cannot set up EvaluationJobs table.")
+            with conn.cursor() as cur:
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS EvaluationJobs (
+                        job_id TEXT PRIMARY KEY,
+                        status TEXT NOT NULL,
+                        text TEXT NOT NULL,
+                        sentences_total INTEGER NOT NULL DEFAULT 0,
+                        sentences_processed INTEGER NOT NULL DEFAULT 0,
+                        employee_sentences INTEGER NOT NULL DEFAULT 0,
+                        matches INTEGER NOT NULL DEFAULT 0,
+                        achievements_created INTEGER NOT NULL DEFAULT 0,
+                        cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+                        error TEXT,
+                        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                        started_at TIMESTAMPTZ,
+                        finished_at TIMESTAMPTZ
+                    );
+                    CREATE INDEX IF NOT EXISTS evaluationjobs_queued_idx
+                        ON EvaluationJobs (created_at) WHERE status = 'queued';
+                """)
+            conn.commit()
+
+    def _execute(self, sql: str, params: tuple, fetch: bool = True):
+        cur = None
+        try:
+            with db_connection() as conn:
+                if not conn:
+                    raise RuntimeError("DB connection failed during job store operation.")
+                cur = get_db_cursor(conn)
+                cur.execute(sql, params)
+                row = cur.fetchone() if fetch else None
+                conn.commit()
+                return row
+        finally:
+            if cur: cur.close()
+
+    def _row(self, row) -> dict | None:
+        if row is None:
+            return None
+        return {field: row[field] for field in JOB_FIELDS}
+
+    def create(self, text: str) -> dict:
+        row = self._execute(
+            "INSERT INTO EvaluationJobs (job_id, status, text) VALUES (%s, %s, %s) RETURNING *;",
+            (uuid.uuid4().hex, JOB_QUEUED, text),
+        )
+        return self._row(row)
+
+    def get(self, job_id: str) -> dict | None:
+        return self._row(self._execute("SELECT * FROM EvaluationJobs WHERE job_id = %s;", (job_id,)))
+
+    def claim_next(self) -> tuple[dict, str] | None:
+        row = self._execute("""
+            UPDATE EvaluationJobs SET status = %s, started_at = now()
+            WHERE job_id = (
+                SELECT job_id FROM EvaluationJobs
+                WHERE status = %s
+                ORDER BY created_at
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            )
+            RETURNING *;
+        """, (JOB_RUNNING, JOB_QUEUED))
+        if row is None:
+            return None
+        return self._row(row), row["text"]
+
+    def update(self, job_id: str, **fields):
+        assignments = ", ".join(f"{column} = %s" for column in fields)
+        self._execute(f"UPDATE EvaluationJobs SET {assignments} WHERE job_id = %s;", (*fields.values(), job_id), fetch=False)
+
+    def request_cancel(self, job_id: str) -> dict | None:
+        row = self._execute("""
+            UPDATE EvaluationJobs
+            SET cancel_requested = TRUE,
+                status = CASE WHEN status = %s THEN %s ELSE status END,
+                finished_at = CASE WHEN status = %s THEN now() ELSE finished_at END
+            WHERE job_id = %s
+            RETURNING *;
+        """, (JOB_QUEUED, JOB_CANCELLED, JOB_QUEUED, job_id))
+        return self._row(row)
+
+    def fail_stale(self, lease_seconds: float) -> int:
+        row = self._execute("""
+            WITH failed AS (
+                UPDATE EvaluationJobs SET status = %s, error = %s, finished_at = now()
+                WHERE status = %s AND started_at < now() - make_interval(secs => %s)
+                RETURNING 1
+            )
+            SELECT COUNT(*) AS failed FROM failed;
+        """, (JOB_FAILED, _INTERRUPTED_ERROR, JOB_RUNNING, lease_seconds))
+        return row["failed"]
+
+# --- Job Store & Workers ---
+store: JobStore | None = None
+_workers: list[asyncio.Task] = []
+_wakeup: asyncio.Event | None = None
+
+def _create_store() -> JobStore:
+    if settings.JOB_STORE == "postgres":
+        return PostgresJobStore()
+    return SQLiteJobStore(settings.JOB_SQLITE_PATH)
+
+async def _run_job(job: dict, text: str):
+    job_id = job["job_id"]
+    logger.info(f"Job {job_id}: started.")
+    try:
+        sentences = await executor.run_inference(pipeline.segment_sentences, text)
+        sentences = [sentence for sentence in sentences if sentence.strip()]
+        await asyncio.to_thread(store.update, job_id, sentences_total=len(sentences))
+
+        totals = {"sentences_processed": 0, "employee_sentences": 0, "matches": 0, "achievements_created": 0}
+        for start in range(0, len(sentences), settings.JOB_CHUNK_SENTENCES):
+            current = await asyncio.to_thread(store.get, job_id)
+            if current and current["cancel_requested"]:
+                # Achievements recorded by earlier chunks are kept.
+                await asyncio.to_thread(store.update, job_id, status=JOB_CANCELLED, finished_at=_now())
+                logger.info(f"Job {job_id}: cancelled after {totals['sentences_processed']} sentences.")
+                return
+            chunk = sentences[start:start + settings.JOB_CHUNK_SENTENCES]
+            result = await executor.run_inference(pipeline.process_sentences_sync, chunk)
+            totals["sentences_processed"] += len(chunk)
+            totals["employee_sentences"] += result.employee_sentences
+            totals["matches"] += result.matches
+            totals["achievements_created"] += result.achievements_created
+            await asyncio.to_thread(store.update, job_id, **totals)
+
+        await asyncio.to_thread(store.update, job_id, status=JOB_SUCCEEDED, finished_at=_now())
+        logger.info(f"Job {job_id}: finished, {totals['achievements_created']} achievements recorded.")
+    except asyncio.CancelledError:
+        # Shielded, so the update completes while stop() waits for this worker.
+        await asyncio.shield(asyncio.to_thread(
+            store.update, job_id, status=JOB_FAILED, error="Server shut down while the job was running.", finished_at=_now(),
+        ))
+        raise
+    except Exception as e:
+        logger.exception(f"Job {job_id}: failed.")
+        await asyncio.to_thread(store.update, job_id, status=JOB_FAILED, error=str(e), finished_at=_now())
+
+async def _worker_loop(worker_no: int):
+    while True:
+        try:
+            claimed = await asyncio.to_thread(store.claim_next)
+        except Exception as e:
+            logger.error(f"Job worker {worker_no}: could not claim a job: {e}")
+            claimed = None
+        if claimed is None:
+            _wakeup.clear()
+            try:
+                # Local submissions wake us immediately; jobs from other nodes are found by polling.
+                await asyncio.wait_for(_wakeup.wait(), timeout=settings.JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        await _run_job(*claimed)
+
+def start():
+    """Creates the configured job store and starts the background workers. Called on application startup."""
+    global store, _wakeup
+    if store is None:
+        store = _create_store()
+        try:
+            store.setup()
+            failed = store.fail_stale(settings.JOB_LEASE_SECONDS)
+            if failed:
+                logger.warning(f"Marked {failed} job(s) left running by a stopped worker as failed.")
+        except (psycopg2.Error, sqlite3.Error, RuntimeError) as e:
+            logger.error(f"Job store setup failed: {e}")
+    _wakeup = asyncio.Event()
+    for worker_no in range(settings.JOB_WORKERS):
+        _workers.append(asyncio.create_task(_worker_loop(worker_no), name=f"job-worker-{worker_no}"))
+    logger.info(f"Job queue started ({settings.JOB_STORE} store, {settings.JOB_WORKERS} workers).")
+
+async def stop():
+    """Stops the background workers. Called on application shutdown."""
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+async def submit(text: str) -> dict:
+    job = await asyncio.to_thread(store.create, text)
+    if _wakeup is not None:
+        _wakeup.set()
+    return job
+
+async def get(job_id: str) -> dict | None:
+    return await asyncio.to_thread(store.get, job_id)
+
+async def cancel(job_id: str) -> dict | None:
+    return await asyncio.to_thread(store.request_cancel, job_id)
@@ -0,0 +1,58 @@
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+_MB = 1024.0
+
+def _read_kb_fields(path: str) -> dict[str, int]:
+    fields = {}
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1])
+    return fields
+
+def get_memory_usage(pid: int | str = "self") -> dict | None:
+    """
+    Resident memory of a process in MB, split into pages only this process maps
+    (`unique`) and pages shared with other processes (`shared`), e.g. model weights
+    inherited copy-on-write from the pre-fork parent. `pss` charges each shared page
+    proportionally, so summing it over workers gives the real footprint.
+    Linux only (/proc); returns None elsewhere.
+    """
+    try:
+        fields = _read_kb_fields(f"/proc/{pid}/smaps_rollup")
+    except OSError:
+        try:
+            status = _read_kb_fields(f"/proc/{pid}/status")
+        except OSError:
+            return None
+        return {"pid": os.getpid() if pid == "self" else int(pid), "rss_mb": round(status.get("VmRSS", 0) / _MB, 1),
+                "pss_mb": None, "unique_mb": None, "shared_mb": None, "swap_mb": round(status.get("VmSwap", 0) / _MB, 1)}
+    unique = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    shared = fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0)
+    return {
+        "pid": os.getpid() if pid == "self" else int(pid),
+        "rss_mb": round(fields.get("Rss", 0) / _MB, 1),
+        "pss_mb": round(fields.get("Pss", 0) / _MB, 1),
+        "unique_mb": round(unique / _MB, 1),
+        "shared_mb": round(shared / _MB, 1),
+        "swap_mb": round(fields.get("Swap", 0) / _MB, 1),
+    }
+
+def log_memory_report(pids: dict[str, int]):
+    """Logs one line per process plus totals; `pids` maps a label (e.g. "worker-1") to a pid."""
+    total_rss = total_pss = 0.0
+    for label, pid in pids.items():
+        usage = get_memory_usage(pid)
+        if usage is None:
+            continue
+        total_rss += usage["rss_mb"]
+        total_pss += usage["pss_mb"] or usage["rss_mb"]
+        logger.info(
+            f"Memory {label} (pid {pid}): rss={usage['rss_mb']}MB unique={usage['unique_mb']}MB "
+            f"shared={usage['shared_mb']}MB pss={usage['pss_mb']}MB"
+        )
+    logger.info(f"Memory total: sum of rss={round(total_rss, 1)}MB, actual footprint (sum of pss)={round(total_pss, 1)}MB")
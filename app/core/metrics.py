@@ -0,0 +1,153 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Minimal in-process metrics rendered in the Prometheus text exposition format
+# (served on /metrics). Values are per process: with the process executor, metrics
+# recorded inside inference worker processes are not visible here, and with
+# serve.py every worker exposes its own numbers.
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry: list = []
+_collectors: list = []
+_lock = threading.Lock()
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labelnames: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        _registry.append(self)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with _lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (non-cumulative, last = +Inf), sum, count]
+        self._series: dict[tuple, list] = {}
+        _registry.append(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with _lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+def register_gauges(collect):
+    """
+    Registers `collect() -> list[(name, documentation, labels dict, value)]`, called
+    on every scrape, for values that already live elsewhere (pool usage, queue depth).
+    """
+    _collectors.append(collect)
+
+def _render_gauges() -> list[str]:
+    lines, seen = [], set()
+    for collect in _collectors:
+        try:
+            samples = collect()
+        except Exception:
+            continue
+        for name, documentation, labels, value in samples:
+            if value is None:
+                continue
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} {float(value)}")
+    return lines
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    lines.extend(_render_gauges())
+    return "\n".join(lines) + "\n"
+
+# --- Pipeline Metrics ---
+STAGE_SECONDS = Histogram(
+    "pipeline_stage_seconds",
+    "Time spent per pipeline step (segment, prefilter, ner, employee_lookup, encode, match, record).",
+    ("stage",),
+)
+SENTENCES = Counter(
+    "pipeline_sentences_total",
+    "Sentences by outcome: processed, prefiltered, near_duplicate, ner_failed, no_person, multiple_persons, unknown_person, employee, encode_failed, match_failed, no_match, above_threshold, matched.",
+    ("outcome",),
+)
+ACHIEVEMENTS = Counter("pipeline_achievements_total", "Achievement rows by outcome (inserted, duplicate, failed).", ("outcome",))
+MODEL_INFERENCE_SECONDS = Histogram("model_inference_seconds", "Time per model call (one batch).", ("model",))
+MODEL_INFERENCE_ITEMS = Counter("model_inference_items_total", "Sentences run through each model.", ("model",))
+REQUEST_SECONDS = Histogram("pipeline_request_seconds", "End-to-end pipeline time per snippet, including executor queueing.", ("endpoint",))
+DB_ACQUIRE_SECONDS = Histogram("db_pool_acquire_wait_seconds", "Time spent waiting for a pooled database connection.")
+# ------------------------
+
+@contextmanager
+def observe_stage(stage: str, timings: dict | None = None):
+    """
+    Times the block into STAGE_SECONDS and, if `timings` is given, also adds the
+    seconds to timings[stage] (per-request breakdown; safe across stage threads).
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        if timings is not None:
+            with _lock:
+                timings[stage] = timings.get(stage, 0.0) + elapsed
+
+@contextmanager
+def observe_model(model: str, items: int):
+    """Times one model call into MODEL_INFERENCE_SECONDS and counts its sentences."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        MODEL_INFERENCE_SECONDS.observe(time.perf_counter() - started, model=model)
+        MODEL_INFERENCE_ITEMS.inc(items, model=model)
@@ -2,10 +2,16 @@ import logging
 import nltk 
 from datetime import date
 import psycopg2 
+import psycopg2.extras
+import threading
+from collections import Counter
+from typing import Iterable
 
 from app.models import loader 
-from app.db.database import get_db_connection, get_db_cursor 
+from app.db.database import db_connection, get_db_cursor 
 from app.core.config import settings 
+from app.db import schemas
+from app.core import employee_index, expectation_index, executor, batcher, cache, prefilter, stages, metrics, profiling, dedup, quantization
 
 logger = logging.getLogger(__name__)
 
@@ -18,30 +24,73 @@ def segment_sentences(text: str) -> list[str]:
         logger.warning("Falling back to splitting by newline for sentence segmentation.")
         return text.splitlines()
 
-def find_employee_in_sentence(sentence: str, ner_model) -> tuple[str | None, int | None]:
+def run_ner_batch(sentences: list[str], ner_model) -> list[list[dict] | None]:
     """
-    Uses the NER model to find exactly one PERSON entity in a sentence
-    and looks up their ID in the Employees table.
+    Runs the NER pipeline over many sentences in batches of settings.NER_BATCH_SIZE,
+    or through the cross-request micro-batcher when MICRO_BATCHING_ENABLED is set.
+    Results for sentences seen before come from the inference cache.
 
     Returns:
-        tuple[str | None, int | None]: (employee_name, employee_id) if found, else (None, None)
+        list: One entity list per input sentence (None where NER failed for that sentence).
     """
-    if not ner_model:
-        logger.error("NER model is not loaded. Cannot find employee.")
-        return None, None
-
+    if not sentences:
+        return []
+    if ner_model is loader.ner_model_instance:
+        return cache.cached_inference(cache.NER, sentences, lambda misses: _run_ner_uncached(misses, ner_model))
+    return _run_ner_uncached(sentences, ner_model)
+
+def _run_ner_uncached(sentences: list[str], ner_model) -> list[list[dict] | None]:
+    if not sentences:
+        return []
     try:
-        ner_results = ner_model(sentence)
-        person_entities = [entity for entity in ner_results if entity['entity_group'] == 'PER']
+        if batcher.is_enabled() and ner_model is loader.ner_model_instance and not profiling.is_active():
+            # Coalesced with sentences from other in-flight requests.
+            return batcher.ner_batcher.map(sentences)
+        with metrics.observe_model("ner", len(sentences)), profiling.model_call("ner"):
+            results = ner_model(sentences, batch_size=settings.NER_BATCH_SIZE)
+        logger.debug(f"Batched NER finished for {len(sentences)} sentences (batch size {settings.NER_BATCH_SIZE}).")
+        return list(results)
+    except Exception as e:
+        # One malformed input should not cost the whole snippet: retry sentence by sentence.
+        logger.warning(f"Batched NER failed ({e}); falling back to per-sentence NER.")
+    results = []
+    for sentence in sentences:
+        try:
+            results.append(ner_model(sentence))
+        except Exception:
+            logger.exception(f"Error during NER processing for sentence: '{sentence}'")
+            results.append(None)
+    return results
+
+def resolve_employee(sentence: str, ner_results: list[dict]) -> tuple[str | None, int | None]:
+    """
+    Given the NER output for a sentence, picks exactly one PERSON entity and looks
+    up their ID in the employee name index (or the Employees table if the index
+    is not loaded).
 
-        if len(person_entities) == 1:
-            employee_name = person_entities[0]['word']
-            logger.debug(f"Found potential employee: '{employee_name}' in sentence: '{sentence}'")
+    Returns:
+        tuple[str | None, int | None]: (employee_name, employee_id) if found, else (None, None)
+    """
+    person_entities = [entity for entity in ner_results if entity['entity_group'] == 'PER']
+
+    if len(person_entities) == 1:
+        employee_name = person_entities[0]['word']
+        logger.debug(f"Found potential employee: '{employee_name}' in sentence: '{sentence}'")
+
+        if employee_index.is_loaded():
+            employee_id = employee_index.lookup(employee_name)
+            if employee_id is not None:
+                logger.info(f"Matched NER name '{employee_name}' to Employee ID: {employee_id}")
+                metrics.SENTENCES.inc(outcome="employee")
+                return employee_name, employee_id
+            logger.info(f"NER name '{employee_name}' not found in employee name index.")
+            metrics.SENTENCES.inc(outcome="unknown_person")
+            return None, None
 
-            conn = None
-            cur = None
-            try:
-                conn = get_db_connection()
+        # Fallback when the in-memory index is disabled or failed to load.
+        cur = None
+        try:
+            with db_connection() as conn:
                 if conn:
                     cur = get_db_cursor(conn)
                     cur.execute("SELECT employee_id FROM Employees WHERE name = %s", (employee_name,))
@@ -49,75 +98,147 @@ def find_employee_in_sentence(sentence: str, ner_model) -> tuple[str | None, int
                     if result:
                         employee_id = result['employee_id']
                         logger.info(f"Matched NER name '{employee_name}' to Employee ID: {employee_id}")
+                        metrics.SENTENCES.inc(outcome="employee")
                         return employee_name, employee_id
                     else:
                         logger.info(f"NER name '{employee_name}' not found in Employees table.")
+                        metrics.SENTENCES.inc(outcome="unknown_person")
                         return None, None 
                 else:
                     logger.error("DB connection failed during employee lookup.")
                     return None, None
-            except psycopg2.Error as db_err:
-                logger.error(f"Database error looking up employee '{employee_name}': {db_err}")
-                return None, None
-            finally:
-                if cur: cur.close()
-                if conn: conn.close()
-        elif len(person_entities) > 1:
-            logger.debug(f"Skipping sentence due to multiple PERSON entities: {person_entities}")
-            return None, None
-        else:
+        except psycopg2.Error as db_err:
+            logger.error(f"Database error looking up employee '{employee_name}': {db_err}")
             return None, None
+        finally:
+            if cur: cur.close()
+    elif len(person_entities) > 1:
+        logger.debug(f"Skipping sentence due to multiple PERSON entities: {person_entities}")
+        metrics.SENTENCES.inc(outcome="multiple_persons")
+        return None, None
+    else:
+        metrics.SENTENCES.inc(outcome="no_person")
+        return None, None
 
+def find_employee_in_sentence(sentence: str, ner_model) -> tuple[str | None, int | None]:
+    """
+    Uses the NER model to find exactly one PERSON entity in a sentence
+    and resolves it to an employee (see resolve_employee).
+
+    Returns:
+        tuple[str | None, int | None]: (employee_name, employee_id) if found, else (None, None)
+    """
+    if not ner_model:
+        logger.error("NER model is not loaded. Cannot find employee.")
+        return None, None
+
+    try:
+        ner_results = run_ner_batch([sentence], ner_model)[0]
+        if ner_results is None:
+            return None, None
+        return resolve_employee(sentence, ner_results)
     except Exception as e:
         logger.exception(f"Error during NER processing or employee lookup for sentence: '{sentence}'")
         return None, None
 
-def find_best_expectation_match(sentence: str, sentence_model) -> tuple[int | None, float]:
+def encode_sentences(sentences: list[str], sentence_model) -> list:
     """
-    Generates an embedding for the sentence and finds the closest
-    expectation in the DB using pgvector cosine distance (<=>).
+    Encodes many sentences with a single encode() call in batches of
+    settings.EMBEDDING_BATCH_SIZE, or through the cross-request micro-batcher
+    when MICRO_BATCHING_ENABLED is set.
+
+    Embeddings for sentences seen before come from the inference cache.
+
+    Returns:
+        list: One embedding (numpy array) per input sentence (None where encoding failed).
+    """
+    if not sentences:
+        return []
+    if sentence_model is loader.sentence_transformer_instance:
+        return cache.cached_inference(cache.EMBEDDING, sentences, lambda misses: _encode_uncached(misses, sentence_model))
+    return _encode_uncached(sentences, sentence_model)
+
+def _encode_uncached(sentences: list[str], sentence_model) -> list:
+    if not sentences:
+        return []
+    try:
+        if batcher.is_enabled() and sentence_model is loader.sentence_transformer_instance and not profiling.is_active():
+            return batcher.embedding_batcher.map(sentences)
+        with metrics.observe_model("embedding", len(sentences)), profiling.model_call("embedding"):
+            embeddings = sentence_model.encode(sentences, batch_size=settings.EMBEDDING_BATCH_SIZE)
+        logger.debug(f"Batched encoding finished for {len(sentences)} sentences (batch size {settings.EMBEDDING_BATCH_SIZE}).")
+        return list(embeddings)
+    except Exception as e:
+        logger.warning(f"Batched encoding failed ({e}); falling back to per-sentence encoding.")
+    embeddings = []
+    for sentence in sentences:
+        try:
+            embeddings.append(sentence_model.encode(sentence))
+        except Exception:
+            logger.exception(f"Error generating sentence embedding for: '{sentence[:50]}...'")
+            embeddings.append(None)
+    return embeddings
+
+def _use_memory_index() -> bool:
+    return settings.EXPECTATION_MATCH_BACKEND == "memory" and expectation_index.is_loaded()
+
+def _use_binary_codes() -> bool:
+    return settings.EXPECTATION_QUANTIZATION == quantization.QUANTIZATION_BINARY and not _use_memory_index()
+
+def _rerank_candidates(k: int) -> int:
+    return max(k, settings.EXPECTATION_RERANK_CANDIDATES)
+
+def apply_ann_search_settings(cur, min_ef_search: int = 0):
+    """
+    Sets the pgvector ANN search parameters from settings for the current
+    transaction only (set_config(..., is_local=true)), so pooled connections
+    don't carry them over. No-op when both are left at the server default.
+    `min_ef_search` raises hnsw.ef_search for queries needing that many rows
+    (an HNSW scan returns at most ef_search of them).
+    """
+    ef_search = max(settings.EXPECTATION_HNSW_EF_SEARCH, min(min_ef_search, 1000)) # 1000 is pgvector's maximum
+    if ef_search > 0:
+        cur.execute("SELECT set_config('hnsw.ef_search', %s, true);", (str(ef_search),))
+    if settings.EXPECTATION_IVFFLAT_PROBES > 0:
+        cur.execute("SELECT set_config('ivfflat.probes', %s, true);", (str(settings.EXPECTATION_IVFFLAT_PROBES),))
+
+def match_expectation(embedding_vector) -> tuple[int | None, float]:
+    """
+    Finds the closest expectation to an already computed sentence embedding,
+    using the in-memory index when EXPECTATION_MATCH_BACKEND is "memory" and
+    pgvector cosine distance (<=>) in the DB otherwise.
 
     Returns:
         tuple[int | None, float]: (expectation_id, distance) of the best match,
                                  or (None, float('inf')) if no match or error.
     """
-    if not sentence_model:
-        logger.error("Sentence Transformer model is not loaded. Cannot find expectation match.")
-        return None, float('inf') 
+    if _use_memory_index() or _use_binary_codes():
+        return match_expectations([embedding_vector])[0]
 
-    logger.debug(f"Generating embedding for sentence: '{sentence[:50]}...'")
-    try:
-        # 1. Generate sentence embedding
-        embedding_vector = sentence_model.encode(sentence)
-        embedding_list = embedding_vector.tolist()
-        logger.debug("Sentence embedding generated successfully.")
-    except Exception as e:
-        logger.exception(f"Error generating sentence embedding: {e}")
-        return None, float('inf') 
+    embedding_list = embedding_vector.tolist()
 
-    # 2. Query database for the closest expectation
-    conn = None
     cur = None
     try:
-        conn = get_db_connection()
-        if not conn:
-            logger.error("DB connection failed during expectation matching.")
-            return None, float('inf')
-
-        cur = get_db_cursor(conn)
-        if not cur:
-             logger.error("Failed to get database cursor during expectation matching.")
-             if conn: conn.close()
-             return None, float('inf')
-
-        sql = """
-            SELECT expectation_id, embedding <=> %s::vector AS distance
-            FROM Expectations
-            ORDER BY distance ASC
-            LIMIT 1;
-        """
-        cur.execute(sql, (embedding_list,)) 
-        result = cur.fetchone()
+        with db_connection() as conn:
+            if not conn:
+                logger.error("DB connection failed during expectation matching.")
+                return None, float('inf')
+
+            cur = get_db_cursor(conn)
+            if not cur:
+                 logger.error("Failed to get database cursor during expectation matching.")
+                 return None, float('inf')
+
+            apply_ann_search_settings(cur)
+            # ORDER BY the distance expression itself so an HNSW/IVFFlat index can serve it.
+            sql = """
+                SELECT expectation_id, embedding <=> %(vec)s::vector AS distance
+                FROM Expectations
+                ORDER BY embedding <=> %(vec)s::vector ASC
+                LIMIT 1;
+            """
+            cur.execute(sql, {"vec": embedding_list})
+            result = cur.fetchone()
 
         if result:
             expectation_id = result['expectation_id']
@@ -136,119 +257,451 @@ def find_best_expectation_match(sentence: str, sentence_model) -> tuple[int | No
         return None, float('inf')
     finally:
         if cur: cur.close()
-        if conn: conn.close()
-        logger.debug("DB connection closed for expectation matching.")
+        logger.debug("DB connection returned to pool after expectation matching.")
+
+_TOP_K_SQL = """
+    SELECT q.ord, m.expectation_id, m.distance
+    FROM unnest(%(vectors)s::text[]) WITH ORDINALITY AS q(vector_text, ord)
+    CROSS JOIN LATERAL (SELECT q.vector_text::vector AS vec) AS v
+    CROSS JOIN LATERAL (
+        SELECT expectation_id, embedding <=> v.vec AS distance
+        FROM Expectations
+        WHERE embedding IS NOT NULL
+        ORDER BY embedding <=> v.vec ASC
+        LIMIT %(k)s
+    ) AS m
+    ORDER BY q.ord, m.distance;
+"""
+
+# Two-stage variant (EXPECTATION_QUANTIZATION=binary): the closest candidates by
+# Hamming distance between binary-quantized vectors (served by the bit_hamming_ops
+# expression index from scripts/generate_embeddings.py --build-codes), re-ranked
+# by exact cosine distance.
+_TOP_K_BINARY_SQL = f"""
+    SELECT q.ord, m.expectation_id, m.distance
+    FROM unnest(%(vectors)s::text[]) WITH ORDINALITY AS q(vector_text, ord)
+    CROSS JOIN LATERAL (SELECT q.vector_text::vector AS vec) AS v
+    CROSS JOIN LATERAL (
+        SELECT c.expectation_id, c.embedding <=> v.vec AS distance
+        FROM (
+            SELECT expectation_id, embedding
+            FROM Expectations
+            WHERE embedding IS NOT NULL
+            ORDER BY binary_quantize(embedding)::bit({quantization.EMBEDDING_DIMENSION}) <~> binary_quantize(v.vec)
+            LIMIT %(candidates)s
+        ) AS c
+        ORDER BY c.embedding <=> v.vec ASC
+        LIMIT %(k)s
+    ) AS m
+    ORDER BY q.ord, m.distance;
+"""
+
+def _vector_text(embedding_vector) -> str:
+    return "[" + ",".join(repr(float(value)) for value in embedding_vector) + "]"
+
+def match_expectations_top_k(embeddings: list, k: int) -> list[list[tuple[int, float]]] | None:
+    """
+    Finds the k closest expectations for every embedding in one round trip: one
+    matrix multiply with the in-memory backend, otherwise a single statement that
+    unnests all embeddings and joins each LATERAL to a top-k pgvector (<=>) query
+    (which an HNSW/IVFFlat index can serve). Both backends re-rank candidates from
+    compact codes instead when EXPECTATION_QUANTIZATION is set.
 
+    Returns:
+        list: Per embedding, up to k (expectation_id, distance) pairs, closest first;
+              None if the search failed.
+    """
+    if not embeddings:
+        return []
+    if _use_memory_index():
+        try:
+            return expectation_index.search(embeddings, k=k)
+        except Exception as e:
+            logger.exception(f"Unexpected error during in-memory expectation matching: {e}")
+            return None
 
-def record_achievement(employee_id: int, expectation_id: int, sentence: str) -> bool:
+    cur = None
+    try:
+        with db_connection() as conn:
+            if not conn:
+                logger.error("DB connection failed during expectation matching.")
+                return None
+            cur = get_db_cursor(conn)
+            if not cur:
+                logger.error("Failed to get database cursor during expectation matching.")
+                return None
+            vectors = [_vector_text(vector) for vector in embeddings]
+            if _use_binary_codes():
+                apply_ann_search_settings(cur, min_ef_search=_rerank_candidates(k))
+                cur.execute(_TOP_K_BINARY_SQL, {"vectors": vectors, "k": k, "candidates": _rerank_candidates(k)})
+            else:
+                apply_ann_search_settings(cur)
+                cur.execute(_TOP_K_SQL, {"vectors": vectors, "k": k})
+            rows = cur.fetchall()
+    except psycopg2.Error as db_err:
+        logger.error(f"Database error during batched expectation matching: {db_err}")
+        return None
+    except Exception as e:
+        logger.exception(f"Unexpected error during batched expectation matching: {e}")
+        return None
+    finally:
+        if cur: cur.close()
+
+    results = [[] for _ in embeddings]
+    for row in rows:
+        results[row['ord'] - 1].append((row['expectation_id'], row['distance']))
+    return results
+
+def match_expectations(embeddings: list) -> list[tuple[int | None, float]]:
     """
-    Inserts a new record into the EmployeeAchievements table.
+    Batched form of match_expectation: the closest expectation for every
+    embedding, found in one round trip (see match_expectations_top_k).
 
     Returns:
-        True if insertion was successful, False otherwise.
+        list[tuple[int | None, float]]: One (expectation_id, distance) per embedding.
     """
-    logger.info(f"Attempting to record achievement: EmpID={employee_id}, ExpID={expectation_id}, Sentence='{sentence[:50]}...'")
-    conn = None
+    results = match_expectations_top_k(embeddings, k=1)
+    if results is None:
+        return [(None, float('inf'))] * len(embeddings)
+    matches = []
+    for top in results:
+        if top:
+            logger.debug(f"Closest expectation found: ID {top[0][0]}, Distance: {top[0][1]:.4f}")
+            matches.append(top[0])
+        else:
+            logger.warning("No expectations found to compare against.")
+            matches.append((None, float('inf')))
+    return matches
+
+def find_best_expectation_match(sentence: str, sentence_model) -> tuple[int | None, float]:
+    """
+    Generates an embedding for the sentence and finds the closest
+    expectation in the DB using pgvector cosine distance (<=>).
+
+    Returns:
+        tuple[int | None, float]: (expectation_id, distance) of the best match,
+                                 or (None, float('inf')) if no match or error.
+    """
+    if not sentence_model:
+        logger.error("Sentence Transformer model is not loaded. Cannot find expectation match.")
+        return None, float('inf') 
+
+    logger.debug(f"Generating embedding for sentence: '{sentence[:50]}...'")
+    # 1. Generate sentence embedding (errors are logged by encode_sentences)
+    embedding_vector = encode_sentences([sentence], sentence_model)[0]
+    if embedding_vector is None:
+        return None, float('inf') 
+    logger.debug("Sentence embedding generated successfully.")
+
+    # 2. Query database for the closest expectation
+    return match_expectation(embedding_vector)
+
+
+ACHIEVEMENT_INSERTED = "inserted"
+ACHIEVEMENT_DUPLICATE = "duplicate"
+ACHIEVEMENT_FAILED = "failed"
+
+def _achievement_insert_sql(values_placeholder: str) -> str:
+    on_conflict = "ON CONFLICT DO NOTHING" if settings.ACHIEVEMENT_SKIP_DUPLICATES else ""
+    return f"""
+        INSERT INTO EmployeeAchievements
+            (employee_id, expectation_id, date_achieved, evidence_snippet)
+        VALUES
+            {values_placeholder}
+        {on_conflict}
+        RETURNING employee_id, expectation_id, evidence_snippet;
+    """
+
+def record_achievements(achievements: list[tuple[int, int, str]]) -> list[str]:
+    """
+    Inserts many (employee_id, expectation_id, sentence) records into the
+    EmployeeAchievements table with one multi-row INSERT in a single transaction.
+
+    With settings.ACHIEVEMENT_SKIP_DUPLICATES, rows that hit a unique constraint
+    (see scripts/setup_achievement_dedup_index.py) are skipped instead of failing,
+    so retried requests don't duplicate achievements. If the bulk insert fails, the
+    rows are retried one by one (each under a savepoint, same transaction) so a
+    single bad row doesn't take the rest down with it.
+
+    Returns:
+        list[str]: One outcome per input row: "inserted", "duplicate" or "failed".
+    """
+    if not achievements:
+        return []
+    logger.info(f"Attempting to record {len(achievements)} achievements in one transaction.")
+    outcomes = [ACHIEVEMENT_FAILED] * len(achievements)
     cur = None
     try:
-        conn = get_db_connection()
-        if not conn:
-            logger.error("DB connection failed. Cannot record achievement.")
-            return False
-
-        cur = get_db_cursor(conn)
-        if not cur:
-             logger.error("Failed to get database cursor. Cannot record achievement.")
-             if conn: conn.close()
-             return False
-
-        sql = """
-            INSERT INTO EmployeeAchievements
-                (employee_id, expectation_id, date_achieved, evidence_snippet)
-            VALUES
-                (%s, %s, CURRENT_DATE, %s);
-        """
-        cur.execute(sql, (employee_id, expectation_id, sentence))
-
-        conn.commit()
-        logger.info("Achievement recorded successfully in the database.")
-        return True
+        with db_connection() as conn:
+            if not conn:
+                logger.error("DB connection failed. Cannot record achievements.")
+                return outcomes
+
+            cur = get_db_cursor(conn)
+            if not cur:
+                 logger.error("Failed to get database cursor. Cannot record achievements.")
+                 return outcomes
+
+            try:
+                inserted_rows = psycopg2.extras.execute_values(
+                    cur,
+                    _achievement_insert_sql("%s"),
+                    achievements,
+                    template="(%s, %s, CURRENT_DATE, %s)",
+                    page_size=max(len(achievements), 1),
+                    fetch=True,
+                )
+                # RETURNING can't reference input positions, so match returned rows back
+                # to inputs by value; rows missing from RETURNING were skipped by ON CONFLICT.
+                remaining = Counter((row['employee_id'], row['expectation_id'], row['evidence_snippet']) for row in inserted_rows)
+                for i, achievement in enumerate(achievements):
+                    if remaining[achievement] > 0:
+                        remaining[achievement] -= 1
+                        outcomes[i] = ACHIEVEMENT_INSERTED
+                    else:
+                        outcomes[i] = ACHIEVEMENT_DUPLICATE
+                conn.commit()
+            except psycopg2.Error as bulk_err:
+                conn.rollback()
+                logger.warning(f"Bulk achievement insert failed ({bulk_err}); retrying row by row.")
+                for i, achievement in enumerate(achievements):
+                    cur.execute("SAVEPOINT achievement_row;")
+                    try:
+                        cur.execute(_achievement_insert_sql("(%s, %s, CURRENT_DATE, %s)"), achievement)
+                        outcomes[i] = ACHIEVEMENT_INSERTED if cur.fetchone() else ACHIEVEMENT_DUPLICATE
+                        cur.execute("RELEASE SAVEPOINT achievement_row;")
+                    except psycopg2.Error as row_err:
+                        cur.execute("ROLLBACK TO SAVEPOINT achievement_row;")
+                        logger.error(f"Database error recording achievement EmpID={achievement[0]}, ExpID={achievement[1]}: {row_err}")
+                        outcomes[i] = ACHIEVEMENT_FAILED
+                conn.commit()
 
     except psycopg2.Error as db_err:
-        logger.error(f"Database error recording achievement: {db_err}")
-        if conn:
-            conn.rollback() 
-            logger.info("Database transaction rolled back.")
-        return False 
+        logger.error(f"Database error recording achievements: {db_err}")
+        return [ACHIEVEMENT_FAILED] * len(achievements)
     except Exception as e:
-        logger.exception(f"Unexpected error recording achievement: {e}")
-        if conn:
-            conn.rollback() 
-            logger.info("Database transaction rolled back.")
-        return False 
+        logger.exception(f"Unexpected error recording achievements: {e}")
+        return [ACHIEVEMENT_FAILED] * len(achievements)
     finally:
         if cur: cur.close()
-        if conn: conn.close()
-        logger.debug("DB connection closed for achievement recording.")
+        logger.debug("DB connection returned to pool after achievement recording.")
+
+    logger.info(
+        f"Achievements recorded: {outcomes.count(ACHIEVEMENT_INSERTED)} inserted, "
+        f"{outcomes.count(ACHIEVEMENT_DUPLICATE)} duplicate, {outcomes.count(ACHIEVEMENT_FAILED)} failed."
+    )
+    return outcomes
+
+def record_achievement(employee_id: int, expectation_id: int, sentence: str) -> bool:
+    """
+    Inserts a new record into the EmployeeAchievements table.
+
+    Returns:
+        True if insertion was successful, False otherwise.
+    """
+    logger.info(f"Attempting to record achievement: EmpID={employee_id}, ExpID={expectation_id}, Sentence='{sentence[:50]}...'")
+    return record_achievements([(employee_id, expectation_id, sentence)])[0] == ACHIEVEMENT_INSERTED
 
 
 # --- Main Pipeline Function ---
 async def process_text_snippet(text: str) -> int:
     """
-    Main pipeline function to process text, find employees, match skills (partially implemented),
-    and record achievements (placeholder).
+    Main pipeline entry point used by /process_snippet.
 
     Returns:
-        int: The number of achievements successfully recorded (currently always 0).
+        int: The number of achievements successfully recorded.
     """
-    logger.info(f"Starting pipeline processing for text: {text[:100]}...")
-    achievements_created = 0 
-
-    # 1. Check if models are loaded 
-    ner_model = loader.ner_model_instance
-    sentence_model = loader.sentence_transformer_instance
-    if not ner_model or not sentence_model:
-        logger.error("ML models not loaded properly. Aborting pipeline.")
-        return 0
+    result = await run_pipeline(text)
+    return result.achievements_created
 
-    # 2. Segment text into sentences
-    sentences = segment_sentences(text)
-    logger.info(f"Segmented text into {len(sentences)} sentences.")
+async def run_pipeline(text: str) -> schemas.PipelineResult:
+    """
+    Runs the (blocking) pipeline on the inference executor so model inference
+    and DB calls don't block the event loop.
 
-    # 3. Process each sentence
-    for sentence in sentences:
-        if not sentence.strip(): 
-            continue
+    Returns:
+        schemas.PipelineResult: Per-snippet counts and the achievements recorded.
+    """
+    return await executor.run_inference(run_pipeline_sync, text)
 
-        logger.debug(f"Processing sentence: '{sentence}'")
+def run_pipeline_sync(text: str) -> schemas.PipelineResult:
+    """
+    Main pipeline function to process text, find employees, match skills
+    and record achievements. Blocking; call through run_pipeline.
 
-        # 3a. Identify Employee (NER) + Match in DB
-        employee_name, employee_id = find_employee_in_sentence(sentence, ner_model)
+    Returns:
+        schemas.PipelineResult: Per-snippet counts and the achievements recorded.
+    """
+    logger.info(f"Starting pipeline processing for text: {text[:100]}...")
 
-        if employee_id and employee_name: 
-            # 3b. Semantic Matching (Generate embedding + DB Query)
-            expectation_id, distance = find_best_expectation_match(sentence, sentence_model)
+    # 1. Segment text into sentences
+    step_seconds = {}
+    with metrics.observe_stage("segment", step_seconds):
+        sentences = [sentence for sentence in segment_sentences(text) if sentence.strip()]
+    logger.info(f"Segmented text into {len(sentences)} sentences.")
 
-            if expectation_id is not None:
-                logger.info(f"Found best match: Expectation ID {expectation_id} with distance {distance:.4f}")
+    result = process_sentences_sync(sentences)
+    result.step_seconds = {**step_seconds, **result.step_seconds}
+    return result
 
-                # 3c. Record Achievement (Threshold Check + DB Insert)
-                if distance < settings.SIMILARITY_THRESHOLD:
-                    logger.info(f"Match distance ({distance:.4f}) is below threshold ({settings.SIMILARITY_THRESHOLD}). Attempting to record achievement.")
+def process_sentences_sync(sentences: Iterable[str]) -> schemas.PipelineResult:
+    """
+    Runs NER, employee lookup, matching and recording over already segmented
+    sentences. `sentences` may be any iterable (including a lazy generator): it is
+    consumed in chunks of PIPELINE_CHUNK_SENTENCES that flow through the stages of
+    build_pipeline_stages concurrently, connected by bounded queues.
 
-                    success = record_achievement(employee_id, expectation_id, sentence)
-                    if success:
-                       achievements_created += 1 
-                       logger.info(f"Achievement recorded successfully (Total recorded in this request: {achievements_created}).")
-                    else:
-                       logger.error(f"Failed to record achievement for EmpID={employee_id}, ExpID={expectation_id}.")
+    Returns:
+        schemas.PipelineResult: Counts, per-stage timings and the achievements recorded.
+    """
+    result = schemas.PipelineResult()
 
+    # 2. Check if models are loaded 
+    ner_model = loader.ner_model_instance
+    sentence_model = loader.sentence_transformer_instance
+    if not ner_model or not sentence_model:
+        logger.error("ML models not loaded properly. Aborting pipeline.")
+        return result
+
+    timings = {}
+    source = stages.chunked(sentences, settings.PIPELINE_CHUNK_SENTENCES)
+    pipeline_stages = build_pipeline_stages(result, ner_model, sentence_model)
+    if profiling.is_active():
+        # A profiled request keeps all of its work on this thread.
+        runner = stages.run_inline(source, pipeline_stages, timings)
+    else:
+        runner = stages.run_stages(source, pipeline_stages, settings.PIPELINE_QUEUE_SIZE, timings)
+    for _ in runner:
+        pass
+    result.stage_seconds = {name: timing["busy_seconds"] for name, timing in timings.items()}
+
+    logger.info(f"Pipeline processing finished. Total achievements recorded in this request: {result.achievements_created}")
+    return result
+
+def build_pipeline_stages(result: schemas.PipelineResult, ner_model, sentence_model) -> list[stages.Stage]:
+    """
+    The pipeline as streaming stages. Each stage takes and returns one chunk (list);
+    counters, recorded achievements and per-step timings (result.step_seconds,
+    also exported as metrics.STAGE_SECONDS) are accumulated into `result`.
+    """
+    lock = threading.Lock()
+
+    def _ner(chunk: list[str]) -> list[tuple[str, int]]:
+        # 3. Drop sentences that cannot name any known employee before running NER
+        with metrics.observe_stage("prefilter", result.step_seconds):
+            ner_sentences, skipped = prefilter.split_sentences(chunk)
+        if skipped:
+            logger.info(f"Prefilter skipped NER for {len(skipped)} of {len(chunk)} sentences.")
+        # Rewordings of evidence already recorded for the same employee stop here.
+        ner_sentences, duplicates = dedup.split_sentences(ner_sentences)
+        if duplicates:
+            logger.info(f"Skipped {len(duplicates)} near-duplicate evidence sentences.")
+
+        # 4. Identify Employees (batched NER) + Match against known employees
+        with metrics.observe_stage("ner", result.step_seconds):
+            ner_results_list = run_ner_batch(ner_sentences, ner_model)
+        candidates = []
+        failed = 0
+        with metrics.observe_stage("employee_lookup", result.step_seconds):
+            for sentence, ner_results in zip(ner_sentences, ner_results_list):
+                logger.debug(f"Processing sentence: '{sentence}'")
+                if ner_results is None:
+                    metrics.SENTENCES.inc(outcome="ner_failed")
+                    failed += 1
+                    continue
+                employee_name, employee_id = resolve_employee(sentence, ner_results)
+                prefilter.record_shadow_outcome(sentence, employee_id)
+                if employee_id and employee_name: 
+                    candidates.append((sentence, employee_id))
                 else:
-                    logger.info(f"Match distance ({distance:.4f}) is above threshold ({settings.SIMILARITY_THRESHOLD}). No achievement recorded.")
-            else:
+                    logger.debug("Sentence skipped (no single known employee found).")
+        metrics.SENTENCES.inc(len(chunk), outcome="processed")
+        metrics.SENTENCES.inc(len(skipped), outcome="prefiltered")
+        metrics.SENTENCES.inc(len(duplicates), outcome="near_duplicate")
+        with lock:
+            result.sentences_total += len(chunk)
+            result.sentences_prefiltered += len(skipped)
+            result.sentences_deduplicated += len(duplicates)
+            result.employee_sentences += len(candidates)
+            result.sentences_failed += failed
+        return candidates
+
+    def _embed(candidates: list[tuple[str, int]]) -> list:
+        # 5a. Semantic Matching: one batched encode for all candidate sentences of the chunk
+        with metrics.observe_stage("encode", result.step_seconds):
+            embeddings = encode_sentences([sentence for sentence, _ in candidates], sentence_model)
+        failed = sum(1 for vector in embeddings if vector is None)
+        if failed:
+            metrics.SENTENCES.inc(failed, outcome="encode_failed")
+            with lock:
+                result.sentences_failed += failed
+        return [(sentence, employee_id, vector) for (sentence, employee_id), vector in zip(candidates, embeddings) if vector is not None]
+
+    def _match(encoded: list) -> list[schemas.Achievement]:
+        # 5b. Expectation search (all sentences of the chunk in one query) + 6. Threshold Check
+        k = max(1, settings.EXPECTATION_MATCHES_PER_SENTENCE)
+        with metrics.observe_stage("match", result.step_seconds):
+            top_matches = match_expectations_top_k([vector for _, _, vector in encoded], k)
+        if top_matches is None:
+            metrics.SENTENCES.inc(len(encoded), outcome="match_failed")
+            with lock:
+                result.sentences_failed += len(encoded)
+            return []
+        accepted = []
+        matched = 0
+        for (sentence, employee_id, _), matches in zip(encoded, top_matches):
+            if not matches:
                 logger.info("No matching expectation found for this sentence.")
-        else:
-            logger.debug("Sentence skipped (no single known employee found).")
-
-    logger.info(f"Pipeline processing finished. Total achievements recorded in this request: {achievements_created}")
-    return achievements_created 
+                metrics.SENTENCES.inc(outcome="no_match")
+                continue
+            expectation_id, distance = matches[0]
+            logger.info(f"Found best match: Expectation ID {expectation_id} with distance {distance:.4f}")
+            if distance >= settings.SIMILARITY_THRESHOLD:
+                logger.info(f"Match distance ({distance:.4f}) is above threshold ({settings.SIMILARITY_THRESHOLD}). No achievement recorded.")
+                metrics.SENTENCES.inc(outcome="above_threshold")
+                continue
+            metrics.SENTENCES.inc(outcome="matched")
+            matched += 1
+            # With EXPECTATION_MATCHES_PER_SENTENCE > 1 a sentence can evidence several expectations.
+            for expectation_id, distance in matches:
+                if distance >= settings.SIMILARITY_THRESHOLD:
+                    break
+                logger.info(f"Match distance ({distance:.4f}) for Expectation ID {expectation_id} is below threshold ({settings.SIMILARITY_THRESHOLD}). Queued for recording.")
+                accepted.append(schemas.Achievement(
+                    employee_id=employee_id,
+                    expectation_id=expectation_id,
+                    distance=float(distance),
+                    evidence_snippet=sentence,
+                ))
+        with lock:
+            result.matches += matched
+        return accepted
+
+    def _record(accepted: list[schemas.Achievement]) -> list[schemas.Achievement]:
+        # 7. Record the chunk's accepted achievements in one transaction
+        with metrics.observe_stage("record", result.step_seconds):
+            outcomes = record_achievements([(a.employee_id, a.expectation_id, a.evidence_snippet) for a in accepted])
+        for achievement, outcome in zip(accepted, outcomes):
+            achievement.outcome = outcome
+            metrics.ACHIEVEMENTS.inc(outcome=outcome)
+            if outcome == ACHIEVEMENT_FAILED:
+                logger.error(f"Failed to record achievement for EmpID={achievement.employee_id}, ExpID={achievement.expectation_id}.")
+        # Only evidence whose achievements are all on record suppresses later rewordings of it.
+        on_record = {}
+        for achievement in accepted:
+            key = (achievement.evidence_snippet, achievement.employee_id)
+            on_record[key] = on_record.get(key, True) and achievement.outcome in (ACHIEVEMENT_INSERTED, ACHIEVEMENT_DUPLICATE)
+        for (sentence, employee_id), recorded in on_record.items():
+            if recorded:
+                dedup.remember(sentence, employee_id)
+        with lock:
+            result.achievements.extend(accepted)
+            result.achievements_created += outcomes.count(ACHIEVEMENT_INSERTED)
+        return accepted
+
+    return [
+        stages.Stage("ner", _ner),
+        stages.Stage("embed", _embed),
+        stages.Stage("match", _match, concurrency=settings.PIPELINE_MATCH_CONCURRENCY),
+        stages.Stage("record", _record),
+    ]
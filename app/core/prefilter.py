@@ -0,0 +1,151 @@
+import logging
+import re
+import threading
+from collections import deque
+
+from app.core import employee_index
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Modes (settings.PREFILTER_MODE):
+#   "off"    - every sentence goes to NER (previous behaviour)
+#   "strict" - drops a sentence only if no employee name can occur in it; results
+#              are identical to "off" (character-level Aho-Corasick match)
+#   "fast"   - word-token match against name tokens; cheaper, but may drop a sentence
+#              whose name NER would have glued together differently (e.g. "O'Neil" vs "O Neil")
+#   "shadow" - runs like "off" but counts what "strict" would have skipped
+MODE_OFF = "off"
+MODE_STRICT = "strict"
+MODE_FAST = "fast"
+MODE_SHADOW = "shadow"
+
+_NON_ALNUM = re.compile(r"[\W_]+")
+_WORD = re.compile(r"\w+")
+
+def _compact(text: str) -> str:
+    """Casefolds and removes everything but letters/digits, so spacing, punctuation and
+    WordPiece '##' markers can't hide a name from the match."""
+    return _NON_ALNUM.sub("", text.casefold())
+
+class AhoCorasick:
+    """Minimal Aho-Corasick automaton answering "does the text contain any pattern?"."""
+
+    def __init__(self, patterns):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._terminal: list[bool] = [False]
+        for pattern in patterns:
+            if pattern:
+                self._insert(pattern)
+        self._build_failure_links()
+
+    def _insert(self, pattern: str):
+        state = 0
+        for ch in pattern:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._terminal.append(False)
+            state = next_state
+        self._terminal[state] = True
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                candidate = self._goto[fallback].get(ch, 0)
+                self._fail[next_state] = candidate if candidate != next_state else 0
+                self._terminal[next_state] = self._terminal[next_state] or self._terminal[self._fail[next_state]]
+
+    def contains_any(self, text: str) -> bool:
+        goto, fail, terminal = self._goto, self._fail, self._terminal
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if terminal[state]:
+                return True
+        return False
+
+    def __len__(self):
+        return len(self._goto)
+
+# --- Prefilter State (rebuilt lazily when the employee index changes) ---
+_automaton: AhoCorasick | None = None
+_name_tokens: frozenset[str] = frozenset()
+_built_version = -1
+_build_lock = threading.Lock()
+_stats_lock = threading.Lock() # split_sentences runs on the pipeline's stage threads
+_stats = {"sentences_checked": 0, "sentences_skipped": 0, "shadow_would_skip": 0, "shadow_false_skips": 0, "rebuilds": 0}
+# -------------------------------------------------------------------------
+
+def _ensure_built():
+    global _automaton, _name_tokens, _built_version
+    if _built_version == employee_index.version():
+        return
+    with _build_lock:
+        index_version, keys = employee_index.lookup_keys()
+        if _built_version == index_version:
+            return
+        _automaton = AhoCorasick({_compact(key) for key in keys})
+        _name_tokens = frozenset(token for key in keys for token in _WORD.findall(key))
+        _built_version = index_version
+        with _stats_lock:
+            _stats["rebuilds"] += 1
+        logger.info(f"Employee prefilter rebuilt: {len(keys)} names/aliases, {len(_automaton)} automaton states.")
+
+def is_active() -> bool:
+    # Lookups fall back to the Employees table when the index isn't loaded; don't filter then.
+    return settings.PREFILTER_MODE != MODE_OFF and employee_index.is_loaded()
+
+def may_mention_employee(sentence: str) -> bool:
+    """False only if the sentence cannot contain any known employee name (per the active mode)."""
+    _ensure_built()
+    if settings.PREFILTER_MODE == MODE_FAST:
+        return any(token in _name_tokens for token in _WORD.findall(sentence.casefold()))
+    return _automaton.contains_any(_compact(sentence))
+
+def split_sentences(sentences: list[str]) -> tuple[list[str], list[str]]:
+    """
+    Returns (to_process, skipped). In "shadow" mode nothing is skipped, but the
+    sentences that would have been are counted (see record_shadow_outcome).
+    """
+    if not is_active():
+        return sentences, []
+    to_process, skipped = [], []
+    for sentence in sentences:
+        (to_process if may_mention_employee(sentence) else skipped).append(sentence)
+    shadow = settings.PREFILTER_MODE == MODE_SHADOW
+    with _stats_lock:
+        _stats["sentences_checked"] += len(sentences)
+        _stats["shadow_would_skip" if shadow else "sentences_skipped"] += len(skipped)
+    if shadow:
+        return sentences, []
+    return to_process, skipped
+
+def record_shadow_outcome(sentence: str, employee_id: int | None):
+    """In shadow mode, counts sentences the prefilter would have dropped that did resolve to an employee."""
+    if settings.PREFILTER_MODE == MODE_SHADOW and employee_id is not None and is_active() and not may_mention_employee(sentence):
+        with _stats_lock:
+            _stats["shadow_false_skips"] += 1
+        logger.warning(f"Prefilter would have dropped a sentence naming employee {employee_id}: '{sentence[:80]}'")
+
+def get_prefilter_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    return {
+        "mode": settings.PREFILTER_MODE,
+        "active": is_active(),
+        "ner_calls_avoided": stats["sentences_skipped"],
+        **stats,
+    }
@@ -0,0 +1,114 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# On-demand profiling of a single request (see process_snippet's `profile` flag).
+# Nothing is installed unless a request asks for it: the only cost for ordinary
+# requests is the is_active() thread-local check on the model call paths.
+
+_state = threading.local()
+
+def is_active() -> bool:
+    """True on the thread currently running a profiled request."""
+    return getattr(_state, "session", None) is not None
+
+def is_allowed(token: str | None) -> bool:
+    """Whether a request may ask for profiling (PROFILING_ENABLED, plus PROFILING_TOKEN if set)."""
+    if not settings.PROFILING_ENABLED:
+        return False
+    return not settings.PROFILING_TOKEN or token == settings.PROFILING_TOKEN
+
+def _torch_ops_enabled() -> bool:
+    from app.models import loader
+    return settings.PROFILING_TORCH_OPS and settings.INFERENCE_BACKEND != loader.BACKEND_ONNX
+
+@contextmanager
+def model_call(model: str):
+    """
+    Wraps one NER / embedding model call. Inside a profiled request (and on a torch
+    backend) the call runs under torch.profiler and its operator timings are added
+    to the request's per-model table; otherwise this does nothing.
+    """
+    session = getattr(_state, "session", None)
+    if session is None or not _torch_ops_enabled():
+        yield
+        return
+    try:
+        from torch.profiler import profile, ProfilerActivity
+    except ImportError:
+        yield
+        return
+    with profile(activities=[ProfilerActivity.CPU]) as prof:
+        yield
+    ops = session["torch_ops"].setdefault(model, {})
+    for event in prof.key_averages():
+        row = ops.setdefault(event.key, [0, 0.0, 0.0])
+        row[0] += event.count
+        row[1] += event.self_cpu_time_total / 1000.0
+        row[2] += event.cpu_time_total / 1000.0
+
+def _torch_op_table(ops: dict) -> list[dict]:
+    rows = sorted(ops.items(), key=lambda item: item[1][1], reverse=True)[:settings.PROFILING_TOP_FUNCTIONS]
+    return [
+        {"op": name, "calls": calls, "self_ms": round(self_ms, 3), "total_ms": round(total_ms, 3)}
+        for name, (calls, self_ms, total_ms) in rows
+    ]
+
+def profile_pipeline_sync(text: str):
+    """
+    Runs the pipeline for `text` under cProfile on the calling thread (stages run
+    inline and model calls bypass the micro-batcher, so one profiler sees all the
+    work, including psycopg2 calls). Blocking; called through executor.run_inference.
+
+    Returns:
+        tuple[schemas.PipelineResult, dict]: The pipeline result and the profile report.
+    """
+    from app.core import pipeline
+
+    profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    profiler = cProfile.Profile()
+    _state.session = {"torch_ops": {}}
+    started = time.perf_counter()
+    try:
+        profiler.enable()
+        try:
+            result = pipeline.run_pipeline_sync(text)
+        finally:
+            profiler.disable()
+        session = _state.session
+    finally:
+        _state.session = None
+    elapsed = time.perf_counter() - started
+
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(settings.PROFILING_TOP_FUNCTIONS)
+    report = {
+        "id": profile_id,
+        "seconds": round(elapsed, 4),
+        "functions": stream.getvalue(),
+        "torch_ops": {model: _torch_op_table(ops) for model, ops in session["torch_ops"].items()},
+        "file": None,
+    }
+    if settings.PROFILING_OUTPUT_DIR:
+        try:
+            os.makedirs(settings.PROFILING_OUTPUT_DIR, exist_ok=True)
+            path = os.path.join(settings.PROFILING_OUTPUT_DIR, f"{profile_id}.prof")
+            profiler.dump_stats(path)
+            with open(os.path.join(settings.PROFILING_OUTPUT_DIR, f"{profile_id}.json"), "w") as f:
+                json.dump({**report, "file": path}, f, indent=2)
+            report["file"] = path
+        except OSError as e:
+            logger.error(f"Could not store profile {profile_id}: {e}")
+    logger.info(f"Profiled request {profile_id}: {elapsed:.3f}s, stored at {report['file']}.")
+    return result, report
@@ -0,0 +1,159 @@
+import numpy as np
+
+# Compact expectation codes for a two-stage search: a first pass over small codes
+# picks EXPECTATION_RERANK_CANDIDATES expectations per sentence, which are then
+# re-ranked with the exact float32 cosine similarity (see expectation_index.search).
+#
+# Quantization (settings.EXPECTATION_QUANTIZATION):
+#   "none"   - exact search only (previous behaviour)
+#   "int8"   - per-dimension symmetric int8 scalar codes (1 byte per dimension)
+#   "binary" - sign bits of the mean-centered vector, compared by Hamming distance (1 bit per dimension)
+# Reduction (settings.EXPECTATION_REDUCTION), applied before quantizing:
+#   "none", "pca" (top principal directions of the catalog) or "truncate" (leading
+#   dimensions, for Matryoshka-trained models)
+QUANTIZATION_NONE = "none"
+QUANTIZATION_INT8 = "int8"
+QUANTIZATION_BINARY = "binary"
+REDUCTION_NONE = "none"
+REDUCTION_PCA = "pca"
+REDUCTION_TRUNCATE = "truncate"
+
+EMBEDDING_DIMENSION = 384 # all-MiniLM-L6-v2; fixed in the pgvector bit(n) expression index
+_BLOCK_ELEMENTS = 1 << 22 # Code rows are scored in blocks of about this many temporaries
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+def _pack_bits(bits: np.ndarray) -> np.ndarray:
+    """Packs boolean rows into uint64 words (zero-padded), so XOR/popcount touch 8x fewer elements."""
+    packed = np.packbits(bits, axis=1)
+    padding = -packed.shape[1] % 8
+    if padding:
+        packed = np.pad(packed, ((0, 0), (0, padding)))
+    return np.ascontiguousarray(packed).view(np.uint64)
+
+def _popcount(words: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"): # NumPy >= 2.0
+        return np.bitwise_count(words)
+    return _POPCOUNT[words.view(np.uint8)].reshape(*words.shape, 8).sum(axis=-1, dtype=np.uint8)
+
+def _hamming(codes: np.ndarray, query_bits: np.ndarray) -> np.ndarray:
+    """[queries, rows] Hamming distances, accumulated one 64-bit word column at a time."""
+    distances = np.zeros((len(query_bits), len(codes)), dtype=np.uint16)
+    columns = np.ascontiguousarray(codes.T)
+    for word in range(codes.shape[1]):
+        distances += _popcount(np.bitwise_xor.outer(query_bits[:, word], columns[word]))
+    return distances
+
+def fit_projection(matrix: np.ndarray, reduction: str, dim: int) -> np.ndarray | None:
+    """
+    Returns a [dim, reduced] float32 projection, or None to keep every dimension.
+    PCA uses the uncentered second moment (X^T X), whose top eigenvectors best
+    preserve dot products, and costs O(n * dim^2) regardless of catalog size.
+    """
+    full_dim = matrix.shape[1]
+    if reduction == REDUCTION_NONE or dim <= 0 or dim >= full_dim:
+        return None
+    if reduction == REDUCTION_TRUNCATE:
+        return np.eye(full_dim, dim, dtype=np.float32)
+    if reduction == REDUCTION_PCA:
+        moment = matrix.T.astype(np.float64) @ matrix.astype(np.float64)
+        _, vectors = np.linalg.eigh(moment) # Ascending eigenvalues
+        return np.ascontiguousarray(vectors[:, ::-1][:, :dim], dtype=np.float32)
+    raise ValueError(f"Unknown reduction '{reduction}' (expected none, pca or truncate).")
+
+class CompactCodes:
+    """
+    Quantized (and optionally dimension-reduced) copy of the L2-normalized
+    expectation matrix, used only to pick re-ranking candidates.
+    """
+
+    def __init__(self, matrix: np.ndarray, quantization: str, reduction: str = REDUCTION_NONE, reduced_dim: int = 0):
+        if quantization not in (QUANTIZATION_INT8, QUANTIZATION_BINARY):
+            raise ValueError(f"Unknown quantization '{quantization}' (expected int8 or binary).")
+        self.quantization = quantization
+        self.reduction = reduction
+        self.projection = fit_projection(matrix, reduction, reduced_dim) if len(matrix) else None
+        projected = self._project(matrix)
+        self.dimension = projected.shape[1]
+        if quantization == QUANTIZATION_INT8:
+            self.offset = None
+            scale = np.abs(projected).max(axis=0) / 127.0 if len(projected) else np.ones(self.dimension, dtype=np.float32)
+            scale[scale == 0] = 1.0
+            self.scale = scale.astype(np.float32)
+            self.codes = np.clip(np.rint(projected / self.scale), -127, 127).astype(np.int8)
+        else:
+            # Centering balances the bits: most MiniLM dimensions have a clear non-zero mean.
+            self.offset = projected.mean(axis=0).astype(np.float32) if len(projected) else np.zeros(self.dimension, dtype=np.float32)
+            self.scale = None
+            self.codes = _pack_bits(projected > self.offset)
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def nbytes(self) -> int:
+        extra = sum(array.nbytes for array in (self.projection, self.scale, self.offset) if array is not None)
+        return int(self.codes.nbytes + extra)
+
+    def _project(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        return vectors @ self.projection if self.projection is not None else vectors
+
+    def _block_scorer(self, queries: np.ndarray):
+        """Returns score(start, stop) -> [queries, rows] float32 scores, higher = closer."""
+        projected = self._project(queries)
+        if self.quantization == QUANTIZATION_INT8:
+            scaled = np.ascontiguousarray((projected * self.scale).T) # Folding the scale into the query keeps codes int8
+            return lambda start, stop: (self.codes[start:stop].astype(np.float32) @ scaled).T
+        query_bits = _pack_bits(projected > self.offset)
+        return lambda start, stop: -_hamming(self.codes[start:stop], query_bits).astype(np.float32)
+
+    def candidates(self, queries: np.ndarray, count: int) -> np.ndarray:
+        """
+        Row indices [queries, count] (unordered) of the `count` best-scoring codes
+        per query. Codes are scored block by block while a running top-count is
+        kept, so temporaries stay bounded however large the catalog grows.
+        """
+        queries = np.atleast_2d(queries)
+        count = min(count, len(self.codes))
+        width = self.dimension if self.quantization == QUANTIZATION_INT8 else len(queries)
+        block_rows = max(count, _BLOCK_ELEMENTS // max(1, width))
+        score = self._block_scorer(queries)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        for start in range(0, len(self.codes), block_rows):
+            stop = min(start + block_rows, len(self.codes))
+            scores = np.concatenate([best_scores, score(start, stop)], axis=1)
+            rows = np.concatenate([best_rows, np.broadcast_to(np.arange(start, stop), (len(queries), stop - start))], axis=1)
+            if scores.shape[1] > count:
+                keep = np.argpartition(-scores, count - 1, axis=1)[:, :count]
+                scores = np.take_along_axis(scores, keep, axis=1)
+                rows = np.take_along_axis(rows, keep, axis=1)
+            best_scores, best_rows = scores, rows
+        return best_rows
+
+def top_k(similarities: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Columns [queries, k] of the k highest similarities per row, best first, and those similarities."""
+    k = min(k, similarities.shape[1])
+    if k < similarities.shape[1]:
+        top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+    else:
+        top = np.broadcast_to(np.arange(similarities.shape[1]), similarities.shape)
+    top_similarities = np.take_along_axis(similarities, top, axis=1)
+    order = np.argsort(-top_similarities, axis=1, kind="stable")
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_similarities, order, axis=1)
+
+def exact_search(matrix: np.ndarray, queries: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Top-k rows and cosine similarities by brute force (normalized inputs)."""
+    return top_k(queries @ matrix.T, k)
+
+def two_stage_search(matrix: np.ndarray, codes: CompactCodes, queries: np.ndarray, k: int, candidates: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k rows and exact cosine similarities (normalized inputs): `candidates` rows
+    per query from the compact codes, re-ranked against the float32 matrix.
+    """
+    if candidates >= len(matrix):
+        return exact_search(matrix, queries, k)
+    rows = codes.candidates(queries, max(k, candidates))
+    similarities = np.einsum("qcd,qd->qc", matrix[rows], queries)
+    top, top_similarities = top_k(similarities, k)
+    return np.take_along_axis(rows, top, axis=1), top_similarities
@@ -0,0 +1,278 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from app.core.config import settings
+from app.core import cache
+from app.db import schemas
+
+logger = logging.getLogger(__name__)
+
+# Idempotent whole-snippet results: a snippet is keyed by the client's Idempotency-Key
+# or, when an operator opts in with RESULT_STORE_AUTO_KEY, by the hash of its text. A resubmission within
+# RESULT_STORE_TTL_SECONDS replays the stored result instead of re-running the
+# pipeline (and re-inserting achievements); identical submissions in flight at the
+# same time share one pipeline run. Results recorded with other models or another
+# SIMILARITY_THRESHOLD are not replayed.
+
+_PURGE_EVERY_STORES = 1000 # Expired persistent rows are deleted every this many stores
+
+class IdempotencyKeyConflict(Exception):
+    """The idempotency key was already used for a different text."""
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(cache.normalize_sentence(text).encode("utf-8")).hexdigest()
+
+def result_context() -> dict:
+    """What a stored result depends on besides the text."""
+    return {
+        "models": {kind: cache.model_name(kind) for kind in (cache.NER, cache.EMBEDDING)},
+        "similarity_threshold": settings.SIMILARITY_THRESHOLD,
+        "matches_per_sentence": settings.EXPECTATION_MATCHES_PER_SENTENCE,
+    }
+
+class ResultStore:
+    """
+    In-memory LRU of snippet results bounded by entry count and TTL, with an
+    optional SQLite tier that survives restarts and is shared by worker processes.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, sqlite_path: str = ""):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._stats = {"replays": 0, "coalesced": 0, "stores": 0, "misses": 0, "evictions": 0, "expired": 0, "stale": 0}
+        if sqlite_path:
+            self._open_persistent(sqlite_path)
+
+    # --- Persistent tier ---
+
+    def _open_persistent(self, path: str):
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL;")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS snippet_results (
+                    result_key TEXT PRIMARY KEY,
+                    record TEXT NOT NULL,
+                    stored_at REAL NOT NULL
+                );
+            """)
+            self._purge_persistent()
+            logger.info(f"Snippet result store persistent tier opened at '{path}'.")
+        except sqlite3.Error as e:
+            logger.error(f"Could not open persistent snippet result store '{path}': {e}")
+            self._db = None
+
+    def _purge_persistent(self):
+        try:
+            deleted = self._db.execute("DELETE FROM snippet_results WHERE stored_at < ?;", (time.time() - self.ttl_seconds,)).rowcount
+        except sqlite3.Error as e:
+            logger.warning(f"Persistent snippet result purge failed: {e}")
+            return
+        if deleted:
+            logger.info(f"Snippet result store: removed {deleted} expired persistent entries.")
+
+    def _load_persistent(self, key: str) -> dict | None:
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute("SELECT record FROM snippet_results WHERE result_key = ?;", (key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Persistent snippet result read failed: {e}")
+            return None
+        return json.loads(row[0]) if row else None
+
+    def _store_persistent(self, key: str, record: dict):
+        if self._db is None:
+            return
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO snippet_results (result_key, record, stored_at) VALUES (?, ?, ?);",
+                (key, json.dumps(record), record["stored_at"]),
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Persistent snippet result write failed: {e}")
+
+    def _delete_persistent(self, key: str):
+        if self._db is None:
+            return
+        try:
+            self._db.execute("DELETE FROM snippet_results WHERE result_key = ?;", (key,))
+        except sqlite3.Error as e:
+            logger.warning(f"Persistent snippet result delete failed: {e}")
+
+    # --- Public API ---
+
+    def get(self, key: str) -> dict | None:
+        """Returns the live record for `key` (None if missing, expired or recorded under other models/settings)."""
+        with self._lock:
+            record = self._entries.get(key)
+            if record is not None:
+                self._entries.move_to_end(key)
+        if record is None:
+            record = self._load_persistent(key)
+            if record is not None:
+                self._put_memory(key, record)
+        if record is None:
+            self.count("misses")
+            return None
+        if time.time() - record["stored_at"] > self.ttl_seconds:
+            self.count("expired")
+            self.delete(key)
+            return None
+        if record["context"] != result_context():
+            self.count("stale")
+            self.delete(key)
+            return None
+        return record
+
+    def _put_memory(self, key: str, record: dict):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = record
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def put(self, key: str, text_hash: str, result: schemas.PipelineResult) -> dict:
+        record = {
+            "content_hash": text_hash,
+            "context": result_context(),
+            "stored_at": time.time(),
+            "result": result.model_dump(mode="json"),
+        }
+        self._put_memory(key, record)
+        self._store_persistent(key, record)
+        self.count("stores")
+        if self._db is not None and self._stats["stores"] % _PURGE_EVERY_STORES == 0:
+            self._purge_persistent()
+        return record
+
+    def count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+        self._delete_persistent(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self._db is not None:
+            self._db.execute("DELETE FROM snippet_results;")
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        stats["persistent"] = self._db is not None
+        stats["ttl_seconds"] = self.ttl_seconds
+        return stats
+
+# --- Store State ---
+_store: ResultStore | None = None
+_store_lock = threading.Lock()
+_inflight: dict[str, asyncio.Future] = {}
+# -------------------
+
+def get_store() -> ResultStore | None:
+    """Returns the shared store (created on first use), or None when disabled."""
+    global _store
+    if not settings.RESULT_STORE_ENABLED:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ResultStore(
+                    max_entries=settings.RESULT_STORE_MAX_ENTRIES,
+                    ttl_seconds=settings.RESULT_STORE_TTL_SECONDS,
+                    sqlite_path=settings.RESULT_STORE_SQLITE_PATH,
+                )
+    return _store
+
+def get_result_store_stats() -> dict:
+    store = get_store()
+    return {**store.get_stats(), "inflight": len(_inflight)} if store else {"enabled": False}
+
+def result_key(text: str, idempotency_key: str | None) -> tuple[str | None, str]:
+    """Returns (store key or None if the snippet is not to be stored, content hash)."""
+    text_hash = content_hash(text)
+    if idempotency_key:
+        return f"key:{idempotency_key}", text_hash
+    if settings.RESULT_STORE_AUTO_KEY:
+        return f"sha256:{text_hash}", text_hash
+    return None, text_hash
+
+def _is_complete(result: schemas.PipelineResult) -> bool:
+    # Snippets with failed steps or inserts are not stored, so a retry processes them again.
+    return result.sentences_failed == 0 and all(achievement.outcome != "failed" for achievement in result.achievements)
+
+async def run_once(text: str, idempotency_key: str | None, compute) -> tuple[schemas.PipelineResult, bool]:
+    """
+    Runs `await compute(text)` unless a stored or in-flight result for the same
+    snippet exists.
+
+    Returns:
+        tuple[schemas.PipelineResult, bool]: The result and whether it was replayed
+        (stored or shared with a concurrent identical submission) rather than computed.
+
+    Raises:
+        IdempotencyKeyConflict: The key was already used with a different text.
+    """
+    store = get_store()
+    key, text_hash = result_key(text, idempotency_key)
+    if store is None or key is None:
+        return await compute(text), False
+
+    while (pending := _inflight.get(key)) is not None:
+        try:
+            result, pending_hash = await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            if pending.cancelled():
+                continue # The submission we were waiting on was abandoned; run it ourselves.
+            raise
+        if pending_hash != text_hash:
+            raise IdempotencyKeyConflict(f"Idempotency key '{idempotency_key}' is in use for a different text.")
+        store.count("coalesced")
+        return result.model_copy(deep=True), True
+
+    # Registered before the store lookup (nothing is awaited since the loop above
+    # found no entry) and removed only once the result is stored, so an identical
+    # submission always finds either this run or its stored record.
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        record = await asyncio.to_thread(store.get, key)
+        if record is not None:
+            result, replayed = schemas.PipelineResult.model_validate(record["result"]), True
+            stored_hash = record["content_hash"]
+        else:
+            result, replayed = await compute(text), False
+            stored_hash = text_hash
+            if _is_complete(result):
+                await asyncio.to_thread(store.put, key, text_hash, result)
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception() # Retrieved here, so a future nobody waited on doesn't log it.
+        raise
+    finally:
+        _inflight.pop(key, None)
+    future.set_result((result, stored_hash))
+    if replayed:
+        if stored_hash != text_hash:
+            raise IdempotencyKeyConflict(f"Idempotency key '{idempotency_key}' was already used for a different text.")
+        store.count("replays")
+    return result, replayed
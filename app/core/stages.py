@@ -0,0 +1,174 @@
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+_POLL_SECONDS = 0.1
+
+class Stage:
+    """
+    One step of a streaming pipeline: `func(item) -> item | None` runs on
+    `concurrency` worker threads. Returning None (or an empty list) drops the item.
+    """
+
+    def __init__(self, name: str, func: Callable, concurrency: int = 1):
+        self.name = name
+        self.func = func
+        self.concurrency = max(1, concurrency)
+
+def _new_timing() -> dict:
+    return {"items_in": 0, "items_out": 0, "busy_seconds": 0.0, "blocked_seconds": 0.0}
+
+def run_stages(source: Iterable, stages: list[Stage], queue_size: int, timings: dict | None = None) -> Iterator:
+    """
+    Connects `source` -> stages -> caller with bounded queues and yields what the
+    last stage produces. Every stage works concurrently with the others, so (for
+    example) inference on one chunk overlaps DB work on the previous one, and at most
+    `queue_size` items wait between two stages, keeping memory flat for huge inputs.
+
+    `timings` (if given) is filled per stage with items in/out, busy seconds (time
+    inside `func`, summed over workers) and blocked seconds (time waiting for room
+    downstream). An exception in the source or any stage stops the pipeline and is
+    re-raised to the caller.
+    """
+    timings = timings if timings is not None else {}
+    for stage in stages:
+        timings[stage.name] = _new_timing()
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+    stop = threading.Event()
+    errors: list[BaseException] = []
+    lock = threading.Lock()
+    remaining_workers = [stage.concurrency for stage in stages]
+
+    def _put(q: queue.Queue, item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(q: queue.Queue):
+        while not stop.is_set():
+            try:
+                return q.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _fail(e: BaseException):
+        with lock:
+            errors.append(e)
+        stop.set()
+
+    def _feed():
+        try:
+            for item in source:
+                if not _put(queues[0], item):
+                    return
+        except Exception as e:
+            logger.exception("Pipeline source failed.")
+            _fail(e)
+            return
+        for _ in range(stages[0].concurrency if stages else 1):
+            _put(queues[0], _DONE)
+
+    def _work(index: int):
+        stage = stages[index]
+        timing = timings[stage.name]
+        inbox, outbox = queues[index], queues[index + 1]
+        try:
+            while True:
+                item = _get(inbox)
+                if item is _DONE:
+                    break
+                started = time.perf_counter()
+                output = stage.func(item)
+                busy = time.perf_counter() - started
+                with lock:
+                    timing["items_in"] += 1
+                    timing["busy_seconds"] += busy
+                if output is None or (isinstance(output, list) and not output):
+                    continue
+                started = time.perf_counter()
+                if not _put(outbox, output):
+                    return
+                with lock:
+                    timing["items_out"] += 1
+                    timing["blocked_seconds"] += time.perf_counter() - started
+        except Exception as e:
+            logger.exception(f"Pipeline stage '{stage.name}' failed.")
+            _fail(e)
+            return
+        # The last worker of a stage to finish tells every worker of the next stage.
+        with lock:
+            remaining_workers[index] -= 1
+            last = remaining_workers[index] == 0
+        if last:
+            downstream = stages[index + 1].concurrency if index + 1 < len(stages) else 1
+            for _ in range(downstream):
+                _put(outbox, _DONE)
+
+    threads = [threading.Thread(target=_feed, name="stage-source", daemon=True)]
+    for index, stage in enumerate(stages):
+        for worker_no in range(stage.concurrency):
+            threads.append(threading.Thread(target=_work, args=(index,), name=f"stage-{stage.name}-{worker_no}", daemon=True))
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            item = _get(queues[-1])
+            if item is _DONE:
+                break
+            yield item
+        if errors:
+            raise errors[0]
+    finally:
+        # Also reached when the caller stops iterating early: unblock and reap workers.
+        stop.set()
+        for thread in threads:
+            thread.join()
+        for timing in timings.values():
+            timing["busy_seconds"] = round(timing["busy_seconds"], 4)
+            timing["blocked_seconds"] = round(timing["blocked_seconds"], 4)
+
+def run_inline(source: Iterable, stages: list[Stage], timings: dict | None = None) -> Iterator:
+    """
+    Same contract as run_stages, but every stage runs on the calling thread, one
+    item at a time (used for profiled requests, where a single profiler has to
+    see all the work). Blocked seconds are always 0.
+    """
+    timings = timings if timings is not None else {}
+    for stage in stages:
+        timings[stage.name] = _new_timing()
+    for item in source:
+        for stage in stages:
+            timing = timings[stage.name]
+            started = time.perf_counter()
+            item = stage.func(item)
+            timing["items_in"] += 1
+            timing["busy_seconds"] += time.perf_counter() - started
+            if item is None or (isinstance(item, list) and not item):
+                break
+            timing["items_out"] += 1
+        else:
+            yield item
+    for timing in timings.values():
+        timing["busy_seconds"] = round(timing["busy_seconds"], 4)
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    """Groups an iterable into lists of at most `size` items without materializing it."""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
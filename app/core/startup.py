@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import time
+
+from app.models import loader
+from app.db import database
+from app.core import employee_index, expectation_index, executor, jobs, documents, dedup
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+STATUS_STARTING = "starting"
+STATUS_READY = "ready"
+STATUS_FAILED = "failed"
+
+# --- Startup State ---
+_status = STATUS_STARTING
+_error: str | None = None
+_phases: dict[str, float] = {}
+_started_at = 0.0
+_ready_seconds: float | None = None
+_task: asyncio.Task | None = None
+# ---------------------
+
+def _worker_models_loaded() -> bool:
+    """Runs on an inference worker process; spawning it runs the worker initializer (model loading)."""
+    return loader.models_loaded()
+
+async def _timed_phase(name: str, func, *args):
+    started = time.perf_counter()
+    try:
+        return await asyncio.to_thread(func, *args)
+    finally:
+        _phases[name] = round(time.perf_counter() - started, 3)
+
+async def _load_models():
+    if settings.INFERENCE_EXECUTOR == "process":
+        # Each inference worker process loads its own models (see app/core/executor.py);
+        # wait until at least one worker is up.
+        started = time.perf_counter()
+        loaded = await executor.run_inference(_worker_models_loaded)
+        _phases["worker_models"] = round(time.perf_counter() - started, 3)
+        return loaded
+    timings = await asyncio.to_thread(loader.startup_load_models)
+    _phases.update(timings)
+    if not loader.models_loaded():
+        return False
+    _phases["warmup"] = await asyncio.to_thread(loader.warmup_models, settings.STARTUP_WARMUP_BATCHES)
+    return True
+
+async def _load_data():
+    await _timed_phase("db_pool", database.init_db_pool)
+    # Both indexes load from the database independently.
+    await asyncio.gather(
+        _timed_phase("employee_index", employee_index.start),
+        _timed_phase("expectation_index", expectation_index.start),
+        _timed_phase("sentence_tokenizer", documents.load_tokenizer),
+        _timed_phase("evidence_dedup", dedup.start),
+    )
+
+async def run_startup():
+    """
+    Brings the application up: the DB pool and in-memory indexes load while both
+    models load (concurrently with each other), then the models are warmed up and
+    the job workers start. Logs a per-phase timing breakdown when done.
+    """
+    global _status, _error, _ready_seconds
+    executor.start()
+    try:
+        models_ok, _ = await asyncio.gather(_load_models(), _load_data())
+    except Exception as e:
+        logger.exception("Application startup failed.")
+        _status, _error = STATUS_FAILED, str(e)
+        return
+    if not models_ok:
+        _status, _error = STATUS_FAILED, "ML models failed to load (see logs)."
+        logger.error("Application startup: ML models failed to load; the API will stay not ready.")
+        return
+    jobs.start()
+    _ready_seconds = round(time.perf_counter() - _started_at, 3)
+    _status = STATUS_READY
+    breakdown = ", ".join(f"{name}={seconds}s" for name, seconds in _phases.items())
+    logger.info(f"Application ready after {_ready_seconds}s ({breakdown}).")
+
+async def start():
+    """
+    Called from the lifespan. With STARTUP_LAZY_MODELS the startup runs in the
+    background so the server (root, health and test endpoints) is up at once;
+    otherwise it completes before the server accepts requests.
+    """
+    global _task, _started_at
+    _started_at = time.perf_counter()
+    if settings.STARTUP_LAZY_MODELS:
+        _task = asyncio.create_task(run_startup(), name="application-startup")
+    else:
+        await run_startup()
+
+async def stop():
+    """Cancels a still-running background startup. Called on application shutdown."""
+    global _task
+    if _task is not None and not _task.done():
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+    _task = None
+
+def is_ready() -> bool:
+    return _status == STATUS_READY
+
+def get_startup_status() -> dict:
+    return {
+        "status": _status,
+        "error": _error,
+        "models_loaded": loader.models_loaded() if settings.INFERENCE_EXECUTOR != "process" else None,
+        "database_pool_initialized": database.get_pool_stats()["initialized"],
+        "seconds_to_ready": _ready_seconds,
+        "phases": dict(_phases),
+    }
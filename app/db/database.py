@@ -1,12 +1,37 @@
 # app/db/database.py
+import asyncio
+import select
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager
 import psycopg2
 import psycopg2.extras # For dictionary cursor
+from psycopg2 import pool as pg_pool
 from app.core.config import settings # Import the settings instance
+from app.core import metrics
 import logging # Use logging instead of print for messages
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# --- Connection Pool State ---
+_db_pool = None
+_pool_lock = threading.Lock()
+# Bounds concurrent checkouts to the pool size so callers wait (up to
+# DB_POOL_TIMEOUT) instead of psycopg2 raising PoolError when exhausted.
+_pool_slots = None
+_pool_stats = {
+    "acquired_total": 0,
+    "timeouts_total": 0,
+    "errors_total": 0,
+    "discarded_total": 0,
+    "in_use": 0,
+    "waiting": 0,
+    "peak_in_use": 0,
+    "wait_seconds_total": 0.0,
+}
+# -----------------------------
+
 def get_db_connection():
     """Establishes a connection to the PostgreSQL database using settings."""
     conn = None # Initialize conn to None
@@ -39,19 +64,276 @@ def get_db_cursor(conn):
     # Return rows as dictionaries
     return conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
 
-# Example usage pattern (will be used in endpoints)
-# conn = None
-# cur = None
-# try:
-#     conn = get_db_connection()
-#     if conn:
-#         cur = get_db_cursor(conn)
-#         # cur.execute(...)
-#         # results = cur.fetchall()
-#         # conn.commit() # If modifying data
-# except Exception as e:
-#     logger.error(f"Database operation failed: {e}")
-#     if conn: conn.rollback() # Rollback on error if modifying data
-# finally:
-#     if cur: cur.close()
-#     if conn: conn.close()
\ No newline at end of file
+# --- Connection Pool ---
+
+def init_db_pool():
+    """Creates the shared connection pool (sized from settings). Safe to call more than once."""
+    global _db_pool, _pool_slots
+    with _pool_lock:
+        if _db_pool is not None:
+            logger.debug("Database connection pool already initialized.")
+            return _db_pool
+        try:
+            _db_pool = pg_pool.ThreadedConnectionPool(
+                minconn=settings.DB_POOL_MIN_SIZE,
+                maxconn=settings.DB_POOL_MAX_SIZE,
+                dbname=settings.DB_NAME,
+                user=settings.DB_USER,
+                password=settings.DB_PASSWORD,
+                host=settings.DB_HOST,
+                port=settings.DB_PORT
+            )
+            _pool_slots = threading.BoundedSemaphore(settings.DB_POOL_MAX_SIZE)
+            logger.info(f"Database connection pool initialized (min={settings.DB_POOL_MIN_SIZE}, max={settings.DB_POOL_MAX_SIZE}).")
+        except psycopg2.OperationalError as e:
+            logger.error(f"Error initializing database connection pool: {e}")
+            _db_pool = None
+            _pool_slots = None
+        return _db_pool
+
+def close_db_pool():
+    """Closes every connection held by the pool. Called on application shutdown."""
+    global _db_pool, _pool_slots
+    with _pool_lock:
+        if _db_pool is None:
+            return
+        try:
+            _db_pool.closeall()
+            logger.info("Database connection pool closed.")
+        except Exception as e:
+            logger.error(f"Error closing database connection pool: {e}")
+        finally:
+            _db_pool = None
+            _pool_slots = None
+
+def _acquire_pooled_connection():
+    """Checks a live connection out of the pool, waiting up to DB_POOL_TIMEOUT for a free slot."""
+    db_pool = _db_pool or init_db_pool()
+    slots = _pool_slots
+    if db_pool is None or slots is None:
+        return None
+
+    started = time.perf_counter()
+    with _pool_lock:
+        _pool_stats["waiting"] += 1
+    acquired = slots.acquire(timeout=settings.DB_POOL_TIMEOUT)
+    waited = time.perf_counter() - started
+    metrics.DB_ACQUIRE_SECONDS.observe(waited)
+    with _pool_lock:
+        _pool_stats["waiting"] -= 1
+        _pool_stats["wait_seconds_total"] += waited
+        if not acquired:
+            _pool_stats["timeouts_total"] += 1
+    if not acquired:
+        logger.error(f"Timed out after {settings.DB_POOL_TIMEOUT}s waiting for a pooled database connection.")
+        return None
+
+    try:
+        conn = db_pool.getconn()
+        if conn.closed:
+            # Server restarts / idle timeouts leave dead sockets in the pool; replace them.
+            db_pool.putconn(conn, close=True)
+            with _pool_lock:
+                _pool_stats["discarded_total"] += 1
+            conn = db_pool.getconn()
+    except (psycopg2.Error, pg_pool.PoolError) as e:
+        slots.release()
+        with _pool_lock:
+            _pool_stats["errors_total"] += 1
+        logger.error(f"Error getting connection from pool: {e}")
+        return None
+
+    with _pool_lock:
+        _pool_stats["acquired_total"] += 1
+        _pool_stats["in_use"] += 1
+        _pool_stats["peak_in_use"] = max(_pool_stats["peak_in_use"], _pool_stats["in_use"])
+    return conn
+
+def _release_pooled_connection(conn, discard: bool = False):
+    """Returns a connection to the pool (rolling back any open transaction)."""
+    db_pool = _db_pool
+    slots = _pool_slots
+    try:
+        if db_pool is not None:
+            db_pool.putconn(conn, close=discard or bool(conn.closed))
+        else:
+            # Pool was closed while the connection was checked out.
+            conn.close()
+    except Exception as e:
+        logger.error(f"Error returning connection to pool: {e}")
+    finally:
+        with _pool_lock:
+            _pool_stats["in_use"] -= 1
+            if discard:
+                _pool_stats["discarded_total"] += 1
+        if slots is not None:
+            slots.release()
+
+@contextmanager
+def db_connection():
+    """
+    Context manager yielding a pooled connection (or None if none could be obtained).
+    The connection is returned to the pool on exit; uncommitted work is rolled back.
+
+    Usage:
+        with db_connection() as conn:
+            if conn:
+                cur = get_db_cursor(conn)
+                ...
+    """
+    conn = _acquire_pooled_connection()
+    if conn is None:
+        yield None
+        return
+    discard = False
+    try:
+        yield conn
+    except psycopg2.InterfaceError:
+        discard = True
+        raise
+    finally:
+        _release_pooled_connection(conn, discard=discard)
+
+async def run_with_db_connection(func, *args, **kwargs):
+    """
+    Async variant: runs `func(conn, *args, **kwargs)` with a pooled connection in a
+    worker thread, so the wait for a free connection and the query itself do not
+    block the event loop. `conn` is None if no connection could be obtained.
+    """
+    def _call():
+        with db_connection() as conn:
+            return func(conn, *args, **kwargs)
+    return await asyncio.to_thread(_call)
+
+@asynccontextmanager
+async def async_db_connection():
+    """Async context manager that checks a pooled connection out without blocking the event loop."""
+    conn = await asyncio.to_thread(_acquire_pooled_connection)
+    if conn is None:
+        yield None
+        return
+    discard = False
+    try:
+        yield conn
+    except psycopg2.InterfaceError:
+        discard = True
+        raise
+    finally:
+        await asyncio.to_thread(_release_pooled_connection, conn, discard)
+
+def get_pool_stats() -> dict:
+    """Returns a snapshot of pool sizing and saturation counters."""
+    with _pool_lock:
+        stats = dict(_pool_stats)
+    stats["initialized"] = _db_pool is not None
+    stats["min_size"] = settings.DB_POOL_MIN_SIZE
+    stats["max_size"] = settings.DB_POOL_MAX_SIZE
+    stats["available"] = max(settings.DB_POOL_MAX_SIZE - stats["in_use"], 0) if _db_pool is not None else 0
+    stats["saturation"] = stats["in_use"] / settings.DB_POOL_MAX_SIZE if settings.DB_POOL_MAX_SIZE else 0.0
+    return stats
+
+def _pool_gauges() -> list[tuple]:
+    stats = get_pool_stats()
+    return [
+        ("db_pool_connections", "Pooled database connections by state.", {"state": "in_use"}, stats["in_use"]),
+        ("db_pool_connections", "Pooled database connections by state.", {"state": "available"}, stats["available"]),
+        ("db_pool_connections", "Pooled database connections by state.", {"state": "max"}, stats["max_size"]),
+        ("db_pool_waiting", "Threads waiting for a pooled database connection.", {}, stats["waiting"]),
+    ]
+
+metrics.register_gauges(_pool_gauges)
+
+def check_db_pool_health() -> dict:
+    """Runs a trivial query on a pooled connection and reports latency alongside pool stats."""
+    health = {"healthy": False, "latency_ms": None, "error": None}
+    started = time.perf_counter()
+    try:
+        with db_connection() as conn:
+            if conn is None:
+                health["error"] = "No database connection available."
+            else:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1;")
+                    cur.fetchone()
+                conn.rollback()
+                health["healthy"] = True
+    except psycopg2.Error as e:
+        health["error"] = str(e)
+    health["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    health["pool"] = get_pool_stats()
+    return health
+
+# --- LISTEN/NOTIFY ---
+_LISTENER_RETRY_SECONDS = 5.0 # Back-off after a lost connection or a failed callback
+
+def run_notification_listener(channel: str, on_notify, stop_event: threading.Event, on_connect=None, on_tick=None, poll_seconds: float = 1.0):
+    """
+    Blocking loop (run it in a daemon thread) that LISTENs on `channel` over a
+    dedicated connection and calls `on_notify(payload)` for every notification.
+    `on_connect()` runs after each (re)connect so callers can resync state missed
+    while disconnected; `on_tick()` runs roughly every `poll_seconds`.
+    Database errors and exceptions raised by the callbacks are logged, and the
+    connection is reopened after _LISTENER_RETRY_SECONDS. Returns when
+    `stop_event` is set.
+    """
+    listen_conn = None
+    while not stop_event.is_set():
+        try:
+            if listen_conn is None or listen_conn.closed:
+                # A dedicated connection: LISTEN must outlive any single pooled checkout.
+                listen_conn = get_db_connection()
+                if listen_conn:
+                    listen_conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                    with listen_conn.cursor() as cur:
+                        cur.execute(f"LISTEN {channel};")
+                    logger.info(f"Listening for notifications on channel '{channel}'.")
+                    if on_connect:
+                        on_connect()
+
+            if on_tick:
+                on_tick()
+
+            if listen_conn is None:
+                stop_event.wait(_LISTENER_RETRY_SECONDS)
+                continue
+            if select.select([listen_conn], [], [], poll_seconds) == ([], [], []):
+                continue
+            listen_conn.poll()
+            while listen_conn.notifies:
+                on_notify(listen_conn.notifies.pop(0).payload)
+        except (psycopg2.Error, OSError) as e:
+            logger.error(f"Listener connection for channel '{channel}' lost: {e}. Reconnecting.")
+            listen_conn = _close_listener(listen_conn)
+            stop_event.wait(_LISTENER_RETRY_SECONDS)
+        except Exception:
+            # A failed callback (e.g. an index reload) must not end the thread; reconnecting runs on_connect to resync.
+            logger.exception(f"Listener callback for channel '{channel}' failed. Reconnecting.")
+            listen_conn = _close_listener(listen_conn)
+            stop_event.wait(_LISTENER_RETRY_SECONDS)
+
+    _close_listener(listen_conn)
+
+def _close_listener(listen_conn) -> None:
+    if listen_conn is not None and not listen_conn.closed:
+        try:
+            listen_conn.close()
+        except Exception:
+            pass
+    return None
+
+def notify_channel(channel: str, payload: str = ""):
+    """Sends a NOTIFY on `channel` (used by scripts/admin actions to signal data changes)."""
+    conn = get_db_connection()
+    if not conn:
+        logger.error(f"DB connection failed. Cannot notify channel '{channel}'.")
+        return False
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_notify(%s, %s);", (channel, payload))
+        conn.commit()
+        return True
+    except psycopg2.Error as e:
+        logger.error(f"Error sending notification on channel '{channel}': {e}")
+        return False
+    finally:
+        conn.close()
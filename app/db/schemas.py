@@ -1,13 +1,76 @@
 # app/db/schemas.py
+from datetime import datetime
 from pydantic import BaseModel
 
 class ProcessRequest(BaseModel):
     text: str
+    include_timings: bool = False # Return a per-step latency breakdown in the response
 
 class ProcessResponse(BaseModel):
     status: str
     achievements_created: int = 0
     message: str | None = None
+    replayed: bool = False # Stored result of an earlier identical submission (see app/core/results.py)
+    timings: dict[str, float] | None = None # Seconds: "total" plus one entry per pipeline step
+    profile: dict | None = None # Profile report of a profiled request (see app/core/profiling.py)
+
+class UploadResponse(BaseModel):
+    status: str
+    format: str
+    bytes_received: int = 0
+    sentences_total: int = 0
+    sentences_prefiltered: int = 0
+    sentences_deduplicated: int = 0
+    employee_sentences: int = 0
+    matches: int = 0
+    achievements_created: int = 0
+
+class Achievement(BaseModel):
+    employee_id: int
+    expectation_id: int
+    distance: float
+    evidence_snippet: str
+    outcome: str | None = None # "inserted", "duplicate" or "failed"
+
+class PipelineResult(BaseModel):
+    sentences_total: int = 0
+    sentences_prefiltered: int = 0 # Sentences skipped without running NER
+    sentences_deduplicated: int = 0 # Near-duplicates of evidence already recorded (see app/core/dedup.py)
+    sentences_failed: int = 0 # Sentences whose NER, embedding or expectation match failed
+    employee_sentences: int = 0 # Sentences naming exactly one known employee
+    matches: int = 0 # Sentences whose best match is below the similarity threshold
+    achievements_created: int = 0
+    achievements: list[Achievement] = []
+    stage_seconds: dict[str, float] = {} # Time spent inside each pipeline stage
+    step_seconds: dict[str, float] = {} # Time spent per step (segment, prefilter, ner, employee_lookup, encode, match, record)
+
+class BatchItem(BaseModel):
+    client_id: str
+    text: str
+
+class BatchRequest(BaseModel):
+    items: list[BatchItem]
+
+class BatchItemResult(BaseModel):
+    client_id: str
+    status: str # "Processed" or "Error"
+    achievements_created: int = 0
+    achievements: list[Achievement] = []
+    error: str | None = None
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: str # "queued", "running", "succeeded", "failed" or "cancelled"
+    sentences_total: int = 0
+    sentences_processed: int = 0
+    employee_sentences: int = 0
+    matches: int = 0
+    achievements_created: int = 0
+    cancel_requested: bool = False
+    error: str | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
 
 # --- Add this new model ---
 class Employee(BaseModel):
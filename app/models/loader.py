@@ -1,7 +1,10 @@
 import logging
-import torch 
-from sentence_transformers import SentenceTransformer
-from transformers import pipeline 
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.config import settings
+from app.core import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -10,20 +13,109 @@ SENTENCE_MODEL_NAME = 'all-MiniLM-L6-v2'
 NER_MODEL_NAME = 'dslim/bert-base-NER'
 # -------------------------
 
+# --- Inference Backends (settings.INFERENCE_BACKEND) ---
+BACKEND_TORCH = "torch"                     # PyTorch eager (default)
+BACKEND_TORCH_INFERENCE = "torch_inference" # PyTorch under inference_mode with tuned thread counts
+BACKEND_ONNX = "onnx"                       # ONNX Runtime, exported by scripts/export_onnx_models.py
+# Sub-directories / file names written by scripts/export_onnx_models.py
+ONNX_NER_SUBDIR = "ner"
+ONNX_SENTENCE_SUBDIR = "sentence"
+ONNX_NER_QUANTIZED_FILE = "model_quantized.onnx"
+ONNX_SENTENCE_QUANTIZED_FILE = "onnx/model_qint8_avx512_vnni.onnx"
+# -------------------------
+
 ner_model_instance = None
 sentence_transformer_instance = None
 
+# torch / transformers / sentence_transformers are imported inside the functions that
+# need them: importing them takes seconds, and the API should be able to serve health
+# and test endpoints while the models are still loading (see app/core/startup.py).
+
+def backend_id() -> str:
+    """Identifies the backend variant; outputs can differ between variants (e.g. int8)."""
+    if settings.INFERENCE_BACKEND == BACKEND_ONNX:
+        return "onnx-int8" if settings.ONNX_QUANTIZED else "onnx"
+    # Both PyTorch variants produce the same outputs.
+    return "torch"
+
+def _onnx_path(subdir: str) -> str:
+    return os.path.join(settings.ONNX_MODEL_DIR, subdir)
+
+class _InferenceModeWrapper:
+    """
+    Runs every call of the wrapped NER pipeline / SentenceTransformer under
+    torch.inference_mode(), while exposing the wrapped object's interface
+    (__call__, encode, attributes) unchanged.
+    """
+
+    def __init__(self, model):
+        self._model = model
+
+    def __call__(self, *args, **kwargs):
+        import torch
+        with torch.inference_mode():
+            return self._model(*args, **kwargs)
+
+    def encode(self, *args, **kwargs):
+        import torch
+        with torch.inference_mode():
+            return self._model.encode(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+def _configure_torch_threads():
+    import torch
+    if settings.INFERENCE_TORCH_THREADS > 0:
+        torch.set_num_threads(settings.INFERENCE_TORCH_THREADS)
+        logger.info(f"PyTorch intra-op threads set to {settings.INFERENCE_TORCH_THREADS}.")
+    if settings.INFERENCE_TORCH_INTEROP_THREADS > 0:
+        try:
+            torch.set_num_interop_threads(settings.INFERENCE_TORCH_INTEROP_THREADS)
+            logger.info(f"PyTorch inter-op threads set to {settings.INFERENCE_TORCH_INTEROP_THREADS}.")
+        except RuntimeError as e:
+            # Only allowed before any inter-op parallel work has started.
+            logger.warning(f"Could not set PyTorch inter-op threads: {e}")
+
+def _load_onnx_ner():
+    from optimum.onnxruntime import ORTModelForTokenClassification
+    from transformers import AutoTokenizer, pipeline
+
+    path = _onnx_path(ONNX_NER_SUBDIR)
+    file_name = ONNX_NER_QUANTIZED_FILE if settings.ONNX_QUANTIZED else "model.onnx"
+    model = ORTModelForTokenClassification.from_pretrained(path, file_name=file_name)
+    tokenizer = AutoTokenizer.from_pretrained(path)
+    return pipeline("ner", model=model, tokenizer=tokenizer, grouped_entities=True)
+
+def _load_onnx_sentence_transformer():
+    from sentence_transformers import SentenceTransformer
+    path = _onnx_path(ONNX_SENTENCE_SUBDIR)
+    file_name = ONNX_SENTENCE_QUANTIZED_FILE if settings.ONNX_QUANTIZED else "onnx/model.onnx"
+    return SentenceTransformer(path, backend="onnx", model_kwargs={"file_name": file_name})
+
 def load_ner_model():
     """Loads the NER model using the transformers pipeline."""
     global ner_model_instance
     if ner_model_instance is None:
+        if settings.INFERENCE_BACKEND == BACKEND_ONNX:
+            try:
+                ner_model_instance = _load_onnx_ner()
+                logger.info(f"NER model ('{NER_MODEL_NAME}') loaded with ONNX Runtime ({backend_id()}) from '{_onnx_path(ONNX_NER_SUBDIR)}'.")
+            except Exception as e:
+                logger.exception(f"Failed to load ONNX NER model (run scripts/export_onnx_models.py first). Error: {e}")
+                ner_model_instance = None
+            return ner_model_instance
+
+        import torch
+        from transformers import pipeline
+
         # Determine device: Use GPU if available, otherwise CPU
         if torch.cuda.is_available():
-            device_id = 0 
+            device_id = 0
             device_name = f"cuda:{device_id}"
             logger.info(f"CUDA available. Loading NER model on GPU ({torch.cuda.get_device_name(device_id)})...")
         else:
-            device_id = -1 
+            device_id = -1
             device_name = "cpu"
             logger.info("CUDA not available. Loading NER model on CPU...")
 
@@ -32,35 +124,104 @@ def load_ner_model():
                 "ner",
                 model=NER_MODEL_NAME,
                 grouped_entities=True,
-                device=device_id 
+                device=device_id
             )
-            logger.info(f"NER model ('{NER_MODEL_NAME}') loaded successfully on {device_name}.")
+            if settings.INFERENCE_BACKEND == BACKEND_TORCH_INFERENCE:
+                ner_model_instance = _InferenceModeWrapper(ner_model_instance)
+            logger.info(f"NER model ('{NER_MODEL_NAME}') loaded successfully on {device_name} ({settings.INFERENCE_BACKEND}).")
         except Exception as e:
             logger.exception(f"Failed to load NER model '{NER_MODEL_NAME}'. Error: {e}")
             ner_model_instance = None
     else:
-        logger.debug("NER model already loaded.") 
+        logger.debug("NER model already loaded.")
     return ner_model_instance
 
 def load_sentence_transformer():
     """Loads the Sentence Transformer model."""
     global sentence_transformer_instance
     if sentence_transformer_instance is None:
-        logger.info(f"Loading Sentence Transformer model ('{SENTENCE_MODEL_NAME}')...")
+        logger.info(f"Loading Sentence Transformer model ('{SENTENCE_MODEL_NAME}', backend: {backend_id()})...")
         try:
-            sentence_transformer_instance = SentenceTransformer(SENTENCE_MODEL_NAME)
+            if settings.INFERENCE_BACKEND == BACKEND_ONNX:
+                sentence_transformer_instance = _load_onnx_sentence_transformer()
+            else:
+                from sentence_transformers import SentenceTransformer
+                sentence_transformer_instance = SentenceTransformer(SENTENCE_MODEL_NAME)
+                if settings.INFERENCE_BACKEND == BACKEND_TORCH_INFERENCE:
+                    sentence_transformer_instance = _InferenceModeWrapper(sentence_transformer_instance)
             effective_device = sentence_transformer_instance.device
             logger.info(f"Sentence Transformer model ('{SENTENCE_MODEL_NAME}') loaded successfully on device: {effective_device}.")
         except Exception as e:
             logger.exception(f"Failed to load Sentence Transformer model '{SENTENCE_MODEL_NAME}'. Error: {e}")
             sentence_transformer_instance = None
     else:
-        logger.debug("Sentence Transformer model already loaded.") 
+        logger.debug("Sentence Transformer model already loaded.")
     return sentence_transformer_instance
 
-def startup_load_models():
-    """Function to be called on application startup to preload models."""
-    logger.info("Preloading ML models on application startup...")
-    load_sentence_transformer()
-    load_ner_model()
-    logger.info("ML model preloading finished (check logs above for success/failure).")
\ No newline at end of file
+def models_loaded() -> bool:
+    return ner_model_instance is not None and sentence_transformer_instance is not None
+
+def _timed(load) -> float:
+    started = time.perf_counter()
+    load()
+    return round(time.perf_counter() - started, 3)
+
+_load_seconds: dict[str, float] = {}
+
+def _model_gauges() -> list[tuple]:
+    samples = [
+        ("model_loaded", "1 if the model is loaded in this process.", {"model": "ner"}, int(ner_model_instance is not None)),
+        ("model_loaded", "1 if the model is loaded in this process.", {"model": "sentence"}, int(sentence_transformer_instance is not None)),
+    ]
+    samples += [("model_load_seconds", "Seconds the startup model load took.", {"model": name}, seconds) for name, seconds in _load_seconds.items()]
+    return samples
+
+metrics.register_gauges(_model_gauges)
+
+def startup_load_models() -> dict[str, float]:
+    """
+    Function to be called on application startup to preload models. Both models
+    load concurrently (model loading is mostly file I/O and C++ work that releases
+    the GIL). Returns the seconds each one took.
+    """
+    logger.info(f"Preloading ML models on application startup (inference backend: {settings.INFERENCE_BACKEND})...")
+    if settings.INFERENCE_BACKEND == BACKEND_TORCH_INFERENCE:
+        _configure_torch_threads()
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="model-load") as pool:
+        sentence_future = pool.submit(_timed, load_sentence_transformer)
+        ner_future = pool.submit(_timed, load_ner_model)
+        timings = {"load_sentence_model": sentence_future.result(), "load_ner_model": ner_future.result()}
+    _load_seconds.update({"sentence": timings["load_sentence_model"], "ner": timings["load_ner_model"]})
+    logger.info(f"ML model preloading finished (check logs above for success/failure): {timings}")
+    return timings
+
+# --- Warmup ---
+WARMUP_SENTENCES = [
+    "Alice Johnson led the migration of the billing service to the new cluster ahead of schedule.",
+    "Bob Smith mentored two junior engineers through their first on-call rotation.",
+    "The team reviewed the quarterly roadmap and agreed on the next milestones.",
+    "Maria Garcia automated the nightly data quality checks, saving hours of manual work every week.",
+]
+# --------------
+
+def warmup_models(batches: int) -> float:
+    """
+    Runs `batches` full-size NER and embedding batches (NER_BATCH_SIZE /
+    EMBEDDING_BATCH_SIZE sentences) straight through the models, so kernel
+    selection, thread-pool start-up and buffer allocation happen before the first
+    real request. Bypasses the inference cache. Returns the seconds it took.
+    """
+    if batches <= 0 or not models_loaded():
+        return 0.0
+    started = time.perf_counter()
+    ner_batch = [WARMUP_SENTENCES[i % len(WARMUP_SENTENCES)] for i in range(settings.NER_BATCH_SIZE)]
+    embedding_batch = [WARMUP_SENTENCES[i % len(WARMUP_SENTENCES)] for i in range(settings.EMBEDDING_BATCH_SIZE)]
+    try:
+        for _ in range(batches):
+            ner_model_instance(ner_batch, batch_size=settings.NER_BATCH_SIZE)
+            sentence_transformer_instance.encode(embedding_batch, batch_size=settings.EMBEDDING_BATCH_SIZE)
+    except Exception as e:
+        logger.warning(f"Model warmup failed (continuing): {e}")
+    elapsed = round(time.perf_counter() - started, 3)
+    logger.info(f"Model warmup finished: {batches} batch(es) in {elapsed}s.")
+    return elapsed
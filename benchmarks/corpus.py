@@ -0,0 +1,107 @@
+import random
+from dataclasses import dataclass, field
+
+# --- Vocabulary for synthetic reports ---
+FIRST_NAMES = [
+    "Alice", "Bob", "Carla", "Daniel", "Elena", "Farid", "Grace", "Hiro", "Ines", "Jonas",
+    "Kavya", "Liam", "Maria", "Nikolai", "Olivia", "Pedro", "Quinn", "Rania", "Samuel", "Tara",
+    "Umar", "Vera", "Wei", "Xenia", "Yusuf", "Zoe",
+]
+LAST_NAMES = [
+    "Anders", "Brooks", "Castillo", "Dubois", "Eriksen", "Fischer", "Garcia", "Hoffmann", "Ivanova", "Jensen",
+    "Kowalski", "Lindqvist", "Moreau", "Nakamura", "Okafor", "Petrovic", "Quintero", "Rossi", "Schmidt", "Tanaka",
+    "Ueda", "Varga", "Weber", "Xu", "Yilmaz", "Zielinski",
+]
+# People who appear in reports but are not employees (customers, vendors, ...).
+OUTSIDERS = ["Victor Lang", "Nora Blake", "Ethan Price", "Mila Hart", "Oscar Reyes"]
+
+SKILL_VERBS = [
+    "delivers", "improves", "documents", "automates", "reviews", "designs", "mentors others on",
+    "communicates", "tests", "monitors", "plans", "owns",
+]
+SKILL_OBJECTS = [
+    "release milestones on schedule", "the reliability of production services", "architecture decisions clearly",
+    "repetitive operational work", "code changes thoroughly", "scalable data pipelines", "incident response practices",
+    "project status to stakeholders", "edge cases before release", "system performance metrics",
+    "quarterly roadmap priorities", "customer escalations end to end", "onboarding material for new hires",
+    "security findings promptly", "cost of cloud infrastructure",
+]
+EVIDENCE_TEMPLATES = [
+    "{name} {verb} {object} this quarter.",
+    "During the review period {name} consistently {verb} {object}.",
+    "{name} {verb} {object}, which the whole team noticed.",
+    "In the last sprint {name} {verb} {object} without being asked.",
+]
+FILLER_SENTENCES = [
+    "The team met weekly to review progress against the plan.",
+    "Several dependencies slipped because of vendor delays.",
+    "Budget figures were finalized at the end of the month.",
+    "The office move is scheduled for the second half of the year.",
+    "Overall morale remained high despite the tight deadlines.",
+    "Meeting notes are stored in the shared drive.",
+    "The hiring pipeline has three open positions.",
+    "Feedback from the last retrospective was mostly positive.",
+]
+OUTSIDER_TEMPLATES = [
+    "{name} from the customer side joined the planning call.",
+    "The contract with {name} was renewed for another year.",
+]
+# ----------------------------------------
+
+def expectation_text(verb: str, obj: str) -> str:
+    return f"Consistently {verb} {obj}."
+
+def synthetic_employees(count: int) -> list[tuple[int, str]]:
+    """Deterministic (employee_id, "First Last") pairs; unique full names for up to 676 employees."""
+    names = [f"{first} {last}" for last in LAST_NAMES for first in FIRST_NAMES]
+    return [(i + 1, names[i % len(names)]) for i in range(count)]
+
+def synthetic_expectations() -> list[tuple[int, str]]:
+    """(expectation_id, text) for every verb/object combination."""
+    texts = [expectation_text(verb, obj) for verb in SKILL_VERBS for obj in SKILL_OBJECTS]
+    return [(i + 1, text) for i, text in enumerate(texts)]
+
+@dataclass
+class Corpus:
+    documents: list[str]
+    employees: list[tuple[int, str]]
+    expectations: list[tuple[int, str]]
+    employee_sentences: list[str] = field(default_factory=list)
+    all_sentences: list[str] = field(default_factory=list)
+
+    @property
+    def sentence_count(self) -> int:
+        return len(self.all_sentences)
+
+def generate_corpus(documents: int, sentences_per_document: int, employee_density: float,
+                    employees: list[tuple[int, str]], expectations: list[tuple[int, str]],
+                    seed: int = 0, marker: str = "") -> Corpus:
+    """
+    Builds `documents` synthetic performance reports of `sentences_per_document`
+    sentences each. A fraction `employee_density` of the sentences names exactly
+    one employee together with skill evidence; a small share mentions an outsider
+    and the rest is filler. `marker` (if given) is appended to every evidence
+    sentence so rows written to a real database can be found and removed later.
+    """
+    rng = random.Random(seed)
+    names = [name for _, name in employees]
+    corpus = Corpus(documents=[], employees=employees, expectations=expectations)
+    suffix = f" (ref {marker})" if marker else ""
+    for _ in range(documents):
+        sentences = []
+        for _ in range(sentences_per_document):
+            roll = rng.random()
+            if roll < employee_density and names:
+                sentence = rng.choice(EVIDENCE_TEMPLATES).format(
+                    name=rng.choice(names), verb=rng.choice(SKILL_VERBS), object=rng.choice(SKILL_OBJECTS)
+                )
+                sentence = sentence[:-1] + suffix + "."
+                corpus.employee_sentences.append(sentence)
+            elif roll < employee_density + 0.05:
+                sentence = rng.choice(OUTSIDER_TEMPLATES).format(name=rng.choice(OUTSIDERS))
+            else:
+                sentence = rng.choice(FILLER_SENTENCES)
+            sentences.append(sentence)
+        corpus.all_sentences.extend(sentences)
+        corpus.documents.append(" ".join(sentences))
+    return corpus
@@ -0,0 +1,292 @@
+"""
+Offline pipeline benchmarks on synthetic report corpora.
+
+    python -m benchmarks.run_benchmarks                           # stub models, in-process DB stand-in
+    python -m benchmarks.run_benchmarks --models real --db postgres --output results.json
+    python -m benchmarks.run_benchmarks --compare baseline.json   # print the change against an earlier run
+
+Results (throughput, mean and p50/p95/p99 latency per benchmark, plus the run
+configuration and git commit) are written as JSON so runs can be compared between
+commits. With --db postgres the corpus uses the configured database's employees
+and expectations; achievements it records carry a per-run marker and are deleted
+afterwards.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks import corpus as corpus_module
+from benchmarks import standins
+
+logger = logging.getLogger("benchmarks")
+
+# --- Results ---
+
+def summarize(latencies_s: list[float], total_seconds: float, items_per_op: float = 1.0) -> dict:
+    latencies_ms = np.asarray(latencies_s) * 1000.0
+    ops = len(latencies_ms)
+    return {
+        "ops": ops,
+        "total_seconds": round(total_seconds, 4),
+        "ops_per_second": round(ops / total_seconds, 2) if total_seconds else None,
+        "items_per_second": round(ops * items_per_op / total_seconds, 2) if total_seconds else None,
+        "mean_ms": round(float(latencies_ms.mean()), 4) if ops else None,
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 4) if ops else None,
+        "p95_ms": round(float(np.percentile(latencies_ms, 95)), 4) if ops else None,
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 4) if ops else None,
+    }
+
+def time_each(func, inputs, warmup: int = 3) -> tuple[list[float], float]:
+    """Calls func(item) for every input (after `warmup` untimed calls); returns per-call latencies and wall time."""
+    for item in inputs[:warmup]:
+        func(item)
+    latencies = []
+    started = time.perf_counter()
+    for item in inputs:
+        call_started = time.perf_counter()
+        func(item)
+        latencies.append(time.perf_counter() - call_started)
+    return latencies, time.perf_counter() - started
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=project_root, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# --- Environment Setup ---
+
+def _configure_settings(args):
+    from app.core.config import settings
+    # Repeated synthetic sentences would otherwise be served from the inference cache.
+    settings.INFERENCE_CACHE_ENABLED = args.cache
+    settings.INFERENCE_CACHE_SQLITE_PATH = ""
+    if args.match_backend:
+        settings.EXPECTATION_MATCH_BACKEND = args.match_backend
+    return settings
+
+def _install_models(args, corpus):
+    from app.models import loader
+    if args.models == "real":
+        loader.startup_load_models()
+        if not loader.models_loaded():
+            raise SystemExit("Real models failed to load.")
+        loader.warmup_models(1)
+    else:
+        loader.ner_model_instance = standins.StubNERModel()
+        loader.sentence_transformer_instance = standins.StubSentenceModel()
+    return loader.ner_model_instance, loader.sentence_transformer_instance
+
+def _install_standin_db(args, corpus, sentence_model):
+    """Routes every db_connection() used by the pipeline to the in-process stand-in."""
+    from app.core import pipeline, employee_index, expectation_index
+    texts = [text for _, text in corpus.expectations]
+    vectors = sentence_model.encode(texts)
+    db = standins.StandInDatabase(corpus.employees, list(zip([i for i, _ in corpus.expectations], vectors)), args.standin_latency_ms)
+    for module in (pipeline, employee_index, expectation_index):
+        module.db_connection = db.connection
+    return db
+
+def _load_postgres_catalog(limit_employees: int):
+    from app.db.database import db_connection, get_db_cursor
+    with db_connection() as conn:
+        if conn is None:
+            raise SystemExit("Could not connect to Postgres (check .env).")
+        cur = get_db_cursor(conn)
+        cur.execute("SELECT employee_id, name FROM Employees ORDER BY employee_id LIMIT %s;", (limit_employees,))
+        employees = [(row["employee_id"], row["name"]) for row in cur.fetchall()]
+        cur.execute("SELECT expectation_id, expectation_text FROM Expectations WHERE embedding IS NOT NULL ORDER BY expectation_id;")
+        expectations = [(row["expectation_id"], row["expectation_text"]) for row in cur.fetchall()]
+        cur.close()
+    return employees, expectations
+
+def _delete_marked_achievements(marker: str) -> int:
+    from app.db.database import db_connection
+    with db_connection() as conn:
+        if conn is None:
+            return 0
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM EmployeeAchievements WHERE evidence_snippet LIKE %s;", (f"%{marker}%",))
+            deleted = cur.rowcount
+        conn.commit()
+    return deleted
+
+# --- Benchmarks ---
+
+def run(args) -> dict:
+    settings = _configure_settings(args)
+    from app.core import pipeline, employee_index, expectation_index, executor, batcher
+    from app.db import database
+
+    marker = f"BENCH{uuid.uuid4().hex[:8]}" if args.db == "postgres" else ""
+    if args.db == "postgres":
+        database.init_db_pool()
+        employees, expectations = _load_postgres_catalog(args.employees)
+    else:
+        employees = corpus_module.synthetic_employees(args.employees)
+        expectations = corpus_module.synthetic_expectations()
+    corpus = corpus_module.generate_corpus(
+        args.documents, args.sentences_per_document, args.employee_density, employees, expectations, args.seed, marker
+    )
+    ner_model, sentence_model = _install_models(args, corpus)
+    db = _install_standin_db(args, corpus, sentence_model) if args.db == "standin" else None
+    employee_index.load_index()
+    if settings.EXPECTATION_MATCH_BACKEND == "memory":
+        expectation_index.load_index()
+
+    sentences = corpus.all_sentences[: args.max_stage_ops]
+    employee_sentences = corpus.employee_sentences[: args.max_stage_ops] or sentences
+    logger.info(
+        f"Corpus: {len(corpus.documents)} documents, {corpus.sentence_count} sentences "
+        f"({len(corpus.employee_sentences)} naming employees), {len(employees)} employees, {len(expectations)} expectations."
+    )
+
+    results = {}
+    latencies, total = time_each(pipeline.segment_sentences, corpus.documents)
+    results["segment_sentences"] = summarize(latencies, total, args.sentences_per_document)
+
+    latencies, total = time_each(lambda s: pipeline.find_employee_in_sentence(s, ner_model), sentences)
+    results["find_employee_in_sentence"] = summarize(latencies, total)
+
+    latencies, total = time_each(lambda s: pipeline.find_best_expectation_match(s, sentence_model), employee_sentences)
+    results["find_best_expectation_match"] = summarize(latencies, total)
+
+    record_inputs = [(employees[i % len(employees)][0], expectations[i % len(expectations)][0], sentence)
+                     for i, sentence in enumerate(employee_sentences[: args.max_record_ops])]
+    latencies, total = time_each(lambda row: pipeline.record_achievement(*row), record_inputs)
+    results["record_achievement"] = summarize(latencies, total)
+
+    async def _process_documents():
+        executor.start()
+        for document in corpus.documents[: args.warmup_documents]:
+            await pipeline.process_text_snippet(document)
+        timed = []
+        started = time.perf_counter()
+        for document in corpus.documents:
+            call_started = time.perf_counter()
+            await pipeline.process_text_snippet(document)
+            timed.append(time.perf_counter() - call_started)
+        sequential_total = time.perf_counter() - started
+
+        # Same documents submitted concurrently, as under load.
+        started = time.perf_counter()
+        concurrent = await asyncio.gather(*(_timed_snippet(document) for document in corpus.documents))
+        concurrent_total = time.perf_counter() - started
+        return timed, sequential_total, list(concurrent), concurrent_total
+
+    async def _timed_snippet(document: str) -> float:
+        started = time.perf_counter()
+        await pipeline.process_text_snippet(document)
+        return time.perf_counter() - started
+
+    try:
+        timed, total, concurrent, concurrent_total = asyncio.run(_process_documents())
+    finally:
+        executor.shutdown()
+        batcher.stop()
+    results["process_text_snippet"] = summarize(timed, total, args.sentences_per_document)
+    results["process_text_snippet_concurrent"] = summarize(concurrent, concurrent_total, args.sentences_per_document)
+
+    cleanup = {}
+    if args.db == "postgres":
+        cleanup["achievements_deleted"] = _delete_marked_achievements(marker)
+        database.close_db_pool()
+    else:
+        cleanup["standin_statements"] = db.statements
+        cleanup["standin_achievements"] = len(db.achievements)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "models": args.models,
+            "db": args.db,
+            "standin_latency_ms": args.standin_latency_ms if args.db == "standin" else None,
+            "expectation_match_backend": settings.EXPECTATION_MATCH_BACKEND,
+            "inference_backend": settings.INFERENCE_BACKEND,
+            "inference_cache": args.cache,
+            "documents": args.documents,
+            "sentences_per_document": args.sentences_per_document,
+            "employee_density": args.employee_density,
+            "employees": len(employees),
+            "expectations": len(expectations),
+            "seed": args.seed,
+            **cleanup,
+        },
+        "results": results,
+    }
+
+def compare(current: dict, baseline: dict) -> str:
+    """Human-readable change of throughput and p50/p95 latency against a baseline result file."""
+    lines = [f"{'benchmark':<34}  {'ops/s':<30}  {'p50 ms':<30}  {'p95 ms':<30}"]
+    for name, now in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not before:
+            continue
+        cells = []
+        for key in ("ops_per_second", "p50_ms", "p95_ms"):
+            old, new = before.get(key), now.get(key)
+            change = f"{(new - old) / old * 100:+.1f}%" if old and new is not None else "n/a"
+            cells.append(f"{old} -> {new} ({change})")
+        lines.append(f"{name:<34}  " + "  ".join(f"{cell:<30}" for cell in cells))
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the evaluation pipeline on synthetic corpora.")
+    parser.add_argument("--models", choices=["stub", "real"], default="stub")
+    parser.add_argument("--db", choices=["standin", "postgres"], default="standin")
+    parser.add_argument("--standin-latency-ms", type=float, default=0.0, help="Simulated round trip per statement (stand-in DB).")
+    parser.add_argument("--match-backend", choices=["pgvector", "memory"], default=None, help="Override EXPECTATION_MATCH_BACKEND.")
+    parser.add_argument("--cache", action="store_true", help="Keep the inference cache enabled (off by default).")
+    parser.add_argument("--documents", type=int, default=50)
+    parser.add_argument("--sentences-per-document", type=int, default=40)
+    parser.add_argument("--employee-density", type=float, default=0.3, help="Fraction of sentences naming an employee.")
+    parser.add_argument("--employees", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-stage-ops", type=int, default=500, help="Cap on calls per stage-function benchmark.")
+    parser.add_argument("--max-record-ops", type=int, default=200, help="Cap on record_achievement calls.")
+    parser.add_argument("--warmup-documents", type=int, default=2)
+    parser.add_argument("--output", default=None, help="Write JSON results here (default: stdout).")
+    parser.add_argument("--compare", default=None, help="Earlier results JSON to compare against.")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    logger.setLevel(logging.INFO)
+    if args.db == "standin":
+        # The stand-in never connects; Settings still requires DB fields.
+        for name in ("DB_NAME", "DB_USER", "DB_PASSWORD", "DB_HOST"):
+            os.environ.setdefault(name, "benchmark")
+        os.environ.setdefault("DB_PORT", "5432")
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        logger.info(f"Results written to {args.output}")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare(report, json.load(f)), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import hashlib
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+# --- Stub Models ---
+
+EMBEDDING_DIM = 384
+_TOKEN = re.compile(r"[a-z]+")
+_CAPITALIZED_PAIR = re.compile(r"\b([A-Z][a-z]+ [A-Z][a-z]+)\b")
+
+class StubNERModel:
+    """
+    Deterministic stand-in for the transformers NER pipeline: every capitalized
+    "First Last" pair is a PER entity. Same call signature and output format
+    (grouped entities) as the real pipeline.
+    """
+
+    def _entities(self, sentence: str) -> list[dict]:
+        return [
+            {"entity_group": "PER", "word": m.group(1), "score": 0.99, "start": m.start(1), "end": m.end(1)}
+            for m in _CAPITALIZED_PAIR.finditer(sentence)
+        ]
+
+    def __call__(self, inputs, batch_size=None, **kwargs):
+        if isinstance(inputs, str):
+            return self._entities(inputs)
+        return [self._entities(sentence) for sentence in inputs]
+
+class StubSentenceModel:
+    """
+    Deterministic stand-in for SentenceTransformer.encode: a hashed bag of words,
+    so sentences sharing words with an expectation are close to it in cosine terms.
+    """
+
+    device = "cpu"
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return EMBEDDING_DIM
+
+    def _vector(self, sentence: str) -> np.ndarray:
+        vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+        for token in _TOKEN.findall(sentence.lower()):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            vector[int.from_bytes(digest[:4], "little") % EMBEDDING_DIM] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, sentences, batch_size=None, **kwargs):
+        if isinstance(sentences, str):
+            return self._vector(sentences)
+        return np.stack([self._vector(sentence) for sentence in sentences]) if sentences else np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+
+# --- In-Process Database Stand-In ---
+
+class StandInDatabase:
+    """
+    Answers the statements the pipeline issues (employee and expectation reads,
+    batched top-k matching, achievement inserts) from in-memory data, behind the
+    same connection/cursor interface as psycopg2. `latency_ms` adds a simulated
+    network round trip to every statement.
+    """
+
+    def __init__(self, employees: list[tuple[int, str]], expectations: list[tuple[int, np.ndarray]], latency_ms: float = 0.0):
+        self.employees = employees
+        self.employee_ids = {name: employee_id for employee_id, name in employees}
+        self.expectation_ids = np.array([expectation_id for expectation_id, _ in expectations], dtype=np.int64)
+        matrix = np.array([vector for _, vector in expectations], dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self.expectation_vectors = [vector for _, vector in expectations]
+        self.normalized = matrix / np.where(norms == 0, 1.0, norms)
+        self.latency = latency_ms / 1000.0
+        self.achievements: list[tuple] = []
+        self.statements = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        """Drop-in replacement for app.db.database.db_connection."""
+        yield _StandInConnection(self)
+
+    def top_k(self, vector, k: int) -> list[tuple[int, float]]:
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        similarities = self.normalized @ (query / norm if norm else query)
+        order = np.argsort(-similarities, kind="stable")[:k]
+        return [(int(self.expectation_ids[i]), float(1.0 - similarities[i])) for i in order]
+
+class _StandInConnection:
+    closed = False
+    encoding = "UTF8" # read by psycopg2.extras.execute_values
+
+    def __init__(self, db: StandInDatabase):
+        self.db = db
+
+    def cursor(self, *args, **kwargs):
+        return _StandInCursor(self.db, self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+_VECTOR_LITERAL = re.compile(r"[-0-9.eE]+")
+
+def _parse_vector(value) -> np.ndarray:
+    if isinstance(value, str):
+        return np.array([float(x) for x in _VECTOR_LITERAL.findall(value)], dtype=np.float32)
+    return np.asarray(value, dtype=np.float32)
+
+class _StandInCursor:
+    def __init__(self, db: StandInDatabase, connection: _StandInConnection):
+        self.db = db
+        self.connection = connection
+        self._rows: list[dict] = []
+        self._pending_values: list[tuple] = []
+
+    def mogrify(self, template, args) -> bytes:
+        # Used by psycopg2.extras.execute_values: remember the row, emit a placeholder.
+        self._pending_values.append(tuple(args))
+        return f"@@{len(self._pending_values) - 1}".encode()
+
+    def execute(self, sql, params=None):
+        db = self.db
+        if isinstance(sql, bytes):
+            sql = sql.decode()
+        with db._lock:
+            db.statements += 1
+        if db.latency:
+            time.sleep(db.latency)
+        statement = " ".join(sql.split())
+        self._rows = []
+        if statement.startswith(("SELECT set_config", "SAVEPOINT", "RELEASE", "ROLLBACK")):
+            return
+        if statement.startswith("SELECT employee_id, name FROM Employees"):
+            self._rows = [{"employee_id": i, "name": name} for i, name in db.employees]
+        elif statement.startswith("SELECT employee_id FROM Employees WHERE name"):
+            employee_id = db.employee_ids.get(params[0])
+            self._rows = [{"employee_id": employee_id}] if employee_id is not None else []
+        elif statement.startswith("SELECT expectation_id, embedding::real[]"):
+            self._rows = [{"expectation_id": int(i), "embedding": v.tolist()} for i, v in zip(db.expectation_ids, db.expectation_vectors)]
+        elif "unnest(" in statement:
+            for ord_, vector in enumerate(params["vectors"], start=1):
+                self._rows.extend({"ord": ord_, "expectation_id": i, "distance": d} for i, d in db.top_k(_parse_vector(vector), params["k"]))
+        elif statement.startswith("SELECT expectation_id, embedding <=>"):
+            vector = params["vec"] if isinstance(params, dict) else params[0]
+            self._rows = [{"expectation_id": i, "distance": d} for i, d in db.top_k(_parse_vector(vector), 1)]
+        elif statement.startswith("INSERT INTO EmployeeAchievements"):
+            rows = [self._pending_values[int(n)] for n in re.findall(r"@@(\d+)", statement)] if "@@" in statement else [tuple(params)]
+            self._pending_values = []
+            with db._lock:
+                db.achievements.extend(rows)
+            self._rows = [{"employee_id": e, "expectation_id": x, "evidence_snippet": s} for e, x, s in rows]
+        else:
+            raise NotImplementedError(f"Statement not supported by the benchmark stand-in: {statement[:80]}")
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return list(self._rows)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,8 +1,8 @@
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from app.api.router import api_router 
-from app.models import loader 
-from app.core.config import settings
+from app.db import database
+from app.core import employee_index, expectation_index, executor, batcher, jobs, startup
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -10,11 +10,17 @@ logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    logger.info("Application startup: Loading models...")
-    loader.startup_load_models()
-    logger.info("Application startup: Model loading complete.")
+    # Models, DB pool and indexes load in the background by default; see /health/ready.
+    await startup.start()
     yield
     logger.info("Application shutdown.")
+    await startup.stop()
+    await jobs.stop()
+    executor.shutdown()
+    batcher.stop()
+    employee_index.stop()
+    expectation_index.stop()
+    database.close_db_pool()
 
 
 app = FastAPI(
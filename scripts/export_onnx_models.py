@@ -0,0 +1,124 @@
+import sys
+import os
+import argparse
+import logging
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from transformers import pipeline, AutoTokenizer
+from sentence_transformers import SentenceTransformer
+from app.core.config import settings
+from app.models import loader
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Requires: pip install "optimum[onnxruntime]"  (sentence-transformers >= 3.2 for the ONNX backend)
+
+# --- Parity Check Sentences ---
+PARITY_SENTENCES = [
+    "Alice Johnson led the migration of the billing service to the new cluster.",
+    "Bob Smith mentored two junior engineers through their first on-call rotation.",
+    "The team shipped the quarterly release two weeks ahead of schedule.",
+    "Maria Garcia and Tom Lee presented the roadmap to the steering committee.",
+    "Priya Patel consistently writes clear design documents and gathers feedback early.",
+    "Customer satisfaction scores improved after Daniel O'Connor redesigned the onboarding flow.",
+    "No one was available to review the security audit findings last month.",
+    "Kenji Watanabe automated the nightly data quality checks, saving hours of manual work.",
+]
+# ------------------------------
+
+def export_ner(output_dir: str, quantize: bool):
+    """Exports the NER model to ONNX (and optionally a dynamic int8 copy) under output_dir/ner."""
+    from optimum.onnxruntime import ORTModelForTokenClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    path = os.path.join(output_dir, loader.ONNX_NER_SUBDIR)
+    logger.info(f"Exporting NER model '{loader.NER_MODEL_NAME}' to ONNX at '{path}'...")
+    model = ORTModelForTokenClassification.from_pretrained(loader.NER_MODEL_NAME, export=True)
+    model.save_pretrained(path)
+    AutoTokenizer.from_pretrained(loader.NER_MODEL_NAME).save_pretrained(path)
+
+    if quantize:
+        logger.info("Quantizing NER model (dynamic int8)...")
+        quantizer = ORTQuantizer.from_pretrained(path, file_name="model.onnx")
+        qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=path, quantization_config=qconfig)
+        logger.info(f"Quantized NER model written to '{os.path.join(path, loader.ONNX_NER_QUANTIZED_FILE)}'.")
+
+def export_sentence_transformer(output_dir: str, quantize: bool):
+    """Exports the Sentence Transformer to ONNX (and optionally a dynamic int8 copy) under output_dir/sentence."""
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+
+    path = os.path.join(output_dir, loader.ONNX_SENTENCE_SUBDIR)
+    logger.info(f"Exporting Sentence Transformer '{loader.SENTENCE_MODEL_NAME}' to ONNX at '{path}'...")
+    model = SentenceTransformer(loader.SENTENCE_MODEL_NAME, backend="onnx")
+    model.save_pretrained(path)
+
+    if quantize:
+        logger.info("Quantizing Sentence Transformer (dynamic int8)...")
+        export_dynamic_quantized_onnx_model(model, "avx512_vnni", path)
+        logger.info(f"Quantized Sentence Transformer written to '{os.path.join(path, loader.ONNX_SENTENCE_QUANTIZED_FILE)}'.")
+
+def _entity_set(entities) -> set[tuple[str, str]]:
+    return {(entity['entity_group'], entity['word']) for entity in entities}
+
+def check_parity(output_dir: str, quantized: bool) -> bool:
+    """
+    Compares the ONNX models against the PyTorch originals on PARITY_SENTENCES:
+    NER must find the same (entity_group, word) sets, and embeddings must keep a
+    cosine similarity of at least settings.ONNX_PARITY_MIN_COSINE.
+    """
+    from optimum.onnxruntime import ORTModelForTokenClassification
+
+    ner_path = os.path.join(output_dir, loader.ONNX_NER_SUBDIR)
+    sentence_path = os.path.join(output_dir, loader.ONNX_SENTENCE_SUBDIR)
+    ner_file = loader.ONNX_NER_QUANTIZED_FILE if quantized else "model.onnx"
+    sentence_file = loader.ONNX_SENTENCE_QUANTIZED_FILE if quantized else "onnx/model.onnx"
+    logger.info(f"Checking accuracy parity ({'int8' if quantized else 'fp32'} ONNX vs PyTorch) on {len(PARITY_SENTENCES)} sentences...")
+
+    torch_ner = pipeline("ner", model=loader.NER_MODEL_NAME, grouped_entities=True, device=-1)
+    onnx_ner = pipeline(
+        "ner",
+        model=ORTModelForTokenClassification.from_pretrained(ner_path, file_name=ner_file),
+        tokenizer=AutoTokenizer.from_pretrained(ner_path),
+        grouped_entities=True,
+    )
+    ner_mismatches = 0
+    for sentence, expected, actual in zip(PARITY_SENTENCES, torch_ner(PARITY_SENTENCES), onnx_ner(PARITY_SENTENCES)):
+        if _entity_set(expected) != _entity_set(actual):
+            ner_mismatches += 1
+            logger.warning(f"NER mismatch for '{sentence}': torch={_entity_set(expected)} onnx={_entity_set(actual)}")
+
+    torch_st = SentenceTransformer(loader.SENTENCE_MODEL_NAME, device="cpu")
+    onnx_st = SentenceTransformer(sentence_path, backend="onnx", model_kwargs={"file_name": sentence_file})
+    expected = torch_st.encode(PARITY_SENTENCES, normalize_embeddings=True)
+    actual = onnx_st.encode(PARITY_SENTENCES, normalize_embeddings=True)
+    cosines = np.sum(expected * actual, axis=1)
+
+    logger.info(f"NER: {len(PARITY_SENTENCES) - ner_mismatches}/{len(PARITY_SENTENCES)} sentences with identical entities.")
+    logger.info(f"Embeddings: cosine similarity to PyTorch min={cosines.min():.5f}, mean={cosines.mean():.5f}.")
+    passed = ner_mismatches == 0 and cosines.min() >= settings.ONNX_PARITY_MIN_COSINE
+    if passed:
+        logger.info("Parity check passed.")
+    else:
+        logger.error(f"Parity check FAILED (NER mismatches: {ner_mismatches}, min cosine threshold: {settings.ONNX_PARITY_MIN_COSINE}).")
+    return passed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the NER and Sentence Transformer models to ONNX for INFERENCE_BACKEND=onnx.")
+    parser.add_argument("--output-dir", default=settings.ONNX_MODEL_DIR, help="Target directory (default: settings.ONNX_MODEL_DIR).")
+    parser.add_argument("--quantize", action="store_true", help="Also write dynamic int8 quantized models (ONNX_QUANTIZED=true).")
+    parser.add_argument("--check-only", action="store_true", help="Skip the export; only run the parity check on existing files.")
+    args = parser.parse_args()
+
+    if not args.check_only:
+        export_ner(args.output_dir, args.quantize)
+        export_sentence_transformer(args.output_dir, args.quantize)
+    ok = check_parity(args.output_dir, quantized=False)
+    if args.quantize or args.check_only and settings.ONNX_QUANTIZED:
+        ok = check_parity(args.output_dir, quantized=True) and ok
+    sys.exit(0 if ok else 1)
@@ -1,29 +1,136 @@
 import sys
 import os
+import io
+import time
+import hashlib
+import argparse
 import logging
-import numpy as np 
+import numpy as np
 
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 from sentence_transformers import SentenceTransformer
-from app.db.database import get_db_connection, get_db_cursor 
-from app.core.config import settings 
+from app.db.database import get_db_connection, notify_channel
+from app.core.config import settings
+from app.core import quantization
 
 # --- Configuration ---
-MODEL_NAME = 'all-MiniLM-L6-v2' 
+MODEL_NAME = 'all-MiniLM-L6-v2'
+# Stored per row in expectations.embedding_model; bump the suffix to force a full
+# re-embed when the way embeddings are computed changes without the model name changing.
+MODEL_VERSION = f"{MODEL_NAME}:v1"
+DEFAULT_CHUNK_SIZE = 2000 # Rows encoded and committed together (one checkpoint)
+DEFAULT_BATCH_SIZE = 256 # Sentences per forward pass
+BINARY_INDEX_NAME = "expectations_embedding_binary_hnsw_idx"
+DEFAULT_CODE_VARIANTS = ["int8", "binary", "int8:pca:128", "binary:pca:256", "int8:truncate:192"]
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 # ---------------------
 
+# Rows are (re-)embedded when they have no embedding, their text changed since it was
+# embedded, or it was embedded by a different model version. The same condition makes
+# a restarted run resume after the last committed chunk.
+PENDING_CONDITION = """
+    embedding IS NULL
+    OR embedding_text_hash IS DISTINCT FROM md5(COALESCE(expectation_text, ''))
+    OR embedding_model IS DISTINCT FROM %(model_version)s
+"""
 
-def generate_and_store_embeddings():
+def text_hash(text: str) -> str:
+    """Same value as PostgreSQL's md5(COALESCE(expectation_text, '')) for UTF-8 databases."""
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+def ensure_tracking_columns(conn):
+    """Adds the columns recording what each stored embedding was computed from (idempotent)."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            ALTER TABLE public.expectations
+                ADD COLUMN IF NOT EXISTS embedding_text_hash TEXT,
+                ADD COLUMN IF NOT EXISTS embedding_model TEXT;
+        """)
+    conn.commit()
+
+def count_pending(conn, reembed_all: bool) -> int:
+    with conn.cursor() as cur:
+        if reembed_all:
+            cur.execute("SELECT COUNT(*) FROM public.expectations;")
+        else:
+            cur.execute(f"SELECT COUNT(*) FROM public.expectations WHERE {PENDING_CONDITION};", {"model_version": MODEL_VERSION})
+        count = cur.fetchone()[0]
+    conn.commit()
+    return count
+
+def iter_pending_chunks(conn, chunk_size: int, reembed_all: bool, min_id: int | None = None):
+    """
+    Streams (expectation_id, expectation_text) rows in chunks through a server-side
+    cursor, so the catalog is never held in memory at once. `min_id` restricts the
+    scan to ids greater than it (used with --all to resume a full re-embed).
+    """
+    cur = conn.cursor(name="expectations_to_embed")
+    cur.itersize = chunk_size
+    conditions = [] if reembed_all else [f"({PENDING_CONDITION})"]
+    if min_id is not None:
+        conditions.append("expectation_id > %(min_id)s")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    cur.execute(
+        f"SELECT expectation_id, expectation_text FROM public.expectations {where} ORDER BY expectation_id;",
+        {"model_version": MODEL_VERSION, "min_id": min_id},
+    )
+    try:
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cur.close()
+        conn.rollback()
+
+def _vector_literal(vector: np.ndarray) -> str:
+    return "[" + ",".join(f"{value:.8g}" for value in vector) + "]"
+
+def write_chunk(conn, ids: list[int], hashes: list[str], embeddings: np.ndarray):
+    """
+    Bulk-writes one chunk: COPY into a temporary table, then a single UPDATE ... FROM.
+    The commit is the checkpoint; a crash loses at most the chunk in flight.
     """
-    Fetches expectations without embeddings, generates them using a
-    Sentence Transformer model, and updates the database.
+    buffer = io.StringIO()
+    for exp_id, digest, vector in zip(ids, hashes, embeddings):
+        buffer.write(f"{exp_id}\t{_vector_literal(vector)}\t{digest}\n")
+    buffer.seek(0)
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS embedding_updates (
+                expectation_id INTEGER PRIMARY KEY,
+                embedding TEXT NOT NULL,
+                text_hash TEXT NOT NULL
+            ) ON COMMIT DELETE ROWS;
+        """)
+        cur.copy_expert("COPY embedding_updates (expectation_id, embedding, text_hash) FROM STDIN;", buffer)
+        cur.execute(
+            """
+            UPDATE public.expectations AS e
+            SET embedding = u.embedding::vector,
+                embedding_text_hash = u.text_hash,
+                embedding_model = %s
+            FROM embedding_updates AS u
+            WHERE e.expectation_id = u.expectation_id;
+            """,
+            (MODEL_VERSION,),
+        )
+        updated = cur.rowcount
+    conn.commit()
+    return updated
+
+def generate_and_store_embeddings(chunk_size: int = DEFAULT_CHUNK_SIZE, batch_size: int = DEFAULT_BATCH_SIZE,
+                                  processes: int = 0, reembed_all: bool = False, resume_after: int | None = None):
+    """
+    Embeds every expectation whose embedding is missing or stale (see
+    PENDING_CONDITION) and stores the results in checkpointed bulk updates.
     """
-    logger.info(f"Starting embedding generation using model: {MODEL_NAME}")
+    logger.info(f"Starting embedding generation using model: {MODEL_VERSION}")
 
     # 1. Load the Sentence Transformer model
     try:
@@ -31,72 +138,241 @@ def generate_and_store_embeddings():
         logger.info("Sentence Transformer model loaded successfully.")
         embedding_dim = model.get_sentence_embedding_dimension()
         logger.info(f"Model embedding dimension: {embedding_dim}")
-    except Exception as e:
+    except Exception:
         logger.exception("Failed to load Sentence Transformer model.")
-        return 
+        return
 
-    conn = None
-    cur = None
+    read_conn = None
+    write_conn = None
+    pool = None
     updated_count = 0
+    started = time.perf_counter()
+    encode_seconds = write_seconds = 0.0
 
     try:
-        # 2. Connect to the database
-        conn = get_db_connection()
-        if not conn:
+        # 2. Connect to the database: one connection streams rows, the other commits chunks
+        read_conn = get_db_connection()
+        write_conn = get_db_connection()
+        if not read_conn or not write_conn:
             logger.error("Could not establish database connection. Exiting.")
             return
 
-        cur = get_db_cursor(conn)
-        if not cur:
-            logger.error("Could not get database cursor. Exiting.")
-            if conn: conn.close()
-            return
-
-        # 3. Fetch expectations needing embeddings
-        cur.execute("SELECT expectation_id, expectation_text FROM expectations WHERE embedding IS NULL;")
-        expectations_to_process = cur.fetchall()
-
-        if not expectations_to_process:
+        ensure_tracking_columns(write_conn)
+        pending = count_pending(read_conn, reembed_all)
+        if not pending:
             logger.info("No expectations found needing embedding generation.")
             return
+        logger.info(f"Found {pending} expectations to process (chunks of {chunk_size}, batch size {batch_size}).")
 
-        logger.info(f"Found {len(expectations_to_process)} expectations to process.")
+        if processes > 1:
+            pool = model.start_multi_process_pool(target_devices=["cpu"] * processes)
+            logger.info(f"Encoding with a pool of {processes} processes.")
 
-        # 4. Generate and update embeddings
-        for record in expectations_to_process:
-            exp_id = record['expectation_id']
-            exp_text = record['expectation_text']
-            logger.debug(f"Processing expectation ID: {exp_id}")
+        # 3. Encode and write back chunk by chunk
+        for rows in iter_pending_chunks(read_conn, chunk_size, reembed_all, resume_after):
+            ids = [row[0] for row in rows]
+            texts = [row[1] or "" for row in rows]
 
-            try:
-                embedding_vector = model.encode(exp_text)
-
-                embedding_list = embedding_vector.tolist()
+            chunk_started = time.perf_counter()
+            if pool is not None:
+                embeddings = model.encode_multi_process(texts, pool, batch_size=batch_size)
+            else:
+                embeddings = model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+            encode_seconds += time.perf_counter() - chunk_started
 
-                update_sql = "UPDATE public.expectations SET embedding = %s WHERE expectation_id = %s;"
-                cur.execute(update_sql, (embedding_list, exp_id))
-                logger.debug(f"Generated and prepared update for expectation ID: {exp_id}")
-                updated_count += 1
+            write_started = time.perf_counter()
+            updated_count += write_chunk(write_conn, ids, [text_hash(text) for text in texts], embeddings)
+            write_seconds += time.perf_counter() - write_started
 
-            except Exception as e:
-                logger.error(f"Failed to process or update expectation ID {exp_id}: {e}")
+            elapsed = time.perf_counter() - started
+            logger.info(
+                f"Checkpoint: {updated_count}/{pending} expectations stored (last id {ids[-1]}, "
+                f"{updated_count / elapsed:.1f} rows/sec)."
+            )
 
-        # 5. Commit all changes if successful
-        conn.commit()
-        logger.info(f"Successfully generated and stored embeddings for {updated_count} expectations.")
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Successfully generated and stored embeddings for {updated_count} expectations in {elapsed:.1f}s "
+            f"({updated_count / elapsed if elapsed else 0:.1f} rows/sec; encode {encode_seconds:.1f}s, write {write_seconds:.1f}s)."
+        )
 
-    except Exception as e:
+    except Exception:
         logger.exception("An error occurred during the embedding generation process.")
-        if conn:
-            conn.rollback() 
-            logger.info("Database changes rolled back due to error.")
+        if write_conn:
+            write_conn.rollback()
+            logger.info(f"Chunk in flight rolled back; {updated_count} expectations were committed. Re-run to resume.")
     finally:
-        # 6. Close cursor and connection
-        if cur:
-            cur.close()
-        if conn:
-            conn.close()
+        if updated_count:
+            # Running API servers hot-reload their in-memory expectation index on this.
+            notify_channel(settings.EXPECTATION_INDEX_NOTIFY_CHANNEL, "generate_embeddings")
+        # 4. Stop the encode pool and close connections
+        if pool is not None:
+            model.stop_multi_process_pool(pool)
+        for conn in (read_conn, write_conn):
+            if conn:
+                conn.close()
         logger.info("Database connection closed.")
 
+# --- Compact Codes (EXPECTATION_QUANTIZATION) ---
+
+def build_codes(m: int, ef_construction: int):
+    """
+    Builds the binary codes pgvector searches first when EXPECTATION_QUANTIZATION
+    is "binary": an HNSW expression index over binary_quantize(embedding) with
+    Hamming distance. The memory backend builds its codes (int8 or binary, with
+    any EXPECTATION_REDUCTION) when it loads the index; the notification sent
+    afterwards makes running servers reload and rebuild them.
+    """
+    conn = get_db_connection()
+    if not conn:
+        logger.error("Could not establish database connection. Exiting.")
+        return
+    conn.autocommit = True # CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+    try:
+        with conn.cursor() as cur:
+            started = time.perf_counter()
+            cur.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {BINARY_INDEX_NAME} ON public.expectations "
+                f"USING hnsw ((binary_quantize(embedding)::bit({quantization.EMBEDDING_DIMENSION})) bit_hamming_ops) "
+                f"WITH (m = {int(m)}, ef_construction = {int(ef_construction)});"
+            )
+            cur.execute("SELECT pg_size_pretty(pg_relation_size(%s::regclass));", (BINARY_INDEX_NAME,))
+            size = cur.fetchone()[0]
+        logger.info(f"Binary code index {BINARY_INDEX_NAME} ({size}) is in place ({time.perf_counter() - started:.1f}s).")
+        notify_channel(settings.EXPECTATION_INDEX_NOTIFY_CHANNEL, "build_codes")
+    except Exception:
+        logger.exception("Failed to build the binary code index (needs pgvector >= 0.7.0 for binary_quantize).")
+    finally:
+        conn.close()
+
+def _parse_variant(value: str) -> tuple[str, str, int]:
+    """'int8', 'binary' or '<quantization>:<pca|truncate>:<dim>'."""
+    parts = value.split(":")
+    if len(parts) == 1:
+        return parts[0], quantization.REDUCTION_NONE, 0
+    return parts[0], parts[1], int(parts[2])
+
+# Single-query form of the two-stage search in app/core/pipeline.py (_TOP_K_BINARY_SQL).
+BINARY_TOP_K_SQL = f"""
+    SELECT c.expectation_id
+    FROM (
+        SELECT expectation_id, embedding
+        FROM public.expectations
+        WHERE embedding IS NOT NULL
+        ORDER BY binary_quantize(embedding)::bit({quantization.EMBEDDING_DIMENSION}) <~> binary_quantize(%(vec)s::vector)
+        LIMIT %(candidates)s
+    ) AS c
+    ORDER BY c.embedding <=> %(vec)s::vector
+    LIMIT %(k)s;
+"""
+
+def _pgvector_binary_queries(conn, ids: np.ndarray, queries: np.ndarray, k: int, candidates: int) -> tuple[list[list[int]], list[float]]:
+    position = {int(exp_id): row for row, exp_id in enumerate(ids)}
+    results, latencies = [], []
+    with conn.cursor() as cur:
+        for query in queries:
+            cur.execute("SELECT set_config('hnsw.ef_search', %s, true);", (str(min(max(k, candidates), 1000)),))
+            started = time.perf_counter()
+            cur.execute(BINARY_TOP_K_SQL, {"vec": _vector_literal(query), "k": k, "candidates": max(k, candidates)})
+            rows = cur.fetchall()
+            latencies.append((time.perf_counter() - started) * 1000)
+            conn.rollback() # ends the transaction so the local ef_search resets
+            results.append([position[row[0]] for row in rows])
+    return results, latencies
+
+def codes_report(queries_count: int, k: int, candidates_values: list[int], variants: list[str], noise: float, seed: int):
+    """
+    Compares two-stage search (compact-code candidates, exact re-ranking) with exact
+    float32 search on the same noisy expectation-embedding queries: recall@k,
+    recall@1, per-query latency and code size, for each code variant and candidate
+    count. Includes pgvector's binary two-stage query when its index exists.
+    """
+    from scripts.manage_expectation_index import sample_queries, mean_recall, log_report
+
+    conn = get_db_connection()
+    if not conn:
+        logger.error("Could not establish database connection. Exiting.")
+        return
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT expectation_id, embedding::real[] FROM public.expectations WHERE embedding IS NOT NULL ORDER BY expectation_id;")
+            rows = cur.fetchall()
+            queries = np.array(sample_queries(cur, queries_count, noise, seed), dtype=np.float32)
+            cur.execute("SELECT to_regclass(%s) IS NOT NULL;", (BINARY_INDEX_NAME,))
+            has_binary_index = cur.fetchone()[0]
+        conn.rollback()
+        if not rows:
+            logger.error("No embedded expectations to report on.")
+            return
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        matrix = np.array([row[1] for row in rows], dtype=np.float32)
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        logger.info(f"Reporting on {len(ids)} expectations ({matrix.nbytes / 2**20:.1f} MiB float32), {len(queries)} queries, k={k}, noise={noise}.")
+
+        def _run(search) -> tuple[list[list[int]], list[float]]:
+            results, latencies = [], []
+            for query in queries:
+                started = time.perf_counter()
+                top, _ = search(query[None, :])
+                latencies.append((time.perf_counter() - started) * 1000)
+                results.append(top[0].tolist())
+            return results, latencies
+
+        exact, latencies = _run(lambda query: quantization.exact_search(matrix, query, k))
+        log_report("exact (float32)", 1.0, 1.0, latencies)
+        exact_top1 = [top[:1] for top in exact]
+
+        for variant in variants:
+            quantization_kind, reduction, dim = _parse_variant(variant)
+            started = time.perf_counter()
+            try:
+                codes = quantization.CompactCodes(matrix, quantization_kind, reduction, dim)
+            except ValueError as e:
+                logger.error(f"Skipping variant '{variant}': {e}")
+                continue
+            logger.info(f"{variant}: {codes.dimension} dimensions, {codes.nbytes / 2**20:.2f} MiB "
+                        f"({matrix.nbytes / codes.nbytes:.1f}x smaller), built in {time.perf_counter() - started:.2f}s.")
+            for candidates in candidates_values:
+                approx, latencies = _run(lambda query: quantization.two_stage_search(matrix, codes, query, k, candidates))
+                log_report(f"{variant} candidates={candidates}", mean_recall(exact, approx), mean_recall(exact_top1, [top[:1] for top in approx]), latencies)
+
+        if has_binary_index:
+            for candidates in candidates_values:
+                approx, latencies = _pgvector_binary_queries(conn, ids, queries, k, candidates)
+                log_report(f"pgvector binary candidates={candidates}", mean_recall(exact, approx), mean_recall(exact_top1, [top[:1] for top in approx]), latencies)
+        else:
+            logger.info("No binary code index in the database; run --build-codes to include pgvector's two-stage search.")
+    finally:
+        conn.close()
+
+def _int_list(value: str) -> list[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
 if __name__ == "__main__":
-    generate_and_store_embeddings()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate (or refresh) expectation embeddings.")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per checkpointed write.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Sentences per encoder forward pass.")
+    parser.add_argument("--processes", type=int, default=0, help="Encode with a pool of N CPU processes (0/1 = in-process).")
+    parser.add_argument("--all", action="store_true", help="Re-embed every expectation, not only missing/stale ones.")
+    parser.add_argument("--resume-after", type=int, default=None,
+                        help="With --all: skip expectation ids up to and including this one (last logged checkpoint id).")
+    codes = parser.add_argument_group("compact codes (EXPECTATION_QUANTIZATION)")
+    codes.add_argument("--build-codes", action="store_true", help="Build the pgvector binary code index instead of embedding.")
+    codes.add_argument("--m", type=int, default=16, help="--build-codes: HNSW max connections per layer.")
+    codes.add_argument("--ef-construction", type=int, default=64, help="--build-codes: HNSW candidate list size while building.")
+    codes.add_argument("--codes-report", action="store_true", help="Report recall/latency of two-stage search vs exact search instead of embedding.")
+    codes.add_argument("--variants", type=lambda value: [part for part in value.split(",") if part.strip()], default=DEFAULT_CODE_VARIANTS,
+                       help="--codes-report: comma-separated <int8|binary>[:<pca|truncate>:<dim>] variants.")
+    codes.add_argument("--candidates", type=_int_list, default=[20, 50, 100, 200], help="--codes-report: re-ranking candidate counts.")
+    codes.add_argument("--queries", type=int, default=200)
+    codes.add_argument("--k", type=int, default=10)
+    codes.add_argument("--noise", type=float, default=0.3, help="Relative Gaussian noise added to sampled embeddings.")
+    codes.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.build_codes:
+        build_codes(args.m, args.ef_construction)
+    elif args.codes_report:
+        codes_report(args.queries, args.k, args.candidates, args.variants, args.noise, args.seed)
+    else:
+        generate_and_store_embeddings(args.chunk_size, args.batch_size, args.processes, args.all, args.resume_after)
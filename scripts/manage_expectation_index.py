@@ -0,0 +1,268 @@
+import sys
+import os
+import time
+import argparse
+import logging
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from app.db.database import get_db_connection
+from app.core.config import settings
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Manages pgvector approximate nearest-neighbour indexes on Expectations.embedding
+# (cosine distance, matching the <=> queries in app/core/pipeline.py):
+#
+#   python scripts/manage_expectation_index.py status
+#   python scripts/manage_expectation_index.py create hnsw --m 16 --ef-construction 64
+#   python scripts/manage_expectation_index.py create ivfflat --lists 500
+#   python scripts/manage_expectation_index.py rebuild hnsw
+#   python scripts/manage_expectation_index.py drop ivfflat
+#   python scripts/manage_expectation_index.py benchmark --ef-search 20,40,100 --probes 1,10,30
+#
+# Query-time parameters are EXPECTATION_HNSW_EF_SEARCH / EXPECTATION_IVFFLAT_PROBES.
+# IVFFlat clusters are computed from the rows present at build time: rebuild it after
+# large catalog changes. HNSW stays accurate as rows are added.
+
+# --- Index Configuration ---
+INDEX_NAMES = {
+    "hnsw": "expectations_embedding_hnsw_idx",
+    "ivfflat": "expectations_embedding_ivfflat_idx",
+}
+# ---------------------------
+
+def _connect(autocommit: bool = False):
+    conn = get_db_connection()
+    if not conn:
+        logger.error("Could not establish database connection. Exiting.")
+        sys.exit(1)
+    # CREATE/REINDEX ... CONCURRENTLY cannot run inside a transaction block.
+    conn.autocommit = autocommit
+    return conn
+
+def _count_embedded(cur) -> int:
+    cur.execute("SELECT COUNT(*) FROM Expectations WHERE embedding IS NOT NULL;")
+    return cur.fetchone()[0]
+
+def default_ivfflat_lists(rows: int) -> int:
+    """pgvector's guidance: rows / 1000 up to 1M rows, sqrt(rows) above."""
+    if rows <= 1_000_000:
+        return max(1, rows // 1000)
+    return int(np.sqrt(rows))
+
+def _set_build_resources(cur, maintenance_work_mem: str | None, parallel_workers: int | None):
+    if maintenance_work_mem:
+        cur.execute("SELECT set_config('maintenance_work_mem', %s, false);", (maintenance_work_mem,))
+    if parallel_workers is not None:
+        cur.execute("SELECT set_config('max_parallel_maintenance_workers', %s, false);", (str(parallel_workers),))
+
+def create_index(method: str, m: int, ef_construction: int, lists: int | None,
+                 maintenance_work_mem: str | None, parallel_workers: int | None):
+    """Creates the HNSW or IVFFlat index (CONCURRENTLY, so matching keeps working meanwhile)."""
+    conn = _connect(autocommit=True)
+    try:
+        with conn.cursor() as cur:
+            _set_build_resources(cur, maintenance_work_mem, parallel_workers)
+            if method == "hnsw":
+                options = f"m = {int(m)}, ef_construction = {int(ef_construction)}"
+            else:
+                rows = _count_embedded(cur)
+                lists = lists or default_ivfflat_lists(rows)
+                options = f"lists = {int(lists)}"
+                logger.info(f"{rows} embedded expectations; building IVFFlat with {lists} lists.")
+            started = time.perf_counter()
+            cur.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAMES[method]} "
+                f"ON Expectations USING {method} (embedding vector_cosine_ops) WITH ({options});"
+            )
+            logger.info(f"Index {INDEX_NAMES[method]} ({options}) is in place ({time.perf_counter() - started:.1f}s).")
+    except Exception:
+        logger.exception(f"Failed to create {method} index (is pgvector >= 0.5.0 installed for HNSW?).")
+    finally:
+        conn.close()
+
+def rebuild_index(method: str, maintenance_work_mem: str | None, parallel_workers: int | None):
+    """Rebuilds the index in place with its existing parameters (REINDEX CONCURRENTLY)."""
+    conn = _connect(autocommit=True)
+    try:
+        with conn.cursor() as cur:
+            _set_build_resources(cur, maintenance_work_mem, parallel_workers)
+            started = time.perf_counter()
+            cur.execute(f"REINDEX INDEX CONCURRENTLY {INDEX_NAMES[method]};")
+            logger.info(f"Index {INDEX_NAMES[method]} rebuilt ({time.perf_counter() - started:.1f}s).")
+    except Exception:
+        logger.exception(f"Failed to rebuild {method} index (does it exist? see 'status').")
+    finally:
+        conn.close()
+
+def drop_index(method: str):
+    conn = _connect(autocommit=True)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAMES[method]};")
+        logger.info(f"Index {INDEX_NAMES[method]} dropped.")
+    except Exception:
+        logger.exception(f"Failed to drop {method} index.")
+    finally:
+        conn.close()
+
+def show_status():
+    """Lists the vector indexes on Expectations with their definition, size and validity."""
+    conn = _connect()
+    try:
+        with conn.cursor() as cur:
+            logger.info(f"Embedded expectations: {_count_embedded(cur)}")
+            cur.execute("""
+                SELECT c.relname, pg_get_indexdef(i.indexrelid), pg_size_pretty(pg_relation_size(i.indexrelid)), i.indisvalid
+                FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                JOIN pg_am am ON am.oid = c.relam
+                WHERE i.indrelid = 'expectations'::regclass AND am.amname IN ('hnsw', 'ivfflat');
+            """)
+            rows = cur.fetchall()
+        if not rows:
+            logger.info("No ANN index on Expectations.embedding: matching uses an exact sequential scan.")
+        for name, definition, size, valid in rows:
+            logger.info(f"{name} ({size}{'' if valid else ', INVALID - drop and re-create'}): {definition}")
+        logger.info(
+            f"Query settings: EXPECTATION_HNSW_EF_SEARCH={settings.EXPECTATION_HNSW_EF_SEARCH or 'server default'}, "
+            f"EXPECTATION_IVFFLAT_PROBES={settings.EXPECTATION_IVFFLAT_PROBES or 'server default'}"
+        )
+    finally:
+        conn.close()
+
+# --- Benchmark ---
+
+TOP_K_SQL = """
+    SELECT expectation_id FROM Expectations
+    ORDER BY embedding <=> %(vec)s::vector
+    LIMIT %(k)s;
+"""
+
+def sample_queries(cur, count: int, noise: float, seed: int) -> list[list[float]]:
+    """
+    Uses real expectation embeddings as queries, perturbed by Gaussian noise of
+    relative size `noise` so the query is not trivially its own nearest neighbour.
+    """
+    cur.execute(
+        "SELECT embedding::real[] FROM Expectations WHERE embedding IS NOT NULL ORDER BY random() LIMIT %s;",
+        (count,),
+    )
+    vectors = np.array([row[0] for row in cur.fetchall()], dtype=np.float32)
+    if len(vectors) == 0:
+        return []
+    rng = np.random.default_rng(seed)
+    scale = noise * np.linalg.norm(vectors, axis=1, keepdims=True) / np.sqrt(vectors.shape[1])
+    return (vectors + rng.standard_normal(vectors.shape).astype(np.float32) * scale).tolist()
+
+def _run_queries(conn, queries, k: int, setup_sql: list[str]) -> tuple[list[list[int]], list[float]]:
+    results, latencies = [], []
+    with conn.cursor() as cur:
+        for vec in queries:
+            for sql in setup_sql:
+                cur.execute(sql)
+            started = time.perf_counter()
+            cur.execute(TOP_K_SQL, {"vec": vec, "k": k})
+            ids = [row[0] for row in cur.fetchall()]
+            latencies.append((time.perf_counter() - started) * 1000)
+            conn.rollback() # ends the transaction so SET LOCAL settings reset
+            results.append(ids)
+    return results, latencies
+
+def mean_recall(exact: list[list[int]], approx: list[list[int]]) -> float:
+    """Fraction of the exact neighbours the approximate search found, over all queries."""
+    hits = sum(len(set(e) & set(a)) for e, a in zip(exact, approx))
+    total = sum(len(e) for e in exact)
+    return hits / total if total else 1.0
+
+def log_report(label: str, recall: float, recall_at_1: float, latencies: list[float]):
+    """Logs one benchmark row (also used by generate_embeddings.py --codes-report)."""
+    p50, p95 = np.percentile(latencies, [50, 95])
+    logger.info(f"{label:<28} recall@k={recall:.3f} recall@1={recall_at_1:.3f} p50={p50:.2f}ms p95={p95:.2f}ms")
+
+def benchmark(queries_count: int, k: int, ef_search_values: list[int], probes_values: list[int], noise: float, seed: int):
+    """
+    Compares ANN results (for each ef_search / probes value) with exact search
+    (index scans disabled) on the same queries: recall@k, recall@1 and latency.
+    """
+    conn = _connect()
+    try:
+        with conn.cursor() as cur:
+            queries = sample_queries(cur, queries_count, noise, seed)
+            cur.execute("SELECT am.amname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid JOIN pg_am am ON am.oid = c.relam "
+                        "WHERE i.indrelid = 'expectations'::regclass AND am.amname IN ('hnsw', 'ivfflat') AND i.indisvalid;")
+            methods = {row[0] for row in cur.fetchall()}
+        conn.rollback()
+        if not queries:
+            logger.error("No embedded expectations to benchmark against.")
+            return
+        logger.info(f"Benchmarking {len(queries)} queries, k={k}, noise={noise}; ANN indexes present: {sorted(methods) or 'none'}.")
+
+        exact, exact_latencies = _run_queries(conn, queries, k, ["SET LOCAL enable_indexscan = off;"])
+        log_report("exact (seq scan)", 1.0, 1.0, exact_latencies)
+        exact_top1 = [ids[:1] for ids in exact]
+
+        if len(methods) > 1:
+            logger.warning("Both HNSW and IVFFlat exist and the planner chooses between them; drop one to benchmark the other in isolation.")
+        if "hnsw" in methods:
+            for ef_search in ef_search_values:
+                approx, latencies = _run_queries(conn, queries, k, [f"SET LOCAL hnsw.ef_search = {int(ef_search)};", "SET LOCAL enable_seqscan = off;"])
+                log_report(f"hnsw ef_search={ef_search}", mean_recall(exact, approx), mean_recall(exact_top1, [ids[:1] for ids in approx]), latencies)
+        if "ivfflat" in methods:
+            for probes in probes_values:
+                approx, latencies = _run_queries(conn, queries, k, [f"SET LOCAL ivfflat.probes = {int(probes)};", "SET LOCAL enable_seqscan = off;"])
+                log_report(f"ivfflat probes={probes}", mean_recall(exact, approx), mean_recall(exact_top1, [ids[:1] for ids in approx]), latencies)
+        if not methods:
+            logger.info("Create an index first ('create hnsw' / 'create ivfflat') to compare ANN against exact search.")
+    finally:
+        conn.close()
+
+def _int_list(value: str) -> list[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage pgvector ANN indexes on Expectations.embedding.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    create = commands.add_parser("create", help="Create an HNSW or IVFFlat index.")
+    create.add_argument("method", choices=sorted(INDEX_NAMES))
+    create.add_argument("--m", type=int, default=16, help="HNSW: max connections per layer.")
+    create.add_argument("--ef-construction", type=int, default=64, help="HNSW: candidate list size while building.")
+    create.add_argument("--lists", type=int, default=None, help="IVFFlat: number of clusters (default: from row count).")
+
+    rebuild = commands.add_parser("rebuild", help="REINDEX an existing index (e.g. IVFFlat after large catalog changes).")
+    rebuild.add_argument("method", choices=sorted(INDEX_NAMES))
+
+    for sub in (create, rebuild):
+        sub.add_argument("--maintenance-work-mem", default=None, help="e.g. 2GB; builds are much faster when the graph fits.")
+        sub.add_argument("--parallel-workers", type=int, default=None, help="max_parallel_maintenance_workers for the build.")
+
+    drop = commands.add_parser("drop", help="Drop an index.")
+    drop.add_argument("method", choices=sorted(INDEX_NAMES))
+
+    commands.add_parser("status", help="Show ANN indexes and query settings.")
+
+    bench = commands.add_parser("benchmark", help="Recall vs latency of ANN search compared with exact search.")
+    bench.add_argument("--queries", type=int, default=200)
+    bench.add_argument("--k", type=int, default=10)
+    bench.add_argument("--ef-search", type=_int_list, default=[10, 20, 40, 80, 200])
+    bench.add_argument("--probes", type=_int_list, default=[1, 5, 10, 20, 50])
+    bench.add_argument("--noise", type=float, default=0.3, help="Relative Gaussian noise added to sampled embeddings.")
+    bench.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    if args.command == "create":
+        create_index(args.method, args.m, args.ef_construction, args.lists, args.maintenance_work_mem, args.parallel_workers)
+    elif args.command == "rebuild":
+        rebuild_index(args.method, args.maintenance_work_mem, args.parallel_workers)
+    elif args.command == "drop":
+        drop_index(args.method)
+    elif args.command == "status":
+        show_status()
+    else:
+        benchmark(args.queries, args.k, args.ef_search, args.probes, args.noise, args.seed)
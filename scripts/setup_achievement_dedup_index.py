@@ -0,0 +1,40 @@
+import sys
+import os
+import logging
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from app.db.database import get_db_connection
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# With ACHIEVEMENT_SKIP_DUPLICATES=true, inserts that hit this index are skipped
+# (ON CONFLICT DO NOTHING), so a retried request doesn't record the same
+# evidence for the same employee/expectation twice on the same day.
+INDEX_SQL = """
+CREATE UNIQUE INDEX IF NOT EXISTS employeeachievements_dedup_idx
+    ON EmployeeAchievements (employee_id, expectation_id, date_achieved, md5(evidence_snippet));
+"""
+
+def create_dedup_index():
+    """Creates the unique index used to skip duplicate achievement rows."""
+    conn = get_db_connection()
+    if not conn:
+        logger.error("Could not establish database connection. Exiting.")
+        return
+    try:
+        with conn.cursor() as cur:
+            cur.execute(INDEX_SQL)
+        conn.commit()
+        logger.info("Achievement de-duplication index is in place.")
+    except Exception:
+        logger.exception("Failed to create achievement de-duplication index (remove existing duplicate rows first).")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    create_dedup_index()
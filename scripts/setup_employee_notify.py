@@ -0,0 +1,54 @@
+import sys
+import os
+import logging
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from app.db.database import get_db_connection
+from app.core.config import settings
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Emits one NOTIFY per changed Employees row so the in-process employee name
+# index (app/core/employee_index.py) can update incrementally.
+TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION notify_employees_changed() RETURNS trigger AS $$
+BEGIN
+    IF (TG_OP = 'DELETE') THEN
+        PERFORM pg_notify('{channel}', json_build_object('op', TG_OP, 'employee_id', OLD.employee_id)::text);
+        RETURN OLD;
+    END IF;
+    PERFORM pg_notify('{channel}', json_build_object('op', TG_OP, 'employee_id', NEW.employee_id, 'name', NEW.name)::text);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS employees_changed_notify ON Employees;
+CREATE TRIGGER employees_changed_notify
+    AFTER INSERT OR UPDATE OF name OR DELETE ON Employees
+    FOR EACH ROW EXECUTE FUNCTION notify_employees_changed();
+"""
+
+def install_trigger():
+    """Installs (or replaces) the Employees change-notification trigger."""
+    channel = settings.EMPLOYEE_INDEX_NOTIFY_CHANNEL
+    conn = get_db_connection()
+    if not conn:
+        logger.error("Could not establish database connection. Exiting.")
+        return
+    try:
+        with conn.cursor() as cur:
+            cur.execute(TRIGGER_SQL.format(channel=channel))
+        conn.commit()
+        logger.info(f"Employees change trigger installed (channel: '{channel}').")
+    except Exception:
+        logger.exception("Failed to install Employees change trigger.")
+        conn.rollback()
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    install_trigger()
@@ -0,0 +1,172 @@
+"""
+Pre-fork multi-worker launcher: loads the ML models once in this parent process,
+then forks the uvicorn workers, which inherit the weights as copy-on-write pages
+instead of each loading its own copy.
+
+    python serve.py --workers 4 --host 0.0.0.0 --port 8000
+
+Linux/macOS only (os.fork), CPU inference only (CUDA cannot be used across fork),
+and INFERENCE_EXECUTOR must be "thread". With more than one worker, jobs must live
+in a store all workers see (JOB_STORE=postgres or a JOB_SQLITE_PATH file). A dead
+worker is re-forked from the parent, so it starts with the shared weights as well.
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+# Fast tokenizers warn (and can deadlock) if their thread pool was used before fork.
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+import uvicorn
+
+from app.core.config import settings
+from app.core import memory
+from app.models import loader
+# Imported before forking so the application's modules are shared by the workers too.
+from main import app
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("serve")
+
+_shutting_down = False
+
+def _bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+def _check_shared_state(workers: int) -> bool:
+    """
+    Rejects per-process state that breaks once requests are spread over several
+    workers, and warns about state that only works less well.
+    """
+    if workers <= 1:
+        return True
+    if settings.JOB_STORE != "postgres" and settings.JOB_SQLITE_PATH in ("", ":memory:"):
+        logger.error(
+            "JOB_SQLITE_PATH=':memory:' gives every worker its own job table, so job status requests "
+            "routed to another worker return 404. Set JOB_STORE=postgres or a JOB_SQLITE_PATH file."
+        )
+        return False
+    if settings.RESULT_STORE_ENABLED and not settings.RESULT_STORE_SQLITE_PATH:
+        logger.warning(
+            "RESULT_STORE_SQLITE_PATH is empty: every worker keeps its own snippet results, so a "
+            "resubmission is only replayed when it reaches the worker that stored it. Set a file path to share them."
+        )
+    return True
+
+def _preload_models() -> bool:
+    """
+    Loads both models in the parent. No inference runs here: the OpenMP / MKL
+    thread pools it would start do not survive fork, so warmup happens per worker
+    (during its normal startup, see app/core/startup.py).
+    """
+    if settings.INFERENCE_EXECUTOR == "process":
+        logger.error("INFERENCE_EXECUTOR=process loads models in separate processes; use 'thread' with serve.py.")
+        return False
+    import torch
+    if torch.cuda.is_available() and settings.INFERENCE_BACKEND != loader.BACKEND_ONNX:
+        logger.error("CUDA cannot be shared across fork; run one uvicorn process per GPU instead of serve.py.")
+        return False
+    timings = loader.startup_load_models()
+    if not loader.models_loaded():
+        logger.error("Model loading failed in the parent process; not starting workers.")
+        return False
+    # Move everything allocated so far out of the GC's reach: collections would
+    # otherwise write to (and so un-share) every page holding a tracked object.
+    gc.collect()
+    gc.freeze()
+    logger.info(f"Models preloaded in parent (pid {os.getpid()}): {timings}")
+    return True
+
+def _run_worker(sock: socket.socket, worker_no: int):
+    # Fresh handlers: the parent's signal handlers must not run in the worker.
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    logger.info(f"Worker {worker_no} started (pid {os.getpid()}).")
+    config = uvicorn.Config(app, log_level="info", timeout_graceful_shutdown=30)
+    uvicorn.Server(config).run(sockets=[sock])
+
+def _spawn(sock: socket.socket, worker_no: int) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            _run_worker(sock, worker_no)
+        except BaseException:
+            logger.exception(f"Worker {worker_no} crashed.")
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+def _request_shutdown(signum, frame):
+    global _shutting_down
+    _shutting_down = True
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the API with N pre-forked workers sharing one copy of the model weights.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--memory-report-seconds", type=float, default=60.0,
+                        help="Interval of the per-worker unique/shared RSS report (0 = only once after startup).")
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        logger.error("serve.py needs os.fork (Linux/macOS); use 'uvicorn main:app --workers N' on this platform.")
+        sys.exit(1)
+    if not _check_shared_state(args.workers):
+        sys.exit(1)
+    sock = _bind_socket(args.host, args.port)
+    if not _preload_models():
+        sys.exit(1)
+
+    signal.signal(signal.SIGTERM, _request_shutdown)
+    signal.signal(signal.SIGINT, _request_shutdown)
+    workers = {worker_no: _spawn(sock, worker_no) for worker_no in range(1, args.workers + 1)}
+    logger.info(f"Serving on http://{args.host}:{args.port} with {args.workers} workers: {sorted(workers.values())}")
+
+    # First report once workers had time to finish startup (warmup, indexes).
+    next_report_at = time.monotonic() + 30.0
+    while not _shutting_down:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            pid, status = 0, 0
+        if pid:
+            for worker_no, worker_pid in workers.items():
+                if worker_pid == pid:
+                    logger.warning(f"Worker {worker_no} (pid {pid}) exited with status {status}; re-forking.")
+                    workers[worker_no] = _spawn(sock, worker_no)
+            continue
+        if next_report_at is not None and time.monotonic() >= next_report_at:
+            report = {"parent": os.getpid(), **{f"worker-{no}": pid for no, pid in sorted(workers.items())}}
+            memory.log_memory_report(report)
+            next_report_at = time.monotonic() + args.memory_report_seconds if args.memory_report_seconds > 0 else None
+        time.sleep(0.5)
+
+    logger.info("Shutting down workers...")
+    for pid in workers.values():
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    for pid in workers.values():
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+    sock.close()
+    logger.info("All workers stopped.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# app.core.config requires the database settings; the tests below never connect.
+for name, value in {"DB_NAME": "test", "DB_USER": "test", "DB_PASSWORD": "test", "DB_HOST": "localhost", "DB_PORT": "5432"}.items():
+    os.environ.setdefault(name, value)
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+
+from app.core.batcher import MicroBatcher
+
+class Recorder:
+    """Batch function that records every call and returns the items upper-cased."""
+
+    def __init__(self, fail: bool = False):
+        self.calls: list[list[str]] = []
+        self.fail = fail
+        self.lock = threading.Lock()
+
+    def __call__(self, items: list[str]) -> list[str]:
+        with self.lock:
+            self.calls.append(list(items))
+        if self.fail:
+            raise ValueError("model failed")
+        return [item.upper() for item in items]
+
+@pytest.fixture
+def make_batcher():
+    batchers = []
+
+    def _make(process, **options):
+        batcher = MicroBatcher("test", process, **{"max_batch_size": 64, "max_batch_tokens": 10_000, "max_wait_ms": 10_000, **options})
+        batchers.append(batcher)
+        return batcher
+
+    yield _make
+    for batcher in batchers:
+        batcher.stop()
+
+def test_flushes_when_batch_is_full(make_batcher):
+    process = Recorder()
+    batcher = make_batcher(process, max_batch_size=4)
+    started = time.monotonic()
+    assert batcher.map(["a", "b", "c", "d"]) == ["A", "B", "C", "D"]
+    assert time.monotonic() - started < 5 # Far below max_wait_ms: the full batch went out at once
+    assert process.calls == [["a", "b", "c", "d"]]
+
+def test_flushes_partial_batch_at_deadline(make_batcher):
+    process = Recorder()
+    batcher = make_batcher(process, max_wait_ms=50)
+    started = time.monotonic()
+    assert batcher.map(["x", "y"]) == ["X", "Y"]
+    assert time.monotonic() - started >= 0.04
+    assert process.calls == [["x", "y"]]
+
+def test_concurrent_submissions_share_a_batch(make_batcher):
+    process = Recorder()
+    batcher = make_batcher(process, max_batch_size=6, max_wait_ms=2_000)
+    results = {}
+
+    def submit(name, items):
+        results[name] = batcher.map(items)
+
+    threads = [threading.Thread(target=submit, args=(n, [f"{n}{i}" for i in range(3)])) for n in ("p", "q")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    assert results == {"p": ["P0", "P1", "P2"], "q": ["Q0", "Q1", "Q2"]}
+    assert len(process.calls) == 1 and len(process.calls[0]) == 6
+
+def test_splits_by_padded_token_budget(make_batcher):
+    process = Recorder()
+    batcher = make_batcher(process, max_batch_size=3, max_batch_tokens=10, length_fn=len)
+    assert batcher.map(["aaaa", "b", "cc"]) == ["AAAA", "B", "CC"]
+    # Sorted by length: [b, cc] pads to 2 x 2 = 4; adding aaaa would pad to 3 x 4 = 12 > 10.
+    assert process.calls == [["b", "cc"], ["aaaa"]]
+
+def test_failure_reaches_every_submitter(make_batcher):
+    batcher = make_batcher(Recorder(fail=True), max_batch_size=2)
+    futures = batcher.submit(["a", "b"])
+    for future in futures:
+        with pytest.raises(ValueError, match="model failed"):
+            future.result(timeout=5)
+    assert batcher.get_stats()["errors_total"] == 1
@@ -0,0 +1,64 @@
+import contextlib
+import socket
+import threading
+from types import SimpleNamespace
+
+import psycopg2
+
+from app.db import database
+
+class FakeListenConnection:
+    """Just enough of a psycopg2 connection for run_notification_listener."""
+
+    def __init__(self, fail_listen: bool = False):
+        self.fail_listen = fail_listen
+        self.closed = False
+        self.notifies = []
+        self._reader, self._writer = socket.socketpair()
+
+    def set_isolation_level(self, level):
+        if self.fail_listen:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+
+    def cursor(self):
+        return contextlib.nullcontext(SimpleNamespace(execute=lambda sql: None))
+
+    def fileno(self):
+        return self._reader.fileno()
+
+    def poll(self):
+        pass
+
+    def close(self):
+        self.closed = True
+        self._reader.close()
+        self._writer.close()
+
+def test_listener_survives_connection_and_callback_errors(monkeypatch):
+    connections = [FakeListenConnection(fail_listen=True), FakeListenConnection(), FakeListenConnection()]
+    pending = list(connections)
+    monkeypatch.setattr(database, "get_db_connection", lambda: pending.pop(0) if pending else None)
+    monkeypatch.setattr(database, "_LISTENER_RETRY_SECONDS", 0.01)
+    stop = threading.Event()
+    connects = []
+
+    def on_connect():
+        connects.append(len(connects))
+        if len(connects) == 1:
+            raise RuntimeError("index reload failed")
+
+    def on_tick():
+        if len(connects) == 2:
+            stop.set()
+
+    listener = threading.Thread(
+        target=database.run_notification_listener,
+        args=("test_channel", lambda payload: None, stop),
+        kwargs={"on_connect": on_connect, "on_tick": on_tick, "poll_seconds": 0.01},
+    )
+    listener.start()
+    listener.join(timeout=5)
+    assert not listener.is_alive()
+    # LISTEN failed on the first connection, on_connect on the second; the third resynced.
+    assert connects == [0, 1]
+    assert [connection.closed for connection in connections] == [True, True, True]
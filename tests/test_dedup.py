@@ -0,0 +1,78 @@
+import time
+
+import pytest
+
+from app.core import dedup, employee_index
+from app.core.config import settings
+
+ORIGINAL = "Ada Lovelace shipped the billing migration ahead of schedule this quarter"
+REWORDED = "Ada Lovelace shipped the billing migration ahead of schedule in this quarter"
+DIFFERENT = "Ada Lovelace mentored two new hires on the payments team"
+
+@pytest.fixture(autouse=True)
+def employees(monkeypatch):
+    for name in ("_full_names", "_aliases", "_names_by_id"):
+        monkeypatch.setattr(employee_index, name, {})
+    monkeypatch.setattr(settings, "EMPLOYEE_INDEX_USE_ALIASES", True)
+    employee_index.upsert_employee(1, "Ada Lovelace")
+    employee_index.upsert_employee(2, "Grace Hopper")
+
+def _index(**options) -> dedup.EvidenceIndex:
+    return dedup.EvidenceIndex(**{"min_similarity": 0.8, "window_seconds": 3600, "max_per_employee": 100, **options})
+
+def test_jaccard():
+    left, right = frozenset({1, 2, 3, 4}), frozenset({3, 4, 5})
+    assert dedup.jaccard(left, right) == pytest.approx(2 / 5)
+    assert dedup.jaccard(frozenset(), frozenset()) == 1.0
+
+def test_features_ignore_case_and_punctuation():
+    assert dedup.features("Ada shipped it!") == dedup.features("ada SHIPPED it")
+
+@pytest.mark.parametrize("min_similarity, found", [(0.8, True), (0.95, False)])
+def test_threshold_decides_near_duplicates(min_similarity, found):
+    # REWORDED shares 11 of 12 distinct words with ORIGINAL: Jaccard ~0.92.
+    assert dedup.jaccard(dedup.features(ORIGINAL), dedup.features(REWORDED)) == pytest.approx(11 / 12)
+    index = _index(min_similarity=min_similarity)
+    index.add(dedup.features(ORIGINAL), 1)
+    assert (index.find(dedup.features(REWORDED), REWORDED) == 1) is found
+
+def test_unrelated_evidence_is_not_a_duplicate():
+    index = _index()
+    index.add(dedup.features(ORIGINAL), 1)
+    assert index.find(dedup.features(DIFFERENT), DIFFERENT) is None
+
+def test_employee_must_be_named_in_the_sentence():
+    index = _index(min_similarity=0.5)
+    index.add(dedup.features(ORIGINAL), 1)
+    other = ORIGINAL.replace("Ada Lovelace", "Grace Hopper")
+    assert index.find(dedup.features(other), other) is None
+
+def test_unambiguous_alias_names_the_employee():
+    index = _index(min_similarity=0.5)
+    index.add(dedup.features(ORIGINAL), 1)
+    by_last_name = ORIGINAL.replace("Ada Lovelace", "Lovelace")
+    assert index.find(dedup.features(by_last_name), by_last_name) == 1
+    employee_index.upsert_employee(3, "Ada King") # "Ada" now refers to two employees
+    by_first_name = ORIGINAL.replace("Ada Lovelace", "Ada")
+    assert index.find(dedup.features(by_first_name), by_first_name) is None
+    assert employee_index.names_of(1) == ["ada lovelace", "lovelace"]
+
+def test_window_and_per_employee_cap():
+    index = _index(window_seconds=60, max_per_employee=2)
+    index.add(dedup.features(ORIGINAL), 1, seen_at=time.time() - 120)
+    assert index.find(dedup.features(ORIGINAL), ORIGINAL) is None # Outside the window
+    index.add(dedup.features(ORIGINAL), 1)
+    index.add(dedup.features(DIFFERENT), 1)
+    index.add(dedup.features("Ada Lovelace fixed the flaky deploy script"), 1)
+    assert index.find(dedup.features(ORIGINAL), ORIGINAL) is None # Oldest entry evicted by the cap
+    assert len(index) == 2
+
+def test_split_sentences_modes(monkeypatch):
+    monkeypatch.setattr(dedup, "_index", _index())
+    monkeypatch.setattr(dedup, "_stats", dict.fromkeys(dedup._stats, 0))
+    monkeypatch.setattr(settings, "DEDUP_MODE", dedup.MODE_ON)
+    dedup.remember(ORIGINAL, 1)
+    assert dedup.split_sentences([REWORDED, DIFFERENT]) == ([DIFFERENT], [REWORDED])
+    monkeypatch.setattr(settings, "DEDUP_MODE", dedup.MODE_SHADOW)
+    assert dedup.split_sentences([REWORDED, DIFFERENT]) == ([REWORDED, DIFFERENT], [])
+    assert dedup.get_dedup_stats()["shadow_would_skip"] == 1
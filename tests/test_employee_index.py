@@ -0,0 +1,38 @@
+import pytest
+
+from app.core import employee_index
+from app.core.config import settings
+
+@pytest.fixture(autouse=True)
+def empty_index(monkeypatch):
+    monkeypatch.setattr(employee_index, "_full_names", {})
+    monkeypatch.setattr(employee_index, "_aliases", {})
+    monkeypatch.setattr(employee_index, "_names_by_id", {})
+    monkeypatch.setattr(settings, "EMPLOYEE_INDEX_USE_ALIASES", True)
+
+def test_full_name_and_unique_alias_resolve():
+    employee_index.upsert_employee(1, "Ada Lovelace")
+    assert employee_index.lookup("ada  LOVELACE") == 1
+    assert employee_index.lookup("Lovelace") == 1
+
+def test_shared_full_name_is_ambiguous():
+    employee_index.upsert_employee(1, "John Smith")
+    employee_index.upsert_employee(2, "John Smith")
+    assert employee_index.lookup("John Smith") is None
+    _, keys = employee_index.lookup_keys()
+    assert "john smith" not in keys
+    assert employee_index.get_index_stats()["ambiguous_names"] == 1
+
+def test_removing_one_namesake_keeps_the_other_resolvable():
+    employee_index.upsert_employee(1, "John Smith")
+    employee_index.upsert_employee(2, "John Smith")
+    employee_index.remove_employee(1)
+    assert employee_index.lookup("John Smith") == 2
+
+def test_renaming_moves_the_entry():
+    employee_index.upsert_employee(1, "John Smith")
+    employee_index.upsert_employee(2, "John Smith")
+    employee_index.upsert_employee(2, "Jane Smith")
+    assert employee_index.lookup("John Smith") == 1
+    assert employee_index.lookup("Jane Smith") == 2
+    assert employee_index.lookup("Smith") is None # Shared last name
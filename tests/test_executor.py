@@ -0,0 +1,52 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.core import executor
+from app.core.config import settings
+
+@pytest.fixture
+def thread_executor(monkeypatch):
+    monkeypatch.setattr(settings, "INFERENCE_EXECUTOR", "thread")
+    monkeypatch.setattr(settings, "INFERENCE_WORKERS", 2)
+    monkeypatch.setattr(settings, "INFERENCE_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(executor, "_stats", dict.fromkeys(executor._stats, 0))
+    yield
+    executor.shutdown()
+
+def test_cancelled_caller_keeps_the_slot_until_the_work_finishes(thread_executor):
+    release = threading.Event()
+    ran = []
+
+    async def main():
+        executor.start()
+        first = asyncio.create_task(executor.run_inference(release.wait, 5))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        await asyncio.sleep(0.05)
+        assert executor._stats["running"] == 1 # The work is still on the executor
+
+        second = asyncio.create_task(executor.run_inference(ran.append, "second"))
+        await asyncio.sleep(0.05)
+        assert (ran, executor._stats["waiting"]) == ([], 1) # Bounded by INFERENCE_MAX_CONCURRENCY
+
+        release.set()
+        await second
+        assert ran == ["second"]
+        assert executor._stats["running"] == 0
+
+    asyncio.run(main())
+
+def test_errors_reach_the_caller(thread_executor):
+    def fail():
+        raise ValueError("model failed")
+
+    async def main():
+        executor.start()
+        with pytest.raises(ValueError, match="model failed"):
+            await executor.run_inference(fail)
+        assert executor._stats["running"] == 0
+        assert await executor.run_inference(sum, [1, 2]) == 3
+
+    asyncio.run(main())
@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from app.core import expectation_index
+
+@pytest.fixture
+def loaded_index(monkeypatch):
+    rng = np.random.default_rng(0)
+    matrix = expectation_index._normalize_rows(rng.standard_normal((50, 16)))
+    monkeypatch.setattr(expectation_index, "_index", (np.arange(100, 150), matrix, None))
+    return matrix
+
+def test_search_returns_closest_expectations_first(loaded_index):
+    results = expectation_index.search(loaded_index[[3, 7]] * 2.0, k=3)
+    assert [row[0][0] for row in results] == [103, 107]
+    assert results[0][0][1] == pytest.approx(0.0, abs=1e-5)
+    assert all(row[i][1] <= row[i + 1][1] for row in results for i in range(2))
+
+def test_own_reload_notification_is_skipped(monkeypatch):
+    reloads = []
+    monkeypatch.setattr(expectation_index, "load_index", lambda: reloads.append(True))
+    expectation_index._on_notify(f"reload@{expectation_index._process_tag()}")
+    assert reloads == []
+    expectation_index._on_notify("reload@other-host:1")
+    expectation_index._on_notify("generate_embeddings")
+    assert len(reloads) == 2
@@ -0,0 +1,105 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from datetime import timedelta
+
+import pytest
+
+pytest.importorskip("nltk") # app.core.jobs imports the pipeline
+
+from app.core import jobs
+
+@pytest.fixture
+def store():
+    store = jobs.SQLiteJobStore(":memory:")
+    store.setup()
+    return store
+
+def test_claims_oldest_queued_job_once(store):
+    first = store.create("first")
+    second = store.create("second")
+    job, text = store.claim_next()
+    assert (job["job_id"], text, job["status"]) == (first["job_id"], "first", jobs.JOB_RUNNING)
+    assert job["started_at"] is not None
+    job, text = store.claim_next()
+    assert (job["job_id"], text) == (second["job_id"], "second")
+    assert store.claim_next() is None
+
+def test_cancel_queued_job_is_immediate(store):
+    job = store.create("text")
+    cancelled = store.request_cancel(job["job_id"])
+    assert cancelled["status"] == jobs.JOB_CANCELLED
+    assert store.claim_next() is None
+
+def test_cancel_running_job_sets_flag(store):
+    store.create("text")
+    job, _ = store.claim_next()
+    flagged = store.request_cancel(job["job_id"])
+    assert flagged["status"] == jobs.JOB_RUNNING and flagged["cancel_requested"] is True
+
+def test_progress_updates(store):
+    job = store.create("text")
+    store.update(job["job_id"], sentences_total=10, sentences_processed=4, matches=2)
+    current = store.get(job["job_id"])
+    assert (current["sentences_total"], current["sentences_processed"], current["matches"]) == (10, 4, 2)
+    assert store.get("missing") is None
+
+def test_fail_stale_only_fails_jobs_past_the_lease(store):
+    old = store.create("old")
+    recent = store.create("recent")
+    store.claim_next()
+    store.claim_next()
+    store.update(old["job_id"], started_at=jobs._now() - timedelta(hours=2))
+    assert store.fail_stale(3600) == 1
+    assert store.get(old["job_id"])["status"] == jobs.JOB_FAILED
+    assert store.get(old["job_id"])["error"].startswith("Interrupted")
+    assert store.get(recent["job_id"])["status"] == jobs.JOB_RUNNING
+
+def _claim_all(path, results):
+    store = jobs.SQLiteJobStore(path)
+    while (claimed := store.claim_next()) is not None:
+        results.put(claimed[0]["job_id"])
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_shutdown_fails_the_running_job_off_the_event_loop(store, monkeypatch):
+    update_threads = []
+    update = store.update
+
+    def recording_update(job_id, **fields):
+        update_threads.append(threading.get_ident())
+        return update(job_id, **fields)
+
+    async def never_finishes(func, *args):
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(store, "update", recording_update)
+    monkeypatch.setattr(jobs, "store", store)
+    monkeypatch.setattr(jobs.executor, "run_inference", never_finishes)
+    job = store.create("Ada shipped it.")
+
+    async def main():
+        task = asyncio.create_task(jobs._run_job(*store.claim_next()))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(main())
+    stored = store.get(job["job_id"])
+    assert (stored["status"], stored["error"]) == (jobs.JOB_FAILED, "Server shut down while the job was running.")
+    assert update_threads and threading.get_ident() not in update_threads
+
+def test_processes_sharing_a_file_never_claim_the_same_job(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    store = jobs.SQLiteJobStore(path)
+    store.setup()
+    created = {store.create(f"job {n}")["job_id"] for n in range(200)}
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    workers = [context.Process(target=_claim_all, args=(path, results)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    claimed = [results.get(timeout=30) for _ in range(len(created))]
+    for worker in workers:
+        worker.join(timeout=30)
+    assert sorted(claimed) == sorted(created)
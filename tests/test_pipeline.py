@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("nltk") # app.core.pipeline segments with NLTK
+
+from app.core import dedup, employee_index, pipeline, results, stages
+from app.core.config import settings
+from app.db import schemas
+
+EMPLOYEES = {"Ada Lovelace": 1, "Grace Hopper": 2}
+
+class FakeBackend:
+    """Stand-ins for NER, the encoder, expectation search and the achievement insert."""
+
+    def __init__(self, monkeypatch):
+        self.matches = {} # sentence -> [(expectation_id, distance)], or None for a failed query
+        self.outcomes = {} # (sentence, expectation_id) -> insert outcome
+        monkeypatch.setattr(pipeline, "run_ner_batch", lambda sentences, model: [[] for _ in sentences])
+        monkeypatch.setattr(pipeline, "resolve_employee", self.resolve_employee)
+        monkeypatch.setattr(pipeline, "encode_sentences", lambda sentences, model: list(sentences))
+        monkeypatch.setattr(pipeline, "match_expectations_top_k", self.match)
+        monkeypatch.setattr(pipeline, "record_achievements", self.record)
+
+    @staticmethod
+    def resolve_employee(sentence, ner_results):
+        for name, employee_id in EMPLOYEES.items():
+            if name in sentence:
+                return name, employee_id
+        return None, None
+
+    def match(self, vectors, k):
+        results = [self.matches.get(sentence, []) for sentence in vectors]
+        return None if any(matches is None for matches in results) else [matches[:k] for matches in results]
+
+    def record(self, achievements):
+        return [self.outcomes.get((sentence, expectation_id), pipeline.ACHIEVEMENT_INSERTED) for _, expectation_id, sentence in achievements]
+
+def run(sentences: list[str], chunk: int = 10) -> schemas.PipelineResult:
+    result = schemas.PipelineResult()
+    for _ in stages.run_inline(stages.chunked(sentences, chunk), pipeline.build_pipeline_stages(result, object(), object()), {}):
+        pass
+    return result
+
+@pytest.fixture
+def backend(monkeypatch):
+    monkeypatch.setattr(settings, "SIMILARITY_THRESHOLD", 0.5)
+    monkeypatch.setattr(settings, "EXPECTATION_MATCHES_PER_SENTENCE", 1)
+    monkeypatch.setattr(settings, "DEDUP_MODE", dedup.MODE_ON)
+    monkeypatch.setattr(dedup, "_index", dedup.EvidenceIndex(min_similarity=0.8, window_seconds=3600, max_per_employee=100))
+    for name in ("_full_names", "_aliases", "_names_by_id"):
+        monkeypatch.setattr(employee_index, name, {})
+    for name, employee_id in EMPLOYEES.items():
+        employee_index.upsert_employee(employee_id, name)
+    return FakeBackend(monkeypatch)
+
+SHIPPED = "Ada Lovelace shipped the billing migration ahead of schedule this quarter"
+SHIPPED_AGAIN = "Ada Lovelace shipped the billing migration ahead of schedule in this quarter"
+
+def test_recorded_evidence_suppresses_rewordings(backend):
+    backend.matches[SHIPPED] = [(10, 0.2)]
+    assert run([SHIPPED]).achievements_created == 1
+    result = run([SHIPPED_AGAIN])
+    assert (result.sentences_deduplicated, result.achievements) == (1, [])
+
+@pytest.mark.parametrize("case", ["no_match", "above_threshold", "match_failed", "insert_failed"])
+def test_evidence_not_on_record_is_not_remembered(backend, case):
+    backend.matches[SHIPPED] = {"no_match": [], "above_threshold": [(10, 0.9)], "match_failed": None, "insert_failed": [(10, 0.2)]}[case]
+    backend.outcomes[(SHIPPED, 10)] = pipeline.ACHIEVEMENT_FAILED
+    run([SHIPPED])
+    backend.matches[SHIPPED_AGAIN] = [(10, 0.2)]
+    result = run([SHIPPED_AGAIN])
+    assert (result.sentences_deduplicated, result.achievements_created) == (0, 1)
+
+def test_partly_failed_sentence_is_not_remembered(backend, monkeypatch):
+    monkeypatch.setattr(settings, "EXPECTATION_MATCHES_PER_SENTENCE", 2)
+    backend.matches[SHIPPED] = [(10, 0.2), (11, 0.3)]
+    backend.outcomes[(SHIPPED, 11)] = pipeline.ACHIEVEMENT_FAILED
+    run([SHIPPED])
+    assert dedup.split_sentences([SHIPPED_AGAIN]) == ([SHIPPED_AGAIN], [])
+
+def test_matches_count_sentences_not_achievements(backend, monkeypatch):
+    monkeypatch.setattr(settings, "EXPECTATION_MATCHES_PER_SENTENCE", 3)
+    backend.matches[SHIPPED] = [(10, 0.1), (11, 0.2), (12, 0.3)]
+    backend.matches["Grace Hopper fixed the build."] = [(13, 0.7)]
+    result = run([SHIPPED, "Grace Hopper fixed the build."])
+    assert (result.employee_sentences, result.matches, result.achievements_created) == (2, 1, 3)
+
+@pytest.mark.parametrize("failure", ["ner", "encode", "match"])
+def test_failed_steps_are_counted(backend, monkeypatch, failure):
+    backend.matches[SHIPPED] = [(10, 0.2)]
+    if failure == "ner":
+        monkeypatch.setattr(pipeline, "run_ner_batch", lambda sentences, model: [None for _ in sentences])
+    elif failure == "encode":
+        monkeypatch.setattr(pipeline, "encode_sentences", lambda sentences, model: [None for _ in sentences])
+    else:
+        backend.matches[SHIPPED] = None
+    result = run([SHIPPED, "Nobody did anything."])
+    # Both sentences go through NER; only the one naming an employee is encoded and matched.
+    assert (result.sentences_failed, result.achievements) == (2 if failure == "ner" else 1, [])
+
+def test_result_with_failed_match_is_not_stored(backend, monkeypatch):
+    monkeypatch.setattr(settings, "RESULT_STORE_ENABLED", True)
+    monkeypatch.setattr(results, "_store", results.ResultStore(max_entries=10, ttl_seconds=3600))
+    monkeypatch.setattr(results, "_inflight", {})
+
+    async def compute(text):
+        return run([text])
+
+    backend.matches[SHIPPED] = None # The expectation query failed
+    result, replayed = asyncio.run(results.run_once(SHIPPED, "k1", compute))
+    assert (result.sentences_failed, replayed) == (1, False)
+    assert results.get_store().get("key:k1") is None
+
+    backend.matches[SHIPPED] = [(10, 0.2)] # A retry with the same key is processed again
+    result, replayed = asyncio.run(results.run_once(SHIPPED, "k1", compute))
+    assert (result.achievements_created, replayed) == (1, False)
+    assert asyncio.run(results.run_once(SHIPPED, "k1", compute))[1] is True
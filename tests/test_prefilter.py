@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+from app.core import employee_index, prefilter
+from app.core.config import settings
+
+def test_aho_corasick_agrees_with_naive_scan():
+    rng = random.Random(0)
+    alphabet = "abc"
+    for _ in range(300):
+        patterns = {"".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 6))}
+        automaton = prefilter.AhoCorasick(patterns)
+        for _ in range(20):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+            assert automaton.contains_any(text) == any(pattern in text for pattern in patterns), (patterns, text)
+
+def test_overlapping_patterns_use_failure_links():
+    automaton = prefilter.AhoCorasick(["he", "she", "hers", "his"])
+    assert automaton.contains_any("ushers")
+    assert automaton.contains_any("ahis")
+    assert not automaton.contains_any("hhs")
+
+def test_empty_pattern_set_matches_nothing():
+    assert not prefilter.AhoCorasick([]).contains_any("anything")
+    assert not prefilter.AhoCorasick([""]).contains_any("anything")
+
+@pytest.fixture
+def employees(monkeypatch):
+    monkeypatch.setattr(employee_index, "_full_names", {})
+    monkeypatch.setattr(employee_index, "_aliases", {})
+    monkeypatch.setattr(employee_index, "_names_by_id", {})
+    monkeypatch.setattr(employee_index, "_loaded", True)
+    monkeypatch.setattr(settings, "EMPLOYEE_INDEX_USE_ALIASES", True)
+    monkeypatch.setattr(prefilter, "_stats", dict.fromkeys(prefilter._stats, 0))
+    employee_index.upsert_employee(1, "Mary O'Neil")
+    employee_index.upsert_employee(2, "Raj Patel")
+
+def test_strict_mode_skips_only_sentences_without_names(employees, monkeypatch):
+    monkeypatch.setattr(settings, "PREFILTER_MODE", prefilter.MODE_STRICT)
+    sentences = ["Mary O Neil shipped the release.", "PATEL fixed the build.", "The build was fixed.", "Raj ##esh helped."]
+    to_process, skipped = prefilter.split_sentences(sentences)
+    assert to_process == [sentences[0], sentences[1], sentences[3]]
+    assert skipped == [sentences[2]]
+
+def test_shadow_mode_skips_nothing_but_counts(employees, monkeypatch):
+    monkeypatch.setattr(settings, "PREFILTER_MODE", prefilter.MODE_SHADOW)
+    sentences = ["Raj Patel wrote it.", "Nobody wrote it."]
+    assert prefilter.split_sentences(sentences) == (sentences, [])
+    assert prefilter.get_prefilter_stats()["shadow_would_skip"] == 1
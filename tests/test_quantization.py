@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from app.core import quantization
+from app.core.quantization import CompactCodes, exact_search, two_stage_search
+
+def normalized(vectors: np.ndarray) -> np.ndarray:
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+@pytest.fixture(scope="module")
+def catalog():
+    """Clustered unit vectors (like expectation embeddings) and queries near catalog rows."""
+    rng = np.random.default_rng(7)
+    centers = rng.normal(size=(40, 96))
+    matrix = normalized(centers[rng.integers(0, len(centers), 4000)] + 0.35 * rng.normal(size=(4000, 96)))
+    queries = normalized(matrix[rng.choice(len(matrix), 50, replace=False)] + 0.05 * rng.normal(size=(50, 96)))
+    return matrix, queries
+
+@pytest.mark.parametrize("quantization_, reduction, reduced_dim", [
+    (quantization.QUANTIZATION_INT8, quantization.REDUCTION_NONE, 0),
+    (quantization.QUANTIZATION_BINARY, quantization.REDUCTION_NONE, 0),
+    (quantization.QUANTIZATION_INT8, quantization.REDUCTION_PCA, 48),
+    (quantization.QUANTIZATION_INT8, quantization.REDUCTION_TRUNCATE, 64),
+])
+def test_two_stage_search_recovers_exact_neighbours(catalog, quantization_, reduction, reduced_dim):
+    matrix, queries = catalog
+    codes = CompactCodes(matrix, quantization_, reduction, reduced_dim)
+    exact_rows, exact_sims = exact_search(matrix, queries, 5)
+    rows, sims = two_stage_search(matrix, codes, queries, 5, 200)
+
+    recall = np.mean([len(set(a) & set(b)) / 5 for a, b in zip(rows, exact_rows)])
+    assert recall >= 0.95
+    assert np.array_equal(rows[:, 0], exact_rows[:, 0])
+    # Re-ranked similarities are exact cosine similarities, best first.
+    np.testing.assert_allclose(sims, np.einsum("qkd,qd->qk", matrix[rows], queries), rtol=1e-5, atol=1e-6)
+    assert np.all(np.diff(sims, axis=1) <= 0)
+
+def test_codes_are_smaller_than_the_matrix(catalog):
+    matrix, _ = catalog
+    assert CompactCodes(matrix, quantization.QUANTIZATION_INT8).nbytes < matrix.nbytes / 3
+    binary = CompactCodes(matrix, quantization.QUANTIZATION_BINARY)
+    assert binary.codes.shape == (len(matrix), 2) # 96 bits padded to two 64-bit words
+    assert CompactCodes(matrix, quantization.QUANTIZATION_INT8, quantization.REDUCTION_PCA, 32).dimension == 32
+
+def test_candidates_are_kept_across_blocks(catalog, monkeypatch):
+    matrix, queries = catalog
+    codes = CompactCodes(matrix, quantization.QUANTIZATION_INT8)
+    expected = np.sort(codes.candidates(queries, 30), axis=1)
+    monkeypatch.setattr(quantization, "_BLOCK_ELEMENTS", 1) # One block of `count` rows at a time
+    assert np.array_equal(np.sort(codes.candidates(queries, 30), axis=1), expected)
+
+def test_enough_candidates_falls_back_to_exact_search(catalog):
+    matrix, queries = catalog
+    small, small_queries = matrix[:20], queries[:3]
+    codes = CompactCodes(small, quantization.QUANTIZATION_BINARY)
+    rows, sims = two_stage_search(small, codes, small_queries, 5, 20)
+    exact_rows, exact_sims = exact_search(small, small_queries, 5)
+    assert np.array_equal(rows, exact_rows)
+    np.testing.assert_allclose(sims, exact_sims)
+
+def test_unknown_settings_are_rejected(catalog):
+    matrix, _ = catalog
+    with pytest.raises(ValueError):
+        CompactCodes(matrix, "int4")
+    with pytest.raises(ValueError):
+        CompactCodes(matrix, quantization.QUANTIZATION_INT8, "random", 32)
+
+def test_popcount_fallback_matches_bit_count(monkeypatch):
+    words = np.random.default_rng(3).integers(0, 2**63, size=(4, 6), dtype=np.uint64)
+    expected = np.array([[bin(int(word)).count("1") for word in row] for row in words])
+    assert np.array_equal(quantization._popcount(words), expected)
+    monkeypatch.delattr(np, "bitwise_count", raising=False) # NumPy < 2.0
+    assert np.array_equal(quantization._popcount(words), expected)
@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core import results
+from app.core.config import settings
+from app.db import schemas
+
+class SlowPutStore(results.ResultStore):
+    """Result store whose writes take a while, like a busy SQLite tier."""
+
+    def __init__(self, put_delay: float = 0.0):
+        super().__init__(max_entries=100, ttl_seconds=3600)
+        self.put_delay = put_delay
+
+    def put(self, key, text_hash, result):
+        time.sleep(self.put_delay)
+        return super().put(key, text_hash, result)
+
+class Compute:
+    """Pipeline stand-in that counts its runs."""
+
+    def __init__(self, delay: float = 0.0):
+        self.calls = 0
+        self.delay = delay
+        self.finished = asyncio.Event()
+
+    async def __call__(self, text: str) -> schemas.PipelineResult:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        self.finished.set()
+        return schemas.PipelineResult(sentences_total=len(text.split(".")))
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setattr(settings, "RESULT_STORE_ENABLED", True)
+    monkeypatch.setattr(settings, "RESULT_STORE_AUTO_KEY", False)
+    store = SlowPutStore()
+    monkeypatch.setattr(results, "_store", store)
+    monkeypatch.setattr(results, "_inflight", {})
+    return store
+
+def test_concurrent_identical_submissions_compute_once(store):
+    compute = Compute(delay=0.05)
+
+    async def main():
+        return await asyncio.gather(*(results.run_once("Ada shipped it.", "k1", compute) for _ in range(3)))
+
+    outcomes = asyncio.run(main())
+    assert compute.calls == 1
+    assert sorted(replayed for _, replayed in outcomes) == [False, True, True]
+    assert all(result.sentences_total == 2 for result, _ in outcomes)
+
+def test_back_to_back_submission_while_result_is_stored_computes_once(store):
+    store.put_delay = 0.2
+    compute = Compute()
+
+    async def main():
+        first = asyncio.create_task(results.run_once("Ada shipped it.", "k1", compute))
+        await compute.finished.wait() # The first run is now writing its result
+        second = await results.run_once("Ada shipped it.", "k1", compute)
+        return await first, second
+
+    (_, first_replayed), (_, second_replayed) = asyncio.run(main())
+    assert compute.calls == 1
+    assert (first_replayed, second_replayed) == (False, True)
+    assert results.get_result_store_stats()["inflight"] == 0
+
+def test_stored_result_is_replayed(store):
+    compute = Compute()
+    asyncio.run(results.run_once("Ada shipped it.", "k1", compute))
+    result, replayed = asyncio.run(results.run_once("Ada shipped it.", "k1", compute))
+    assert (compute.calls, replayed, result.sentences_total) == (1, True, 2)
+    assert store.get_stats()["replays"] == 1
+
+def test_key_reused_for_other_text_conflicts(store):
+    compute = Compute()
+    asyncio.run(results.run_once("Ada shipped it.", "k1", compute))
+    with pytest.raises(results.IdempotencyKeyConflict):
+        asyncio.run(results.run_once("Grace fixed it.", "k1", compute))
+    assert compute.calls == 1
+
+def test_failed_compute_is_not_stored(store):
+    async def fail(text):
+        raise RuntimeError("db down")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(results.run_once("Ada shipped it.", "k1", fail))
+    compute = Compute()
+    _, replayed = asyncio.run(results.run_once("Ada shipped it.", "k1", compute))
+    assert (compute.calls, replayed) == (1, False)
+
+def test_text_is_only_keyed_when_auto_key_is_enabled(store, monkeypatch):
+    compute = Compute()
+    for _ in range(2):
+        asyncio.run(results.run_once("Ada shipped it.", None, compute))
+    assert compute.calls == 2
+
+    monkeypatch.setattr(settings, "RESULT_STORE_AUTO_KEY", True)
+    for _ in range(2):
+        asyncio.run(results.run_once("Ada shipped it.", None, compute))
+    assert compute.calls == 3
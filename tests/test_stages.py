@@ -0,0 +1,69 @@
+import threading
+import time
+
+import pytest
+
+from app.core.stages import Stage, chunked, run_inline, run_stages
+
+def _pipeline(concurrency: int = 1):
+    return [
+        Stage("double", lambda x: x * 2, concurrency),
+        Stage("drop_multiples_of_three", lambda x: None if x % 3 == 0 else x, concurrency),
+        Stage("label", lambda x: f"item-{x}", concurrency),
+    ]
+
+def test_single_worker_stages_keep_order_and_drop_none():
+    expected = [f"item-{x * 2}" for x in range(50) if (x * 2) % 3]
+    assert list(run_stages(range(50), _pipeline(), queue_size=2)) == expected
+
+def test_concurrent_stages_produce_every_item():
+    expected = sorted(f"item-{x * 2}" for x in range(200) if (x * 2) % 3)
+    assert sorted(run_stages(range(200), _pipeline(concurrency=3), queue_size=2)) == expected
+
+def test_inline_matches_threaded():
+    timings = {}
+    assert list(run_inline(range(30), _pipeline(), timings)) == list(run_stages(range(30), _pipeline(), queue_size=1))
+    assert timings["double"]["items_in"] == 30
+    assert timings["drop_multiples_of_three"]["items_out"] == 20
+
+def test_timings_count_items():
+    timings = {}
+    list(run_stages(range(30), _pipeline(), queue_size=4, timings=timings))
+    assert (timings["double"]["items_in"], timings["double"]["items_out"]) == (30, 30)
+    assert timings["label"]["items_out"] == 20
+
+def test_stage_error_is_raised_to_caller():
+    def explode(x):
+        if x == 7:
+            raise ValueError("bad item 7")
+        return x
+
+    with pytest.raises(ValueError, match="bad item 7"):
+        list(run_stages(range(100), [Stage("ok", lambda x: x), Stage("explode", explode, 2)], queue_size=2))
+
+def test_source_error_is_raised_to_caller():
+    def source():
+        yield 1
+        raise RuntimeError("source broke")
+
+    with pytest.raises(RuntimeError, match="source broke"):
+        list(run_stages(source(), [Stage("ok", lambda x: x)], queue_size=2))
+
+def test_early_stop_reaps_workers_and_bounds_reading_ahead():
+    produced = []
+
+    def source():
+        for x in range(10_000):
+            produced.append(x)
+            yield x
+
+    before = threading.active_count()
+    results = run_stages(source(), [Stage("slow", lambda x: (time.sleep(0.001), x)[1])], queue_size=2)
+    assert next(results) == 0
+    results.close()
+    assert threading.active_count() == before
+    assert len(produced) < 20 # Bounded queues: the source ran only a few items ahead
+
+def test_chunked():
+    assert list(chunked(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(chunked([], 3)) == []